@@ -0,0 +1,67 @@
+"""
+Measures the cold import time of the pricing modules.
+
+Each module is imported in a fresh interpreter several times and the median wall time is
+reported, together with the slowest entries of `python -X importtime` for the last run.
+
+Usage:
+    python scripts/benchmark_imports.py [--repeat N] [module ...]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+DEFAULT_MODULES = ["modules.options", "modules.fixedincome"]
+
+
+def time_import(module, repeat):
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "import {}\n"
+        "print(time.perf_counter() - start)\n"
+    ).format(module)
+
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], cwd=SRC_PATH, check=True,
+                                capture_output=True, text=True)
+        timings.append(float(result.stdout.splitlines()[-1]))
+    return timings
+
+
+def slowest_imports(module, count=10):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+                            cwd=SRC_PATH, check=True, capture_output=True, text=True)
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative_us), name.rstrip()))
+
+    return sorted(entries, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        timings = time_import(module, args.repeat)
+        print("{}: median {:.1f} ms, min {:.1f} ms over {} runs".format(
+            module, 1000 * statistics.median(timings), 1000 * min(timings), args.repeat))
+        for cumulative_us, name in slowest_imports(module):
+            print("    {:8.1f} ms  {}".format(cumulative_us / 1000, name))
+
+
+if __name__ == "__main__":
+    main()
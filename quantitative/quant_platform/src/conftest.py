@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Make the packages under /src importable from the tests, as the notebooks do
+src_path = os.path.abspath(os.path.dirname(__file__))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
@@ -0,0 +1,227 @@
+"""Global least-squares fitting of yield curves to bond prices"""
+
+import math
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import least_squares
+
+from modules.fixedincome import BondPortfolio, curve
+
+
+def _market_prices(bonds, prices):
+    if prices is None:
+        prices = [bond.get_price() for bond in bonds]
+        if any(price is None for price in prices):
+            raise ValueError("No bond price available")
+    return np.asarray(prices, dtype=float)
+
+
+def _cashflow_operator(portfolio):
+    """Sparse (bonds, unique dates) matrix of the cashflows of a portfolio"""
+    return sparse.csr_matrix((portfolio.payments, (portfolio.owners, portfolio.date_ids)),
+                             shape=(len(portfolio), len(portfolio.unique_dates)))
+
+
+def fit_spline_curve(bonds, tenors, prices=None, method="pwlinear", smoothing=0.0,
+                     weights=None):
+    """
+        Fits the rates at fixed pillars of an interpolated curve to many bond prices at once.
+
+        Unlike the sequential bootstrap, any number of bonds can be fitted to any number of
+        pillars.  With a positive smoothing parameter the squared second differences of the
+        pillar rates are penalized, which gives a smoothing spline through noisy prices.
+
+        All three interpolators are linear in their ordinates, so the weights W of the
+        cashflow dates on the pillar rates are computed once.  The model prices are then
+        C exp(-t * W r) and the Jacobian is the sparse product C diag(-t DF) W, with C the
+        sparse cashflow matrix.  Both are handed to scipy.optimize.least_squares.
+
+        Parameters
+        ----------
+        bonds: list
+            The bonds to fit.
+        tenors: list
+            The pillar tenors of the fitted curve.
+        prices: array_like
+            The bond prices (defaults to the stored market prices).
+        method: string
+            The interpolation method: "pwlinear", "hermite" or "natural".
+        smoothing: float
+            Weight of the roughness penalty on the pillar rates (as decimals).
+        weights: array_like
+            Weight of each bond's pricing error, e.g. inverse durations to fit yields.
+
+        Returns
+        -------
+        curve
+            The fitted curve.
+    """
+    prices = _market_prices(bonds, prices)
+    weights = np.ones(len(bonds)) if weights is None else np.asarray(weights, dtype=float)
+    tenors = [float(tenor) for tenor in tenors]
+
+    portfolio = BondPortfolio.from_bonds(bonds)
+    times = portfolio.unique_dates
+    cashflows = sparse.diags(weights) @ _cashflow_operator(portfolio)
+
+    template = curve()
+    template.build_from_rates(tenors, [0.0] * len(tenors), method)
+    pillar_weights = sparse.csr_matrix(template.interpolator.weights_many(times))
+
+    roughness = None
+    if smoothing > 0 and len(tenors) > 2:
+        roughness = math.sqrt(smoothing) * sparse.diags(
+            [1.0, -2.0, 1.0], [0, 1, 2], shape=(len(tenors) - 2, len(tenors)), format="csr")
+
+    def residuals(rates):
+        dfs = np.exp(-times * (pillar_weights @ rates))
+        errors = cashflows @ dfs - weights * prices
+        if roughness is not None:
+            errors = np.concatenate([errors, roughness @ rates])
+        return errors
+
+    def jacobian(rates):
+        dfs = np.exp(-times * (pillar_weights @ rates))
+        derivatives = cashflows @ sparse.diags(-times * dfs) @ pillar_weights
+        if roughness is not None:
+            derivatives = sparse.vstack([derivatives, roughness])
+        return sparse.csr_matrix(derivatives)
+
+    # Start from a flat curve at the average yield implied by the total cash and prices
+    total_cash = np.asarray(cashflows.sum(axis=1)).ravel()
+    average_time = (cashflows @ times) / total_cash
+    guess = np.full(len(tenors), np.mean(np.log(total_cash / (weights * prices)) / average_time))
+
+    result = least_squares(residuals, guess, jac=jacobian, method="trf", x_scale="jac")
+    if not result.success:
+        raise ValueError("Curve fit did not converge: {}".format(result.message))
+
+    fitted = curve()
+    fitted.build_from_rates(tenors, result.x.tolist(), method)
+    return fitted
+
+
+def _nss_basis(times, tau1, tau2):
+    """Nelson-Siegel-Svensson loadings and their derivatives in the decay parameters"""
+    x1 = times / tau1
+    x2 = times / tau2
+    e1 = np.exp(-x1)
+    e2 = np.exp(-x2)
+    slope1 = -np.expm1(-x1) / x1
+    slope2 = -np.expm1(-x2) / x2
+
+    # d/dx of (1 - e^-x) / x, and of that minus e^-x
+    dslope1 = (e1 * (x1 + 1.0) - 1.0) / x1**2
+    dslope2 = (e2 * (x2 + 1.0) - 1.0) / x2**2
+
+    loadings = np.stack([np.ones_like(times), slope1, slope1 - e1, slope2 - e2])
+    # dx/dtau = -x/tau
+    dloadings_dtau1 = np.stack([-x1 / tau1 * dslope1, -x1 / tau1 * (dslope1 + e1)])
+    dloadings_dtau2 = -x2 / tau2 * (dslope2 + e2)
+    return loadings, dloadings_dtau1, dloadings_dtau2
+
+
+class NSSCurve:
+    """
+    Nelson-Siegel-Svensson yield curve, with continuously compounded zero rate
+
+        r(t) = beta0 + beta1 L(t / tau1) + beta2 (L(t / tau1) - e^(-t / tau1))
+                     + beta3 (L(t / tau2) - e^(-t / tau2)),    L(x) = (1 - e^-x) / x
+
+    It provides the pricing methods of the curve class, so it can be used with
+    relative_bond.price and BondPortfolio.price.
+
+    Attributes
+    ----------
+    params: ndarray
+        [beta0, beta1, beta2, beta3, tau1, tau2], the betas as decimals.
+    """
+
+    def __init__(self, params):
+        self.params = np.asarray(params, dtype=float)
+
+    def _zero_rates(self, times):
+        times = np.maximum(np.asarray(times, dtype=float), 1e-12)
+        loadings, _, _ = _nss_basis(times, self.params[4], self.params[5])
+        return np.tensordot(self.params[:4], loadings, axes=1)
+
+    def get_yield(self, time):
+        """Returns the continuously compounded spot rate (percentage) for a given tenor."""
+        return 100 * float(self._zero_rates(time))
+
+    def zero_rates(self, times):
+        """Returns the continuously compounded spot rates (percentages) for an array of tenors."""
+        return 100 * self._zero_rates(times)
+
+    def discount_factor(self, time):
+        """Returns the discount factor for the given tenor."""
+        return math.exp(-float(self._zero_rates(time)) * time)
+
+    def discount_factors(self, times):
+        """Returns the discount factors for an array of tenors."""
+        times = np.asarray(times, dtype=float)
+        return np.exp(-self._zero_rates(times) * times)
+
+
+def fit_nss_curve(bonds, prices=None, weights=None, initial=None):
+    """
+        Fits a Nelson-Siegel-Svensson curve to many bond prices at once.
+
+        The Jacobian of the prices in the six parameters is analytic: with C the sparse
+        cashflow matrix, dP/dtheta = C diag(-t DF) dr/dtheta, where dr/dtheta holds the
+        loadings for the betas and their derivatives for the decay parameters.
+
+        Parameters
+        ----------
+        bonds: list
+            The bonds to fit.
+        prices: array_like
+            The bond prices (defaults to the stored market prices).
+        weights: array_like
+            Weight of each bond's pricing error, e.g. inverse durations to fit yields.
+        initial: array_like
+            Starting parameters [beta0, beta1, beta2, beta3, tau1, tau2].  By default the
+            level and slope are taken from the yields of the longest and shortest bonds.
+
+        Returns
+        -------
+        NSSCurve
+            The fitted curve.
+    """
+    prices = _market_prices(bonds, prices)
+    weights = np.ones(len(bonds)) if weights is None else np.asarray(weights, dtype=float)
+
+    portfolio = BondPortfolio.from_bonds(bonds)
+    times = np.maximum(portfolio.unique_dates, 1e-12)
+    cashflows = sparse.diags(weights) @ _cashflow_operator(portfolio)
+
+    if initial is None:
+        yields = portfolio.ytm(prices)[0] / 100
+        maturities = np.array([max(bond.get_dates()) for bond in bonds])
+        valid = np.isfinite(yields)
+        long_rate = yields[valid][np.argmax(maturities[valid])]
+        short_rate = yields[valid][np.argmin(maturities[valid])]
+        initial = [long_rate, short_rate - long_rate, 0.0, 0.0, 1.5, 10.0]
+
+    def residuals(params):
+        loadings, _, _ = _nss_basis(times, params[4], params[5])
+        dfs = np.exp(-times * (params[:4] @ loadings))
+        return cashflows @ dfs - weights * prices
+
+    def jacobian(params):
+        loadings, dtau1, dtau2 = _nss_basis(times, params[4], params[5])
+        dfs = np.exp(-times * (params[:4] @ loadings))
+        rate_derivatives = np.vstack([loadings,
+                                      params[1:3] @ dtau1,
+                                      params[3] * dtau2])
+        return cashflows @ (rate_derivatives * (-times * dfs)).T
+
+    lower = [-np.inf, -np.inf, -np.inf, -np.inf, 0.05, 0.05]
+    upper = [np.inf, np.inf, np.inf, np.inf, 50.0, 50.0]
+    initial = np.clip(np.asarray(initial, dtype=float), lower, upper)
+    result = least_squares(residuals, initial, jac=jacobian, bounds=(lower, upper), method="trf")
+    if not result.success:
+        raise ValueError("Curve fit did not converge: {}".format(result.message))
+
+    return NSSCurve(result.x)
@@ -23,23 +23,14 @@ SOFTWARE.
 """
 
 
+import bisect
+import functools
 import math
 
-HASNUMPY = 1
-try:
-    import numpy as np
-except ImportError:
-    print("Plotting functions require Numpy")
-    print("Plotting functions inoperable")
-    HASNUMPY = 0
-
-HASMATPLOTLIB = 1
-try:
-    import matplotlib.pyplot as plt
-except ImportError:
-    print("Plotting functions require Matplotlib")
-    print("Plotting functions inoperable")
-    HASMATPLOTLIB = 0
+import numpy as np
+
+from modules.plotting import pyplot as _pyplot
+
 
 #Interpolator classes needed for yield curves
 class abstract_interpolator:
@@ -67,6 +58,41 @@ class abstract_interpolator:
         self.ordinates.insert(index, yval)
         self.length += 1
 
+    def append(self, xval, yval):
+        """
+        Adds a pillar beyond the last abscissa, updating only the segments that depend on it.
+        Unlike extend this does not re-sort the pillars.
+        """
+        if self.length > 0 and xval <= self.abscissae[-1]:
+            raise ValueError("Appended abscissa must be beyond the last pillar")
+
+        self.abscissae.append(xval)
+        self.ordinates.append(yval)
+        self.length += 1
+        self._update(self.length - 1)
+
+    def set_ordinate(self, index, yval):
+        """Replaces one ordinate in place, updating only the segments that depend on it."""
+        self.ordinates[index] = yval
+        self._update(index)
+
+    def _update(self, index):
+        # Piecewise linear interpolation caches nothing
+        pass
+
+    def _locate_many(self, xs):
+        """
+        Vectorized segment lookup: returns the points as an array, the index of the first
+        abscissa >= each point (as bisect_left) and the abscissae and ordinates as arrays.
+        """
+        xs = np.asarray(xs, dtype=float)
+        abscissae = np.asarray(self.abscissae, dtype=float)
+        ordinates = np.asarray(self.ordinates, dtype=float)
+        index = np.searchsorted(abscissae, xs, side="left")
+        if np.any(index == self.length):
+            print("Warning: extrapolating outside range")
+        return xs, index, abscissae, ordinates
+
     def get_abscissae(self):
         return self.abscissae
 
@@ -84,10 +110,8 @@ class pwlinear_interpolator(abstract_interpolator):
             print("Empty interpolator")
             return
         
-        boolvect = [(x <= abscissa) for abscissa in self.abscissae]
-        try:
-            index = boolvect.index(True)
-        except ValueError:
+        index = bisect.bisect_left(self.abscissae, x)
+        if index == self.length:
             print("Warning: extrapolating outside range")
             return self.ordinates[self.length - 1]
         
@@ -97,6 +121,21 @@ class pwlinear_interpolator(abstract_interpolator):
             alpha = (x - self.abscissae[index - 1]) / (self.abscissae[index] - self.abscissae[index - 1])
             return (1.0 - alpha)*self.ordinates[index - 1] + alpha * self.ordinates[index]
 
+    def eval_many(self, xs):
+        """Evaluates the interpolator at an array of points in one vectorized pass."""
+        if self.length == 0:
+            print("Empty interpolator")
+            return
+
+        xs, index, abscissae, ordinates = self._locate_many(xs)
+        if self.length == 1:
+            return np.full(xs.shape, ordinates[0])
+
+        index = np.clip(index, 1, self.length - 1)
+        alpha = (xs - abscissae[index - 1]) / (abscissae[index] - abscissae[index - 1])
+        alpha = np.clip(alpha, 0.0, 1.0)
+        return (1.0 - alpha) * ordinates[index - 1] + alpha * ordinates[index]
+
     def delta(self, x, bump_index):  #Delta wrt benchmarks
         if self.length == 0:
             print("Empty interpolator")
@@ -109,14 +148,15 @@ class pwlinear_interpolator(abstract_interpolator):
         if self.length == 1:
             return 1.0
 
-        boolvect = [(x <= abscissa) for abscissa in self.abscissae]
-        try:
-            index = boolvect.index(True)
-        except ValueError:
+        index = bisect.bisect_left(self.abscissae, x)
+        if index == self.length:
             print("Warning: extrapolating outside range")
             return_val = 1.0 if bump_index == (self.length - 1) else 0.0
             return return_val
         
+        if index == 0:
+            return 1.0 if bump_index == 0 else 0.0
+
         if bump_index < index - 1 or bump_index > index:
             return 0.0
 
@@ -126,6 +166,40 @@ class pwlinear_interpolator(abstract_interpolator):
         if bump_index == index:
             return alpha
 
+    def weights_many(self, xs):
+        """
+        Sensitivities of the interpolated values at an array of points to every ordinate:
+        row k of the returned (len(xs), length) matrix holds delta(xs[k], j) for all j.
+        """
+        if self.length == 0:
+            print("Empty interpolator")
+            return
+
+        xs, index, abscissae, _ = self._locate_many(xs)
+        if self.length == 1:
+            return np.ones((len(xs), 1))
+
+        upper = np.clip(index, 1, self.length - 1)
+        alpha = (xs - abscissae[upper - 1]) / (abscissae[upper] - abscissae[upper - 1])
+        alpha = np.clip(alpha, 0.0, 1.0)
+
+        rows = np.arange(len(xs))
+        weights = np.zeros((len(xs), self.length))
+        weights[rows, upper - 1] = 1.0 - alpha
+        weights[rows, upper] = alpha
+        return weights
+
+    def cubic_coefficients(self):
+        """
+        Per-segment coefficients [a, b, c, d] of the interpolant a u^3 + b u^2 + c u + d, with
+        u the position within the segment scaled to [0, 1].
+        """
+        ordinates = np.asarray(self.ordinates, dtype=float)
+        coefficients = np.zeros((max(self.length - 1, 0), 4))
+        coefficients[:, 2] = np.diff(ordinates)
+        coefficients[:, 3] = ordinates[:-1]
+        return coefficients
+
     def copy(self):
         new_interpolator = pwlinear_interpolator(self.abscissae, self.ordinates)
         return new_interpolator
@@ -135,72 +209,70 @@ class catmull_rom_interpolator(abstract_interpolator):
     def __init__(self, xvals = [], yvals = []):
         abstract_interpolator.__init__(self, xvals, yvals)
 
-        A = [0] * 4
-        self.coefficients = []
+        self.coefficients = [self._segment_coefficients(i) for i in range(self.length - 1)]
 
-        beta = (self.abscissae[1] - self.abscissae[0]) \
-            / (self.abscissae[2] - self.abscissae[0])
-
-
-        A[0] = (1.0 - beta) * self.ordinates[0] \
-               - self.ordinates[1] \
-               + beta * self.ordinates[2]
-        A[1] = (-1.0 + beta) * self.ordinates[0] \
-               + self.ordinates[1] \
-               - beta * self.ordinates[2]
-        A[2] = -self.ordinates[0] \
-               + self.ordinates[1]
-        A[3] = self.ordinates[0]
-
-        self.coefficients.append(A.copy())
-
-
-        for i in range(1, self.length-2):
+    def _segment_basis(self, i):
+        """
+        Linear map from ordinates to the cubic coefficients of the segment between abscissae
+        i and i + 1.  Returns the index of the first ordinate involved and a 4 x k nested
+        list B such that coefficient m equals sum_j B[m][j] * ordinates[first + j].
+        """
+        if self.length == 2:
+            return 0, [[0.0, 0.0],
+                       [0.0, 0.0],
+                       [-1.0, 1.0],
+                       [1.0, 0.0]]
+
+        if i == 0:
+            beta = (self.abscissae[1] - self.abscissae[0]) \
+                / (self.abscissae[2] - self.abscissae[0])
+
+            return 0, [[1.0 - beta, -1.0, beta],
+                       [-1.0 + beta, 1.0, -beta],
+                       [-1.0, 1.0, 0.0],
+                       [1.0, 0.0, 0.0]]
+
+        if i < self.length - 2:
             alpha = (self.abscissae[i+1] - self.abscissae[i]) \
                 / (self.abscissae[i+1] - self.abscissae[i-1])
             beta = (self.abscissae[i+1] - self.abscissae[i]) \
                 / (self.abscissae[i+2] - self.abscissae[i])
-            
-            A[0] = -alpha * self.ordinates[i-1] \
-                   + (2.0 - beta) * self.ordinates[i] \
-                   + (-2.0 + alpha) * self.ordinates[i+1] \
-                   + beta * self.ordinates[i+2]
-            A[1] = 2.0 * alpha * self.ordinates[i-1] \
-                   + (beta - 3.0) * self.ordinates[i] \
-                   + (3.0 - 2.0 * alpha) * self.ordinates[i+1] \
-                   - beta * self.ordinates[i+2]
-            A[2] = -alpha * self.ordinates[i-1] \
-                   + alpha * self.ordinates[i+1]
-            A[3] = self.ordinates[i]
-
-            self.coefficients.append(A.copy())
+
+            return i - 1, [[-alpha, 2.0 - beta, -2.0 + alpha, beta],
+                           [2.0 * alpha, beta - 3.0, 3.0 - 2.0 * alpha, -beta],
+                           [-alpha, 0.0, alpha, 0.0],
+                           [0.0, 1.0, 0.0, 0.0]]
 
         alpha = (self.abscissae[self.length - 1] - self.abscissae[self.length - 2]) \
             / (self.abscissae[self.length - 1] - self.abscissae[self.length - 3])
 
-
-        A[0] = -alpha * self.ordinates[self.length - 3] \
-               + self.ordinates[self.length - 2] \
-               + (-1.0 + alpha) * self.ordinates[self.length - 1]
-        A[1] = 2.0 * alpha * self.ordinates[self.length - 3] \
-               - 2.0 * self.ordinates[self.length - 2] \
-               + (2.0 - 2.0 * alpha) * self.ordinates[self.length - 1]
-        A[2] = -alpha * self.ordinates[self.length - 3] \
-               + alpha * self.ordinates[self.length - 1]
-        A[3] = self.ordinates[self.length - 2]
-
-        self.coefficients.append(A.copy())
-
+        return self.length - 3, [[-alpha, 1.0, -1.0 + alpha],
+                                 [2.0 * alpha, -2.0, 2.0 - 2.0 * alpha],
+                                 [-alpha, 0.0, alpha],
+                                 [0.0, 1.0, 0.0]]
+
+    def _segment_coefficients(self, i):
+        """Cubic coefficients of the segment between abscissae i and i + 1"""
+        first, basis = self._segment_basis(i)
+        ordinates = self.ordinates[first:first + len(basis[0])]
+        return [sum(b * y for b, y in zip(row, ordinates)) for row in basis]
+
+    def _update(self, index):
+        # Ordinate i enters the coefficients of segments i - 2 to i + 1.  Appending a pillar
+        # also turns the previous end segment into an interior one, which is covered by the
+        # same range.
+        while len(self.coefficients) < self.length - 1:
+            self.coefficients.append(None)
+        for i in range(max(index - 2, 0), min(index + 2, self.length - 1)):
+            self.coefficients[i] = self._segment_coefficients(i)
 
     def eval(self, x):
         if self.length == 0:
             print("Empty interpolator")
             return
         
-        boolvect = [(x <= abscissa) for abscissa in self.abscissae]
-        try:
-            index = boolvect.index(True)
-        except ValueError:
+        index = bisect.bisect_left(self.abscissae, x)
+        if index == self.length:
             print("Warning: extrapolating outside range")
             return self.ordinates[self.length - 1]
         
@@ -213,11 +285,91 @@ class catmull_rom_interpolator(abstract_interpolator):
                  + self.coefficients[index - 1][2] * delta \
                  + self.coefficients[index - 1][3]
 
-    
-    def delta(self, x, bump_index):
-        pass
+    def eval_many(self, xs):
+        """Evaluates the interpolator at an array of points in one vectorized pass."""
+        if self.length == 0:
+            print("Empty interpolator")
+            return
+
+        xs, index, abscissae, ordinates = self._locate_many(xs)
+        segment = np.clip(index, 1, self.length - 1) - 1
+        coefficients = np.asarray(self.coefficients)[segment]
+        delta = (xs - abscissae[segment]) / (abscissae[segment + 1] - abscissae[segment])
+        values = ((coefficients[..., 0] * delta + coefficients[..., 1]) * delta
+                  + coefficients[..., 2]) * delta + coefficients[..., 3]
+
+        values = np.where(index == 0, ordinates[0], values)
+        return np.where(index == self.length, ordinates[-1], values)
+
+    def delta(self, x, bump_index):  #Delta wrt benchmarks
+        if self.length == 0:
+            print("Empty interpolator")
+            return
+        
+        if bump_index >= self.length:
+            print("Index out of range")
+            return
+
+        index = bisect.bisect_left(self.abscissae, x)
+        if index == self.length:
+            print("Warning: extrapolating outside range")
+            return 1.0 if bump_index == (self.length - 1) else 0.0
+
+        if index == 0:
+            return 1.0 if bump_index == 0 else 0.0
+
+        first, basis = self._segment_basis(index - 1)
+        column = bump_index - first
+        if column < 0 or column >= len(basis[0]):
+            return 0.0
+
+        delta = (x - self.abscissae[index - 1]) / (self.abscissae[index] - self.abscissae[index - 1])
+        return basis[0][column] * delta**3 \
+             + basis[1][column] * delta**2 \
+             + basis[2][column] * delta \
+             + basis[3][column]
+
+    def weights_many(self, xs):
+        """
+        Sensitivities of the interpolated values at an array of points to every ordinate:
+        row k of the returned (len(xs), length) matrix holds delta(xs[k], j) for all j.
+        """
+        if self.length == 0:
+            print("Empty interpolator")
+            return
 
+        xs, index, abscissae, _ = self._locate_many(xs)
+        weights = np.zeros((len(xs), self.length))
+
+        if self.length > 1:
+            # Segment bases padded to 4 x 4, with the ordinates they act on
+            firsts = np.zeros(self.length - 1, dtype=int)
+            bases = np.zeros((self.length - 1, 4, 4))
+            for i in range(self.length - 1):
+                first, basis = self._segment_basis(i)
+                firsts[i] = first
+                bases[i, :, :len(basis[0])] = basis
+
+            segment = np.clip(index, 1, self.length - 1) - 1
+            delta = (xs - abscissae[segment]) / (abscissae[segment + 1] - abscissae[segment])
+            powers = np.stack([delta**3, delta**2, delta, np.ones_like(delta)], axis=-1)
+            local = np.einsum("km,kmj->kj", powers, bases[segment])
+
+            rows = np.nonzero((index > 0) & (index < self.length))[0]
+            columns = np.minimum(firsts[segment[rows], None] + np.arange(4), self.length - 1)
+            np.add.at(weights, (rows[:, None], columns), local[rows])
+
+        weights[index == 0, 0] = 1.0
+        weights[index == self.length, self.length - 1] = 1.0
+        return weights
     
+    def cubic_coefficients(self):
+        """
+        Per-segment coefficients [a, b, c, d] of the interpolant a u^3 + b u^2 + c u + d, with
+        u the position within the segment scaled to [0, 1].
+        """
+        return np.array(self.coefficients, dtype=float).reshape(-1, 4)
+
     def copy(self):
         new_interpolator = catmull_rom_interpolator(self.abscissae, self.ordinates)
         return new_interpolator
@@ -227,34 +379,78 @@ class natural_spline_interpolator(abstract_interpolator):
     def __init__(self, xvals=[], yvals=[]):
         abstract_interpolator.__init__(self, xvals, yvals)
 
-        lhs_matrix = np.zeros([self.length, self.length])
-        
-        lhs_matrix[0,0] = 1.0
-        
-        for i in range(1, self.length-1):
-            lhs_matrix[i, i-1] = (self.abscissae[i] - self.abscissae[i-1]) / 6.0
-            lhs_matrix[i, i] = (self.abscissae[i+1] - self.abscissae[i-1]) / 3.0
-            lhs_matrix[i, i+1] = (self.abscissae[i+1] - self.abscissae[i]) / 6.0
-        
-        lhs_matrix[self.length - 1, self.length - 1] = 1.0
-
-        rhs = np.zeros([self.length])
-
-        for i in range(1, self.length - 1):
-            rhs[i] = (self.ordinates[i+1] - self.ordinates[i]) / (self.abscissae[i+1] - self.abscissae[i]) \
-                   - (self.ordinates[i] - self.ordinates[i-1]) / (self.abscissae[i] - self.abscissae[i-1])
-        
-        self.fprimeprime = np.linalg.solve(lhs_matrix, rhs)
+        # Forward sweep of the Thomas algorithm, one entry per row of the system
+        self._pivots = []
+        self._upper = []
+        self._reduced = []
+        self._sensitivities = None
+        self._update(0)
+
+    def _update(self, index):
+        # The second derivatives solve a tridiagonal system with natural (zero) end
+        # conditions.  Row i only involves ordinates i - 1 to i + 1, so rows before index - 1
+        # keep their forward-sweep state and the sweep restarts from there; appending a pillar
+        # only adds a row.  The back substitution is always a full O(n) pass.
+        x = self.abscissae
+        y = self.ordinates
+
+        start = max(min(index - 1, len(self._upper)), 1)
+        del self._pivots[start:]
+        del self._upper[start:]
+        del self._reduced[start:]
+        if self.length > 0 and not self._upper:
+            self._pivots.append(1.0)
+            self._upper.append(0.0)
+            self._reduced.append(0.0)
+
+        for i in range(start, self.length - 1):
+            h_lower = x[i] - x[i-1]
+            h_upper = x[i+1] - x[i]
+            pivot = (x[i+1] - x[i-1]) / 3.0 - h_lower / 6.0 * self._upper[i-1]
+            rhs = (y[i+1] - y[i]) / h_upper - (y[i] - y[i-1]) / h_lower
+
+            self._pivots.append(pivot)
+            self._upper.append(h_upper / 6.0 / pivot)
+            self._reduced.append((rhs - h_lower / 6.0 * self._reduced[i-1]) / pivot)
+
+        fprimeprime = [0.0] * self.length
+        for i in range(self.length - 2, 0, -1):
+            fprimeprime[i] = self._reduced[i] - self._upper[i] * fprimeprime[i+1]
+
+        self.fprimeprime = np.array(fprimeprime)
+        self._sensitivities = None
+
+    def _fprimeprime_sensitivities(self):
+        """
+        Jacobian of the second derivatives with respect to the ordinates, computed on first
+        use after each update by running the stored Thomas sweep on every column at once.
+        """
+        if self._sensitivities is None:
+            x = self.abscissae
+            reduced = np.zeros((self.length, self.length))
+            for i in range(1, self.length - 1):
+                h_lower = x[i] - x[i-1]
+                h_upper = x[i+1] - x[i]
+                rhs = np.zeros(self.length)
+                rhs[i-1] = 1.0 / h_lower
+                rhs[i] = -1.0 / h_upper - 1.0 / h_lower
+                rhs[i+1] = 1.0 / h_upper
+                reduced[i] = (rhs - h_lower / 6.0 * reduced[i-1]) / self._pivots[i]
+
+            sensitivities = np.zeros((self.length, self.length))
+            for i in range(self.length - 2, 0, -1):
+                sensitivities[i] = reduced[i] - self._upper[i] * sensitivities[i+1]
+            self._sensitivities = sensitivities
+
+        return self._sensitivities
 
     def eval(self, x):
         if self.length == 0:
             print("Empty interpolator")
             return
         
-        boolvect = [(x <= abscissa) for abscissa in self.abscissae]
-        try:
-            index = boolvect.index(True)
-        except ValueError:
+        index = bisect.bisect_left(self.abscissae, x)
+        if index == self.length:
             print("Warning: extrapolating outside range")
             return self.ordinates[self.length - 1]
         
@@ -269,20 +465,139 @@ class natural_spline_interpolator(abstract_interpolator):
                  + (self.ordinates[index - 1] / h - h * self.fprimeprime[index - 1] / 6.0) * xplus \
                  + (self.ordinates[index] / h - h * self.fprimeprime[index] / 6.0) * xminus
 
-    
-    def delta(self, x, bump_index):
-        pass
+    def eval_many(self, xs):
+        """Evaluates the interpolator at an array of points in one vectorized pass."""
+        if self.length == 0:
+            print("Empty interpolator")
+            return
+
+        xs, index, abscissae, ordinates = self._locate_many(xs)
+        upper = np.clip(index, 1, self.length - 1)
+        lower = upper - 1
+        xplus = abscissae[upper] - xs
+        xminus = xs - abscissae[lower]
+        h = abscissae[upper] - abscissae[lower]
+        fpp = self.fprimeprime
+        values = fpp[lower] * xplus**3 / h / 6.0 \
+            + fpp[upper] * xminus**3 / h / 6.0 \
+            + (ordinates[lower] / h - h * fpp[lower] / 6.0) * xplus \
+            + (ordinates[upper] / h - h * fpp[upper] / 6.0) * xminus
+
+        values = np.where(index == 0, ordinates[0], values)
+        return np.where(index == self.length, ordinates[-1], values)
+
+    def delta(self, x, bump_index):  #Delta wrt benchmarks
+        if self.length == 0:
+            print("Empty interpolator")
+            return
+        
+        if bump_index >= self.length:
+            print("Index out of range")
+            return
 
+        index = bisect.bisect_left(self.abscissae, x)
+        if index == self.length:
+            print("Warning: extrapolating outside range")
+            return 1.0 if bump_index == (self.length - 1) else 0.0
+
+        if index == 0:
+            return 1.0 if bump_index == 0 else 0.0
+
+        xplus = self.abscissae[index] - x
+        xminus = x - self.abscissae[index - 1]
+        h = self.abscissae[index] - self.abscissae[index - 1]
+        sensitivities = self._fprimeprime_sensitivities()
+
+        value = (xplus**3 / h - h * xplus) / 6.0 * sensitivities[index - 1, bump_index] \
+              + (xminus**3 / h - h * xminus) / 6.0 * sensitivities[index, bump_index]
+        if bump_index == index - 1:
+            value += xplus / h
+        if bump_index == index:
+            value += xminus / h
+        return value
+
+    def weights_many(self, xs):
+        """
+        Sensitivities of the interpolated values at an array of points to every ordinate:
+        row k of the returned (len(xs), length) matrix holds delta(xs[k], j) for all j.
+        """
+        if self.length == 0:
+            print("Empty interpolator")
+            return
+
+        xs, index, abscissae, _ = self._locate_many(xs)
+        weights = np.zeros((len(xs), self.length))
+
+        if self.length > 1:
+            upper = np.clip(index, 1, self.length - 1)
+            lower = upper - 1
+            xplus = abscissae[upper] - xs
+            xminus = xs - abscissae[lower]
+            h = abscissae[upper] - abscissae[lower]
+            sensitivities = self._fprimeprime_sensitivities()
+
+            weights += ((xplus**3 / h - h * xplus) / 6.0)[:, None] * sensitivities[lower]
+            weights += ((xminus**3 / h - h * xminus) / 6.0)[:, None] * sensitivities[upper]
+            rows = np.arange(len(xs))
+            weights[rows, lower] += xplus / h
+            weights[rows, upper] += xminus / h
+
+        boundary = (index == 0) | (index == self.length)
+        weights[boundary] = 0.0
+        weights[index == 0, 0] = 1.0
+        weights[index == self.length, self.length - 1] = 1.0
+        return weights
     
+    def cubic_coefficients(self):
+        """
+        Per-segment coefficients [a, b, c, d] of the interpolant a u^3 + b u^2 + c u + d, with
+        u the position within the segment scaled to [0, 1].
+        """
+        abscissae = np.asarray(self.abscissae, dtype=float)
+        ordinates = np.asarray(self.ordinates, dtype=float)
+        coefficients = np.zeros((max(self.length - 1, 0), 4))
+        if self.length > 1:
+            p = np.diff(abscissae)**2 / 6.0
+            lower = self.fprimeprime[:-1]
+            upper = self.fprimeprime[1:]
+            coefficients[:, 0] = p * (upper - lower)
+            coefficients[:, 1] = 3.0 * p * lower
+            coefficients[:, 2] = np.diff(ordinates) - p * (2.0 * lower + upper)
+            coefficients[:, 3] = ordinates[:-1]
+        return coefficients
+
     def copy(self):
         new_interpolator = natural_spline_interpolator(self.abscissae, self.ordinates)
         return new_interpolator
 
 
+#Newton iteration shared by the bootstrap solvers
+def _newton(F_and_Fprime, guess, tolerance=0.000001, max_iter=50):
+    old_eta = guess
+    value, slope = F_and_Fprime(old_eta)
+    new_eta = old_eta - value / slope
+
+    iterations = 1
+    while abs(new_eta - old_eta) > tolerance:
+        if iterations == max_iter:
+            raise ValueError("Bootstrap did not converge in {} iterations".format(max_iter))
+        old_eta = new_eta
+        value, slope = F_and_Fprime(old_eta)
+        new_eta = old_eta - value / slope
+        iterations += 1
+
+    return new_eta
+
+
 #Newton solver for extending curve by 1 tenor
-def solver(interpolator, bond):
-    tolerance = 0.000001
+def solver(interpolator, bond, in_place=False, max_iter=50):
+    """
+    Solves for the rate at the bond's maturity that reprices the bond.
 
+    The trial rate is held in a new last pillar of a single interpolator, which is updated
+    in place on every Newton step rather than rebuilt.  With in_place the pillar is appended
+    to the given interpolator and left at the solved rate; otherwise a copy is used.
+    """
     dates = bond.get_dates()
     coupons = bond.get_coupons()
     maturity = bond.get_maturity()
@@ -294,45 +609,40 @@ def solver(interpolator, bond):
     except ValueError:
         raise
 
-    def F(eta):
-        _interpolator = interpolator.copy()
-        _interpolator.extend(maturity, eta)
-
-        sum = - price
-
-        for i in range(len(dates)):
-            sum += math.exp(- _interpolator.eval(dates[i]) * dates[i]) * coupons[i]
+    if not in_place:
+        interpolator = interpolator.copy()
 
-        return sum
-    
-    def Fprime(eta):
-        _interpolator = interpolator.copy()
-        _interpolator.extend(maturity, eta)
-
-        max_index = len(_interpolator) - 1
+    # Start from the previous pillar's rate
+    guess = interpolator.get_ordinates()[-1] if len(interpolator) > 0 else 0.0
+    interpolator.append(maturity, guess)
+    max_index = len(interpolator) - 1
 
-        sum = 0.0
+    def F_and_Fprime(eta):
+        interpolator.set_ordinate(max_index, eta)
 
-        for i in range(len(dates)):
-            sum += _interpolator.delta(dates[i], max_index) * dates[i] * \
-                math.exp(- _interpolator.eval(dates[i]) * dates[i]) * coupons[i]
-        
-        return - sum
+        value = - price
+        slope = 0.0
+        for date, coupon in zip(dates, coupons):
+            cashflow = math.exp(- interpolator.eval(date) * date) * coupon
+            value += cashflow
+            slope -= interpolator.delta(date, max_index) * date * cashflow
 
-    old_eta = 0.0
-    new_eta = old_eta - F(old_eta)/Fprime(old_eta)
+        return value, slope
 
-    while abs(new_eta - old_eta) > tolerance:
-        old_eta = new_eta
-        new_eta = old_eta - F(old_eta)/Fprime(old_eta)
+    new_eta = _newton(F_and_Fprime, guess, max_iter=max_iter)
+    interpolator.set_ordinate(max_index, new_eta)
 
     return new_eta
 
 
 #Newton solver for building curves from swap rates
-def swap_solver(interpolator, tenor, swap_rate):
-    tolerance = 0.000001
+def swap_solver(interpolator, tenor, swap_rate, in_place=False, max_iter=50):
+    """
+    Solves for the rate at the swap tenor that prices a semi-annual par swap at swap_rate.
 
+    As with solver, the trial rate lives in the last pillar of a single interpolator that is
+    updated in place, and in_place keeps the solved pillar in the given interpolator.
+    """
     last = max(interpolator.get_abscissae())
     
     if tenor <= last:
@@ -344,49 +654,33 @@ def swap_solver(interpolator, tenor, swap_rate):
         return
     
     num_payments = int(tenor / 0.5)
+    payment_dates = [(i + 1) * 0.5 for i in range(num_payments)]
 
-    swap_tenors = []
-    for i in range(num_payments):
-        swap_tenors.append(i * 0.5)
-    
-    def F(eta):
-        _interpolator = interpolator.copy()
-        _interpolator.extend(tenor, eta)
-
-        max_index = len(_interpolator) - 1
+    if not in_place:
+        interpolator = interpolator.copy()
 
-        sum = 0.5 * math.exp(-0.5 * _interpolator.eval(0.5))
-        for i in range(1, num_payments):
-            sum += 0.5 * math.exp(-(i+1) * 0.5 * _interpolator.eval((i+1) * 0.5))
-        
-        sum *= swap_rate
-        sum += math.exp(-tenor * _interpolator.eval(tenor)) - 1.0
+    guess = interpolator.get_ordinates()[-1]
+    interpolator.append(tenor, guess)
+    max_index = len(interpolator) - 1
 
-        return sum
-    
-    def Fprime(eta):
-        _interpolator = interpolator.copy()
-        _interpolator.extend(tenor, eta)
+    def F_and_Fprime(eta):
+        interpolator.set_ordinate(max_index, eta)
 
-        max_index = len(_interpolator) - 1
+        annuity = 0.0
+        annuity_slope = 0.0
+        for date in payment_dates:
+            df = math.exp(- date * interpolator.eval(date))
+            annuity += 0.5 * df
+            annuity_slope -= 0.5 * date * interpolator.delta(date, max_index) * df
 
-        sum = 0.5**2 * _interpolator.delta(0.5, max_index) * math.exp(-0.5 * _interpolator.eval(0.5))
-        for i in range(1, num_payments):
-            sum += i * 0.5 * _interpolator.delta(i * 0.5, max_index) * 0.5 \
-                * math.exp(-(i+1) * 0.5 * _interpolator.eval((i+1) * 0.5))
-        
-        sum *= swap_rate
-        sum += tenor * _interpolator.delta(tenor, max_index) \
-            * math.exp(-tenor * _interpolator.eval(tenor))
-        
-        return -sum
+        df = math.exp(- tenor * interpolator.eval(tenor))
+        value = swap_rate * annuity + df - 1.0
+        slope = swap_rate * annuity_slope - tenor * interpolator.delta(tenor, max_index) * df
 
-    old_eta = 0.0
-    new_eta = old_eta - F(old_eta)/Fprime(old_eta)
+        return value, slope
 
-    while abs(new_eta - old_eta) > tolerance:
-        old_eta = new_eta
-        new_eta = old_eta - F(old_eta)/Fprime(old_eta)
+    new_eta = _newton(F_and_Fprime, guess, max_iter=max_iter)
+    interpolator.set_ordinate(max_index, new_eta)
 
     return new_eta
         
@@ -459,8 +753,7 @@ class curve:
             self.interpolator = pwlinear_interpolator()
 
         for i in range(num_of_bonds):
-            new_rate = solver(self.interpolator, bond_list[i])
-            self.interpolator.extend(bond_list[i].get_maturity(), new_rate)
+            new_rate = solver(self.interpolator, bond_list[i], in_place=True)
             self.tenors.append(bond_list[i].get_maturity())
             self.rates.append(new_rate)
             self.length += 1
@@ -506,9 +799,8 @@ class curve:
         for j in range(len(libor) + len(futures), len(libor) + len(futures) + len(swaps)):
             k = j - len(libor) - len(futures)
             swaps[k] /= 100
-            rate = swap_solver(self.interpolator, dates[j], swaps[k])
+            rate = swap_solver(self.interpolator, dates[j], swaps[k], in_place=True)
             self.rates.append(rate)
-            self.interpolator.extend(dates[j], rate)
 
     def get_rates(self):
         """
@@ -621,6 +913,23 @@ class curve:
             The implied discount factor at the chosen tenor.
         """
         return math.exp(-self.interpolator.eval(time) * time)
+
+    def discount_factors(self, times):
+        """
+        Evaluates and returns the discount factors for an array of tenors in one pass.
+
+        Parameters
+        ----------
+        times: array_like
+            The tenors at which to evaluate the discount factors.
+
+        Returns
+        -------
+        ndarray
+            The implied discount factors at the chosen tenors.
+        """
+        times = np.asarray(times, dtype=float)
+        return np.exp(-self.interpolator.eval_many(times) * times)
     
     def spot_rate(self, time, compounding=0):
         """
@@ -696,6 +1005,22 @@ class curve:
         print ("Invalid compounding convention")
         return
 
+    def freeze(self, cache_size=1024):
+        """
+        Compiles the curve into an immutable CurveSnapshot for repeated pricing.
+
+        Parameters
+        ----------
+        cache_size: int
+            The number of discount factors the snapshot memoizes (defaults to 1024).
+
+        Returns
+        -------
+        CurveSnapshot
+            The compiled curve.
+        """
+        return CurveSnapshot(self.interpolator, cache_size)
+
     def copy(self):
         """
         Creates a deep copy of the curve object.
@@ -730,8 +1055,8 @@ class curve:
         -------
         None.
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
+        plt = _pyplot()
+        if plt is None:
             return
         
         if max_tenor <= 0:
@@ -768,8 +1093,8 @@ class curve:
         -------
         None.
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
+        plt = _pyplot()
+        if plt is None:
             return
         
         if max_tenor <= 0:
@@ -809,8 +1134,8 @@ class curve:
         -------
         None.
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
+        plt = _pyplot()
+        if plt is None:
             return
         
         if maturity <= expiration:
@@ -839,6 +1164,267 @@ class curve:
         plt.show(block=False)
 
 
+def _compounding_convention(compounding):
+    """Maps the compounding names accepted by the curve methods to frequencies"""
+    if compounding == "simple":
+        return 0
+    if compounding == "continuous":
+        return math.inf
+    if isinstance(compounding, str) or compounding < 0:
+        raise ValueError("Invalid compounding convention: {}".format(compounding))
+    return compounding
+
+
+#Immutable compiled curve for repeated pricing
+class CurveSnapshot:
+    """
+    Immutable, compiled copy of a yield curve.
+
+    The interpolated zero rate is stored as one cubic polynomial per segment, so an evaluation
+    is a binary search and a Horner step whatever the interpolation method.  Scalar discount
+    factors are memoized on a bounded LRU cache keyed by tenor, and the array methods evaluate
+    whole date vectors at once.  Rates follow the conventions of the curve class: inputs and
+    outputs are percentages, and tenors beyond the last pillar are extrapolated flat.
+
+    Attributes
+    ----------
+    tenors: ndarray
+        The pillar tenors (read only).
+    rates: ndarray
+        The continuously compounded zero rates at the pillars, as decimals (read only).
+    coefficients: ndarray
+        The (segments, 4) cubic coefficients of each segment (read only).
+    """
+
+    __slots__ = ("tenors", "rates", "coefficients", "_widths", "_tenor_list", "_segment_list",
+                 "_discount_factor")
+
+    def __init__(self, interpolator, cache_size=1024):
+        if len(interpolator) == 0:
+            raise ValueError("Cannot compile an empty curve")
+
+        tenors = np.array(interpolator.get_abscissae(), dtype=float)
+        rates = np.array(interpolator.get_ordinates(), dtype=float)
+        coefficients = interpolator.cubic_coefficients()
+        widths = np.diff(tenors)
+        for array in (tenors, rates, coefficients, widths):
+            array.flags.writeable = False
+
+        set_attribute = object.__setattr__
+        set_attribute(self, "tenors", tenors)
+        set_attribute(self, "rates", rates)
+        set_attribute(self, "coefficients", coefficients)
+        set_attribute(self, "_widths", widths)
+
+        # Plain Python copies for the scalar path, which avoids numpy scalar overhead
+        set_attribute(self, "_tenor_list", tenors.tolist())
+        set_attribute(self, "_segment_list", [tuple(row) + (start, width) for row, start, width
+                                              in zip(coefficients.tolist(), tenors.tolist(),
+                                                     widths.tolist())])
+        set_attribute(self, "_discount_factor",
+                      functools.lru_cache(maxsize=cache_size)(self._compute_discount_factor))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CurveSnapshot is immutable")
+
+    def __len__(self):
+        return len(self._tenor_list)
+
+    def _zero_rate(self, time):
+        index = bisect.bisect_left(self._tenor_list, time)
+        if index == len(self._tenor_list):
+            print("Warning: extrapolating outside range")
+            return self.rates[-1].item()
+        if index == 0:
+            return self.rates[0].item()
+
+        a, b, c, d, start, width = self._segment_list[index - 1]
+        u = (time - start) / width
+        return ((a * u + b) * u + c) * u + d
+
+    def _compute_discount_factor(self, time):
+        return math.exp(-self._zero_rate(time) * time)
+
+    def _zero_rates(self, times):
+        times = np.asarray(times, dtype=float)
+        index = np.searchsorted(self.tenors, times, side="left")
+        if np.any(index == len(self)):
+            print("Warning: extrapolating outside range")
+
+        if len(self) == 1:
+            return np.full(times.shape, self.rates[0])
+
+        segment = np.clip(index, 1, len(self) - 1) - 1
+        a, b, c, d = np.moveaxis(self.coefficients[segment], -1, 0)
+        u = (times - self.tenors[segment]) / self._widths[segment]
+        rates = ((a * u + b) * u + c) * u + d
+
+        rates = np.where(index == 0, self.rates[0], rates)
+        return np.where(index == len(self), self.rates[-1], rates)
+
+    def cache_info(self):
+        """Returns the statistics of the discount factor cache, as functools.lru_cache does."""
+        return self._discount_factor.cache_info()
+
+    def get_yield(self, time):
+        """
+        Evaluates and returns the continuously compounded spot rate for a given tenor.
+
+        Parameters
+        ----------
+        time: float
+            The tenor at which to evaluate the spot rate.
+
+        Returns
+        -------
+        float
+            The continuously compounded spot rate (percentage) for the chosen tenor.
+        """
+        return 100 * self._zero_rate(time)
+
+    def discount_factor(self, time):
+        """
+        Returns the (memoized) discount factor for the given tenor.
+
+        Parameters
+        ----------
+        time: float
+            The tenor at which to evaluate the discount factor.
+
+        Returns
+        -------
+        float
+            The implied discount factor at the chosen tenor.
+        """
+        return self._discount_factor(time)
+
+    def discount_factors(self, times):
+        """
+        Evaluates and returns the discount factors for an array of tenors in one pass.
+
+        Parameters
+        ----------
+        times: array_like
+            The tenors at which to evaluate the discount factors.
+
+        Returns
+        -------
+        ndarray
+            The implied discount factors at the chosen tenors.
+        """
+        times = np.asarray(times, dtype=float)
+        return np.exp(-self._zero_rates(times) * times)
+
+    def zero_rates(self, times):
+        """
+        Evaluates and returns the continuously compounded spot rates for an array of tenors.
+
+        Parameters
+        ----------
+        times: array_like
+            The tenors at which to evaluate the spot rates.
+
+        Returns
+        -------
+        ndarray
+            The continuously compounded spot rates (percentages).
+        """
+        return 100 * self._zero_rates(times)
+
+    def spot_rate(self, time, compounding=0):
+        """
+        Evaluates and returns the spot rate for a given tenor and compounding convention.
+
+        Parameters
+        ----------
+        time: float
+            The tenor of the desired spot rate.
+        compounding: int or string
+            The compounding frequency, "simple" (0, the default) or "continuous".
+
+        Returns
+        -------
+        float
+            The requested spot rate (percentage).
+        """
+        compounding = _compounding_convention(compounding)
+        if compounding == math.inf:
+            return self.get_yield(time)
+
+        df = self.discount_factor(time)
+        if compounding == 0:
+            return 100 * (1.0 / df - 1.0) / time
+        return 100 * compounding * (df**(-1.0 / compounding / time) - 1.0)
+
+    def forward_rate(self, start, maturity, compounding=0):
+        """
+        Evaluates and returns the implied forward rate for a given start, maturity, and
+        compounding convention.
+
+        Parameters
+        ----------
+        start: float
+            The start date for the future loan period.
+        maturity: float
+            The end date for the future loan period.
+        compounding: int or string
+            The compounding frequency, "simple" (0, the default) or "continuous".
+
+        Returns
+        -------
+        float
+            The requested forward rate (percentage).
+        """
+        if not (maturity > start):
+            raise ValueError("Maturity date must be later than start date")
+
+        compounding = _compounding_convention(compounding)
+        if compounding == math.inf:
+            return 100 * (maturity * self._zero_rate(maturity) - start * self._zero_rate(start)) \
+                / (maturity - start)
+
+        ratio = self.discount_factor(start) / self.discount_factor(maturity)
+        if compounding == 0:
+            return 100 * (ratio - 1.0) / (maturity - start)
+        return 100 * compounding * (ratio**(1.0 / compounding / (maturity - start)) - 1.0)
+
+    def forward_rates(self, starts, maturities, compounding=0):
+        """
+        Evaluates and returns the implied forward rates for arrays of start and maturity
+        dates.
+
+        Parameters
+        ----------
+        starts: array_like
+            The start dates of the loan periods.
+        maturities: array_like
+            The end dates of the loan periods.
+        compounding: int or string
+            The compounding frequency, "simple" (0, the default) or "continuous".
+
+        Returns
+        -------
+        ndarray
+            The requested forward rates (percentages).
+        """
+        starts, maturities = np.broadcast_arrays(np.asarray(starts, dtype=float),
+                                                 np.asarray(maturities, dtype=float))
+        if not np.all(maturities > starts):
+            raise ValueError("Maturity dates must be later than start dates")
+
+        compounding = _compounding_convention(compounding)
+        periods = maturities - starts
+        # One evaluation of the zero rates for both ends
+        rates = self._zero_rates(np.stack([starts, maturities]))
+        log_ratio = maturities * rates[1] - starts * rates[0]
+
+        if compounding == math.inf:
+            return 100 * log_ratio / periods
+        if compounding == 0:
+            return 100 * np.expm1(log_ratio) / periods
+        return 100 * compounding * np.expm1(log_ratio / compounding / periods)
+
+
 #Classes for bonds
 class abstract_bond:
 
@@ -955,8 +1541,8 @@ class abstract_bond:
         -------
         None.
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
+        plt = _pyplot()
+        if plt is None:
             return
         
         fig, ax = plt.subplots()
@@ -1056,6 +1642,381 @@ class absolute_bond(abstract_bond):
         pass
 
 
+#Batch yield-to-maturity solver
+# Status codes returned by ytm_batch
+YTM_CONVERGED = 0
+YTM_MAX_ITERATIONS = 1
+YTM_NO_SOLUTION = 2
+
+
+def _ytm_terms(y, times, payments, frequency):
+    """
+    Price and its first two derivatives with respect to the yield, for each row of a padded
+    cashflow matrix.  A frequency of 0 means continuous compounding.
+    """
+    compounding = frequency > 0
+    periods = np.where(compounding, frequency, 1.0)
+    base = np.where(compounding, 1.0 + y / periods, 1.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        growth = np.where(compounding, periods * np.log(base), y)
+
+    discounted = payments * np.exp(-growth[:, None] * times)
+    pv = discounted.sum(axis=1)
+    first_moment = (times * discounted).sum(axis=1)
+    second_moment = (times * times * discounted).sum(axis=1)
+
+    pv_prime = -first_moment / base
+    pv_second = (second_moment + np.where(compounding, first_moment / periods, 0.0)) / base**2
+    return pv, pv_prime, pv_second
+
+
+def ytm_batch(times, payments, prices, frequency=2, tolerance=1e-12, max_iter=50):
+    """
+        Calculates the yields-to-maturity of many bonds at once, with their modified
+        durations and convexities.
+
+        Each row of the cashflow matrices is one bond, padded with zero payments.  All yields
+        are solved simultaneously with masked Newton iterations.  A bracket [lower, upper] on
+        each root is maintained from the sign of the pricing error; a Newton step that leaves
+        it is replaced by bisection.  Newton converges monotonically on these convex price
+        functions, so the fallback only matters for poor starting points.
+
+        Parameters
+        ----------
+        times: array_like
+            (bonds, cashflows) matrix of payment times.
+        payments: array_like
+            (bonds, cashflows) matrix of payment amounts, zero for padding.
+        prices: float or array_like
+            The bond prices.
+        frequency: int or array_like
+            The compounding frequency of the yield of each bond, as in relative_bond.YTM.
+            0 means continuous compounding (defaults to 2).
+        tolerance: float
+            Convergence tolerance on the yield, as a decimal.
+        max_iter: int
+            Maximum number of iterations.
+
+        Returns
+        -------
+        tuple of (ndarray, ndarray, ndarray, ndarray)
+            The yields (as percentages, nan where no solution was found), the modified
+            durations -P'/P and convexities P''/P (with respect to the decimal yield), and the
+            per-bond status codes: YTM_CONVERGED, YTM_MAX_ITERATIONS or YTM_NO_SOLUTION.
+    """
+    times = np.atleast_2d(np.asarray(times, dtype=float))
+    payments = np.atleast_2d(np.asarray(payments, dtype=float))
+    num_bonds = times.shape[0]
+    prices = np.broadcast_to(np.asarray(prices, dtype=float), (num_bonds,))
+    frequency = np.broadcast_to(np.asarray(frequency, dtype=float), (num_bonds,))
+
+    # Initial bracket of -50% to 1000%
+    lower = np.full(num_bonds, -0.5)
+    upper = np.full(num_bonds, 10.0)
+    pv_lower = _ytm_terms(lower, times, payments, frequency)[0]
+    pv_upper = _ytm_terms(upper, times, payments, frequency)[0]
+    solvable = (prices > 0) & (pv_lower >= prices) & (pv_upper <= prices)
+
+    # Start from the yield of a zero-coupon bond at the cash-weighted average time
+    cash = payments.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average_time = (times * payments).sum(axis=1) / cash
+        y = np.log(cash / prices) / average_time
+    y = np.where(np.isfinite(y), y, 0.0)
+    y = np.clip(y, lower + 1e-6, upper - 1e-6)
+
+    status = np.where(solvable, YTM_MAX_ITERATIONS, YTM_NO_SOLUTION)
+    active = np.nonzero(solvable)[0]
+    for _ in range(max_iter):
+        if len(active) == 0:
+            break
+
+        y_active = y[active]
+        pv, pv_prime, _ = _ytm_terms(y_active, times[active], payments[active], frequency[active])
+        residual = pv - prices[active]
+
+        # Price is decreasing in the yield, so a positive residual means the root is above
+        lower[active] = np.where(residual > 0, y_active, lower[active])
+        upper[active] = np.where(residual < 0, y_active, upper[active])
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            y_new = y_active - residual / pv_prime
+        bisect_step = ~((y_new > lower[active]) & (y_new < upper[active]))
+        y_new = np.where(bisect_step, 0.5 * (lower[active] + upper[active]), y_new)
+
+        done = (np.abs(y_new - y_active) <= tolerance) | (residual == 0)
+        y[active] = y_new
+        status[active[done]] = YTM_CONVERGED
+        active = active[~done]
+
+    pv, pv_prime, pv_second = _ytm_terms(y, times, payments, frequency)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        durations = np.where(solvable, -pv_prime / pv, np.nan)
+        convexities = np.where(solvable, pv_second / pv, np.nan)
+
+    return np.where(solvable, 100 * y, np.nan), durations, convexities, status
+
+
+#Columnar portfolio of bonds priced off a shared cashflow grid
+class BondPortfolio:
+    """
+    Columnar store for a portfolio of bonds.  The cashflows of all bonds are stacked into flat
+    arrays with an owner index, so discount factors are evaluated once on the union of the
+    payment dates and reduced to per-bond values with np.bincount.
+
+    Attributes
+    ----------
+    dates: ndarray
+        The payment dates of all cashflows.
+    payments: ndarray
+        The amounts of all cashflows.
+    owners: ndarray
+        For each cashflow, the index of the bond paying it.
+    quantities: ndarray
+        The number of units held of each bond (negative for short positions).
+    unique_dates: ndarray
+        The distinct payment dates, sorted.
+    date_ids: ndarray
+        For each cashflow, the index of its date in the unique_dates attribute.
+    """
+
+    def __init__(self, dates, payments, owners, quantities=1.0, num_bonds=None):
+        self.dates = np.asarray(dates, dtype=float).ravel()
+        self.payments = np.asarray(payments, dtype=float).ravel()
+        self.owners = np.asarray(owners, dtype=np.intp).ravel()
+        if not (len(self.dates) == len(self.payments) == len(self.owners)):
+            raise ValueError("Cashflow dates, payments and owners must have the same length")
+
+        if num_bonds is None:
+            num_bonds = int(self.owners.max()) + 1 if len(self.owners) > 0 else 0
+        self.num_bonds = num_bonds
+        self.quantities = np.broadcast_to(
+            np.asarray(quantities, dtype=float), (num_bonds,)).copy()
+        self.unique_dates, self.date_ids = np.unique(self.dates, return_inverse=True)
+        self.date_ids = self.date_ids.ravel()
+
+    @classmethod
+    def from_bonds(cls, bonds, quantities=1.0):
+        """
+        Builds a portfolio from a sequence of bond objects.
+
+        Parameters
+        ----------
+        bonds: list
+            The bond objects.
+        quantities: float or array_like
+            The number of units held of each bond.
+
+        Returns
+        -------
+        BondPortfolio
+            The columnar portfolio.
+        """
+        dates = []
+        payments = []
+        owners = []
+        for i, bond in enumerate(bonds):
+            dates.extend(bond.get_dates())
+            payments.extend(bond.get_coupons())
+            owners.extend([i] * len(bond))
+        return cls(dates, payments, owners, quantities, num_bonds=len(bonds))
+
+    def __len__(self):
+        return self.num_bonds
+
+    def _live_discount_factors(self, yield_curve, date):
+        """Discount factors on the unique dates, zero for dates before the pricing date"""
+        live = self.unique_dates >= date
+        dfs = np.zeros(len(self.unique_dates))
+        dfs[live] = yield_curve.discount_factors(self.unique_dates[live] - date)
+        return live, dfs
+
+    def price(self, yield_curve, date = 0):
+        """
+        Prices every bond in the portfolio with a specified yield curve.
+
+        Parameters
+        ----------
+        yield_curve: curve
+            The yield curve for pricing the bonds.
+        date: float
+            The date on which to price the bonds (defaults to 0)
+
+        Returns
+        -------
+        ndarray
+            The price of one unit of each bond.
+        """
+        _, dfs = self._live_discount_factors(yield_curve, date)
+        return np.bincount(self.owners, weights=self.payments * dfs[self.date_ids],
+                           minlength=self.num_bonds)
+
+    def value(self, yield_curve, date = 0):
+        """
+        Returns the value of the portfolio, the quantity-weighted sum of the bond prices.
+        """
+        return self.quantities @ self.price(yield_curve, date)
+
+    def cashflow_matrix(self, date = 0):
+        """
+        Returns the cashflows paid from a date on as padded matrices, one row per bond.
+
+        Parameters
+        ----------
+        date: float
+            Cashflows before this date are dropped and times are measured from it
+            (defaults to 0)
+
+        Returns
+        -------
+        tuple of (ndarray, ndarray)
+            The (bonds, cashflows) matrices of payment times and amounts, the latter padded
+            with zeros.
+        """
+        live = np.nonzero(self.dates >= date)[0]
+        live = live[np.lexsort((self.dates[live], self.owners[live]))]
+        owners = self.owners[live]
+
+        counts = np.bincount(owners, minlength=self.num_bonds)
+        starts = np.cumsum(counts) - counts
+        columns = np.arange(len(live)) - starts[owners]
+
+        times = np.zeros((self.num_bonds, counts.max(initial=0)))
+        payments = np.zeros_like(times)
+        times[owners, columns] = self.dates[live] - date
+        payments[owners, columns] = self.payments[live]
+        return times, payments
+
+    def ytm(self, prices, date = 0, frequency = None):
+        """
+        Calculates the yields-to-maturity, modified durations and convexities of every bond in
+        the portfolio with ytm_batch.
+
+        Parameters
+        ----------
+        prices: array_like
+            The price of each bond.
+        date: float
+            The date on which the bonds are priced (defaults to 0)
+        frequency: int or array_like
+            The compounding frequency of the yields.  By default it is inferred from the
+            spacing of the first two remaining payments as in relative_bond.YTM, with
+            continuous compounding for bonds with a single payment left.
+
+        Returns
+        -------
+        tuple of (ndarray, ndarray, ndarray, ndarray)
+            As returned by ytm_batch.
+        """
+        times, payments = self.cashflow_matrix(date)
+        if frequency is None:
+            frequency = np.zeros(self.num_bonds)
+            if times.shape[1] > 1:
+                spacing = times[:, 1] - times[:, 0]
+                several = (payments[:, 1] != 0) & (spacing > 0)
+                frequency[several] = np.round(1.0 / spacing[several])
+
+        return ytm_batch(times, payments, prices, frequency)
+
+    def bucketed_dv01(self, yield_curve, date = 0, aggregate = False):
+        """
+        Sensitivities of the bond prices to a one basis point rise in each defining rate of
+        the curve, computed analytically from the interpolator weights rather than by bumping
+        and rebuilding the curve once per pillar.
+
+        Parameters
+        ----------
+        yield_curve: curve
+            The curve used to price the bonds.
+        date: float
+            The date on which to price the bonds (defaults to 0)
+        aggregate: bool
+            If True, returns the quantity-weighted sensitivities of the whole portfolio.
+
+        Returns
+        -------
+        ndarray
+            A (len(portfolio), len(yield_curve)) matrix whose entry (i, j) is the first order
+            change in the price of bond i when rate j of the curve rises by one basis point,
+            or its quantity-weighted column sums if aggregate is True.
+        """
+        dv01 = np.zeros((self.num_bonds, len(yield_curve)))
+        live, dfs = self._live_discount_factors(yield_curve, date)
+        if np.any(live):
+            # dPV/dr_j = sum over cashflows of -t * c * DF(t) * d r(t) / d r_j
+            times = self.unique_dates - date
+            weights = np.zeros((len(self.unique_dates), len(yield_curve)))
+            weights[live] = yield_curve.interpolator.weights_many(times[live])
+
+            exposures = -times[self.date_ids] * self.payments * dfs[self.date_ids]
+            dv01 = bucket_exposures(self.owners, self.date_ids, exposures, self.num_bonds, weights)
+
+        dv01 *= 0.0001
+        if aggregate:
+            return self.quantities @ dv01
+        return dv01
+
+
+#Reduction of cashflow sensitivities to pillar risk, shared by bond and swap portfolios
+def bucket_exposures(owners, date_ids, exposures, num_owners, weights):
+    """
+    Sums per-cashflow sensitivities into per-instrument sensitivities to the defining rates of
+    a curve with a single product: the sparse (instruments, dates) exposure matrix times the
+    (dates, pillars) interpolation weights.
+
+    Parameters
+    ----------
+    owners: ndarray
+        The instrument of each cashflow.
+    date_ids: ndarray
+        The index of each cashflow's date in the rows of weights.
+    exposures: ndarray
+        The sensitivity of each cashflow's value to the zero rate at its date.
+    num_owners: int
+        The number of instruments.
+    weights: ndarray
+        The (dates, pillars) weights of the pillar rates in the zero rate of each date.
+
+    Returns
+    -------
+    ndarray
+        The (instruments, pillars) sensitivities.
+    """
+    # Scipy is only imported when risk is requested; duplicate entries are summed
+    from scipy import sparse
+
+    exposure_matrix = sparse.csr_matrix((exposures, (owners, date_ids)),
+                                        shape=(num_owners, weights.shape[0]))
+    return np.asarray(exposure_matrix @ weights)
+
+
+#Bucketed risk of bonds against the defining rates of a curve
+def bucketed_dv01(yield_curve, bonds, date = 0):
+    """
+    Sensitivities of bond prices to a one basis point rise in each defining rate of a curve.
+
+    Parameters
+    ----------
+    yield_curve: curve
+        The curve used to price the bonds.
+    bonds: list
+        The bonds to price.
+    date: float
+        The date on which to price the bonds (defaults to 0)
+
+    Returns
+    -------
+    ndarray
+        A (len(bonds), len(yield_curve)) matrix whose entry (i, j) is the first order change
+        in the price of bond i when rate j of the curve rises by one basis point.
+
+    See Also
+    --------
+    BondPortfolio.bucketed_dv01
+    """
+    return BondPortfolio.from_bonds(bonds).bucketed_dv01(yield_curve, date)
+
+
 #User functions for constructing yield curves and bonds
 def curve_factory(**kwargs):
     """
@@ -1085,6 +2046,13 @@ def curve_factory(**kwargs):
                     A list of bond objects from which the curve will be bootstrapped.
                 Note: For this option, the only available interpolation method is
                 piecewise linear.
+                fit: string
+                    Optional.  Instead of bootstrapping one bond per pillar, fit the curve
+                    to all bonds at once by least squares (see modules.curvefit):
+                        "spline": the rates at the tenors in dates, interpolated with method
+                        and optionally penalized by smoothing
+                        "nss": a Nelson-Siegel-Svensson curve
+                    The prices keyword overrides the bonds' stored market prices.
             3)
                 dates: list
                     A list of floats representing the tenors of the benchmark rates.
@@ -1123,16 +2091,26 @@ def curve_factory(**kwargs):
         else:
             method = "pwlinear"
         
-        if method == "natural" and HASNUMPY == 0:
-            print("Natural cubic spline interpolation requires Numpy")
-            print("Reverting to piecewise linear interpolation")
-            method = "pwlinear"
-
         yield_curve = curve()
         yield_curve.build_from_rates(kwargs["dates"], rates, method)
 
         return yield_curve
 
+    if "bondlist" in kwargs and "fit" in kwargs:
+        # The global fits need Scipy, which is only imported when they are requested
+        from modules import curvefit
+
+        if kwargs["fit"] == "nss":
+            return curvefit.fit_nss_curve(kwargs["bondlist"], kwargs.get("prices"))
+        if kwargs["fit"] == "spline":
+            if "dates" not in kwargs:
+                print("Spline fits need the knot dates")
+                return
+            return curvefit.fit_spline_curve(kwargs["bondlist"], kwargs["dates"], kwargs.get("prices"),
+                                             kwargs.get("method", "pwlinear"), kwargs.get("smoothing", 0.0))
+        print("Unrecognized fit: use \"spline\" or \"nss\"")
+        return
+
     if "bondlist" in kwargs:
         if "method" in kwargs and kwargs["method"] is not "pwlinear":
             print("For building curves from bonds, only piecewise linear interpolation is available")
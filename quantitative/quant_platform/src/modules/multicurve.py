@@ -0,0 +1,320 @@
+"""Multi-curve framework: a discounting curve and projection curves on a shared pillar grid"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from modules.fixedincome import (catmull_rom_interpolator, curve, natural_spline_interpolator,
+                                 pwlinear_interpolator)
+from modules.swaps import payment_schedule
+
+INTERPOLATORS = {
+    "pwlinear": pwlinear_interpolator,
+    "hermite": catmull_rom_interpolator,
+    "natural": natural_spline_interpolator,
+}
+
+
+class SwapQuote(NamedTuple):
+    """
+    Market quote of a par swap, fixed against the floating rate projected from one curve.
+
+    An OIS swap projects from the discounting curve itself, and a quote with a single
+    floating period is a deposit.  Schedules run backwards from the maturity, so a short
+    first period is a front stub.
+
+    Attributes
+    ----------
+    projection: str
+        The name of the curve the floating leg is projected from.
+    maturity: float
+        The maturity of the swap, in years.
+    rate: float
+        The par swap rate (as a percentage).
+    fixed_frequency: int
+        The number of fixed payments per year.
+    float_frequency: int
+        The number of floating payments per year.
+    """
+    projection: str
+    maturity: float
+    rate: float
+    fixed_frequency: int = 1
+    float_frequency: int = 1
+
+
+class MultiCurve:
+    """
+    Container for a discounting curve (typically OIS) and projection curves per floating
+    tenor, all interpolated on the same pillar grid.
+
+    Since the grid is shared, the interpolation weights of a set of dates are the same for
+    every curve, so evaluating all curves is one matrix product with the rates matrix.  The
+    curves are bootstrapped jointly from par swap quotes with a single Newton solve on the
+    analytic Jacobian.
+
+    Attributes
+    ----------
+    tenors: ndarray
+        The shared pillar tenors.
+    names: list
+        The names of the curves.
+    discount: str
+        The name of the discounting curve.
+    method: str
+        The interpolation method: "pwlinear", "hermite" or "natural".
+    rates: ndarray
+        The (curves, tenors) matrix of continuously compounded zero rates at the pillars, as
+        decimals.
+    """
+
+    def __init__(self, tenors, names=("OIS",), discount=None, method="pwlinear"):
+        if method not in INTERPOLATORS:
+            raise ValueError("Unrecognized interpolation method: {}".format(method))
+
+        self.tenors = np.asarray(tenors, dtype=float)
+        if np.any(np.diff(self.tenors) <= 0):
+            raise ValueError("Pillar tenors must be increasing")
+
+        self.names = list(names)
+        self.discount = self.names[0] if discount is None else discount
+        if self.discount not in self.names:
+            raise ValueError("Unknown discounting curve: {}".format(self.discount))
+
+        self.method = method
+        self.rates = np.zeros((len(self.names), len(self.tenors)))
+        # Weights depend on the abscissae only, so a single interpolator serves every curve
+        self._interpolator = INTERPOLATORS[method](self.tenors.tolist(), [0.0] * len(self.tenors))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _index(self, name):
+        try:
+            return self.names.index(name)
+        except ValueError:
+            raise ValueError("Unknown curve: {}".format(name)) from None
+
+    def weights(self, times):
+        """
+        Returns the (len(times), len(tenors)) interpolation weights of the pillar rates, the
+        same for every curve.
+        """
+        return self._interpolator.weights_many(np.asarray(times, dtype=float))
+
+    def zero_rates(self, times, name=None):
+        """
+        Evaluates the continuously compounded zero rates of the curves.
+
+        Parameters
+        ----------
+        times: array_like
+            The tenors at which to evaluate the rates.
+        name: str
+            The curve to evaluate, or None for all curves.
+
+        Returns
+        -------
+        ndarray
+            The zero rates (as percentages), with a leading curve axis if name is None.
+        """
+        times = np.asarray(times, dtype=float)
+        rates = self.rates if name is None else self.rates[self._index(name)]
+        values = rates @ self.weights(times.ravel()).T
+        return 100 * values.reshape(rates.shape[:-1] + times.shape)
+
+    def discount_factors(self, times, name=None):
+        """
+        Evaluates the discount factors of the curves, by default of the discounting curve.
+
+        Parameters
+        ----------
+        times: array_like
+            The tenors at which to evaluate the discount factors.
+        name: str
+            The curve to evaluate (defaults to the discounting curve).
+
+        Returns
+        -------
+        ndarray
+            The discount factors.
+        """
+        times = np.asarray(times, dtype=float)
+        name = self.discount if name is None else name
+        return np.exp(-self.zero_rates(times, name) / 100 * times)
+
+    def forward_rates(self, starts, maturities, name):
+        """
+        Evaluates the simply compounded forward rates projected from a curve.
+
+        Parameters
+        ----------
+        starts: array_like
+            The start dates of the accrual periods.
+        maturities: array_like
+            The end dates of the accrual periods.
+        name: str
+            The projection curve.
+
+        Returns
+        -------
+        ndarray
+            The forward rates (as percentages).
+        """
+        starts, maturities = np.broadcast_arrays(np.asarray(starts, dtype=float),
+                                                 np.asarray(maturities, dtype=float))
+        if not np.all(maturities > starts):
+            raise ValueError("Maturity dates must be later than start dates")
+
+        rates = self.zero_rates(np.stack([starts, maturities]), name) / 100
+        log_ratio = maturities * rates[1] - starts * rates[0]
+        return 100 * np.expm1(log_ratio) / (maturities - starts)
+
+    def curve(self, name=None):
+        """
+        Returns one of the curves as a single-curve curve object, by default the discounting
+        curve.
+        """
+        name = self.discount if name is None else name
+        single = curve()
+        single.build_from_rates(self.tenors.tolist(), self.rates[self._index(name)].tolist(),
+                                self.method)
+        return single
+
+    def _instrument_terms(self, quotes):
+        """
+        Flattens the legs of the quotes into per-payment arrays on the union of their dates.
+        """
+        fixed = ([], [], [])        # owner, date, accrual * rate
+        floating = ([], [], [], [])  # owner, start date, end date, projection curve
+
+        for i, quote in enumerate(quotes):
+            pay_dates, accruals = payment_schedule(0.0, quote.maturity, quote.fixed_frequency)
+            fixed[0].extend([i] * len(pay_dates))
+            fixed[1].extend(pay_dates)
+            fixed[2].extend(accruals * quote.rate / 100)
+
+            pay_dates, _ = payment_schedule(0.0, quote.maturity, quote.float_frequency)
+            starts = np.concatenate([[0.0], pay_dates[:-1]])
+            floating[0].extend([i] * len(pay_dates))
+            floating[1].extend(starts)
+            floating[2].extend(pay_dates)
+            floating[3].extend([self._index(quote.projection)] * len(pay_dates))
+
+        unique_dates, inverse = np.unique(np.concatenate([fixed[1], floating[1], floating[2]]),
+                                          return_inverse=True)
+        inverse = inverse.ravel()
+        n_fixed = len(fixed[1])
+        n_float = len(floating[1])
+        fixed_ids = inverse[:n_fixed]
+        start_ids = inverse[n_fixed:n_fixed + n_float]
+        end_ids = inverse[n_fixed + n_float:]
+
+        return (unique_dates,
+                (np.array(fixed[0], dtype=np.intp), fixed_ids, np.array(fixed[2])),
+                (np.array(floating[0], dtype=np.intp), start_ids, end_ids,
+                 np.array(floating[3], dtype=np.intp)))
+
+    def bootstrap(self, quotes, tolerance=1e-12, max_iter=20):
+        """
+        Jointly bootstraps all curves from par swap quotes with Newton's method.
+
+        The unknowns are the pillar rates of every curve and the equations are the par
+        conditions of the quotes, expressed as the PV of a unit-notional receiver swap:
+
+            rate * sum_i tau_i P_d(t_i) - sum_j (P_p(s_j) / P_p(e_j) - 1) P_d(e_j) = 0
+
+        with P_d the discounting curve and P_p the projection curve.  OIS quotes project from
+        the discounting curve itself, so their floating leg telescopes to 1 - P_d(T).  The
+        Jacobian is assembled analytically from the shared interpolation weights, so each
+        iteration evaluates every curve once and solves one dense linear system.
+
+        Parameters
+        ----------
+        quotes: list of SwapQuote
+            The market quotes, as many as there are unknown pillar rates.
+        tolerance: float
+            Convergence tolerance on the largest par condition residual.
+        max_iter: int
+            Maximum number of Newton iterations.
+
+        Returns
+        -------
+        int
+            The number of Newton iterations used.
+        """
+        num_curves = len(self.names)
+        num_tenors = len(self.tenors)
+        if len(quotes) != num_curves * num_tenors:
+            raise ValueError("Expected {} quotes for {} curves of {} pillars, got {}".format(
+                num_curves * num_tenors, num_curves, num_tenors, len(quotes)))
+
+        unique_dates, fixed, floating = self._instrument_terms(quotes)
+        fixed_owner, fixed_ids, fixed_amounts = fixed
+        float_owner, start_ids, end_ids, projections = floating
+        weights = self.weights(unique_dates)
+        discount = self._index(self.discount)
+        num_quotes = len(quotes)
+        num_dates = len(unique_dates)
+
+        # Start from flat curves at the average quote of each curve
+        rates = np.zeros((num_curves, num_tenors))
+        for c in range(num_curves):
+            curve_quotes = [q.rate for q in quotes if self._index(q.projection) == c]
+            rates[c] = np.mean(curve_quotes) / 100 if curve_quotes else 0.0
+
+        for iteration in range(1, max_iter + 1):
+            zero = rates @ weights.T                     # (curves, dates)
+            log_dfs = -zero * unique_dates
+            dfs = np.exp(log_dfs)
+
+            fixed_pv = fixed_amounts * dfs[discount, fixed_ids]
+            ratio = np.exp(log_dfs[projections, start_ids] - log_dfs[projections, end_ids])
+            float_df = dfs[discount, end_ids]
+            residual = np.bincount(fixed_owner, weights=fixed_pv, minlength=num_quotes) \
+                - np.bincount(float_owner, weights=(ratio - 1.0) * float_df, minlength=num_quotes)
+
+            if np.max(np.abs(residual)) <= tolerance:
+                self.rates = rates
+                return iteration - 1
+
+            # Derivatives with respect to the zero rate of each (curve, date), reduced to the
+            # pillars with the interpolation weights:
+            #   d P(t) / d z(t) = -t P(t)
+            #   d (P_p(s) / P_p(e)) / d z_p(s) = -s ratio,  d / d z_p(e) = e ratio
+            sensitivities = np.zeros((num_quotes, num_curves, num_dates))
+            np.add.at(sensitivities, (fixed_owner, discount, fixed_ids),
+                      -unique_dates[fixed_ids] * fixed_pv)
+            np.add.at(sensitivities, (float_owner, discount, end_ids),
+                      unique_dates[end_ids] * (ratio - 1.0) * float_df)
+            np.add.at(sensitivities, (float_owner, projections, start_ids),
+                      unique_dates[start_ids] * ratio * float_df)
+            np.add.at(sensitivities, (float_owner, projections, end_ids),
+                      -unique_dates[end_ids] * ratio * float_df)
+            jacobian = (sensitivities @ weights).reshape(num_quotes, num_curves * num_tenors)
+
+            rates = rates - np.linalg.solve(jacobian, residual).reshape(num_curves, num_tenors)
+
+        raise ValueError("Bootstrap did not converge in {} iterations".format(max_iter))
+
+    def par_rates(self, quotes):
+        """
+        Returns the model par rates (as percentages) of swaps described by quotes, whose rate
+        fields are ignored.
+        """
+        quotes = [quote._replace(rate=100.0) for quote in quotes]
+        unique_dates, fixed, floating = self._instrument_terms(quotes)
+        fixed_owner, fixed_ids, accruals = fixed
+        float_owner, start_ids, end_ids, projections = floating
+        discount = self._index(self.discount)
+
+        log_dfs = -(self.rates @ self.weights(unique_dates).T) * unique_dates
+        dfs = np.exp(log_dfs)
+        annuity = np.bincount(fixed_owner, weights=accruals * dfs[discount, fixed_ids],
+                              minlength=len(quotes))
+        floating_pv = np.bincount(
+            float_owner,
+            weights=np.expm1(log_dfs[projections, start_ids] - log_dfs[projections, end_ids])
+            * dfs[discount, end_ids],
+            minlength=len(quotes))
+        return 100 * floating_pv / annuity
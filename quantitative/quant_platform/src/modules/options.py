@@ -22,24 +22,390 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from math import exp, log, sqrt
-from scipy.stats import norm
-
-HASNUMPY = 1
-try:
-    import numpy as np
-except ImportError:
-    print("Plotting functions require Numpy")
-    print("Plotting functions inoperable")
-    HASNUMPY = 0
-
-HASMATPLOTLIB = 1
-try:
-    import matplotlib.pyplot as plt
-except ImportError:
-    print("Plotting functions require Matplotlib")
-    print("Plotting functions inoperable")
-    HASMATPLOTLIB = 0
+from math import erfc, exp, inf, log, pi, sqrt
+
+# Numpy is a hard dependency of scipy, so it is always available to the pricing kernels
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+from modules.plotting import pyplot as _pyplot
+
+
+#Special function backends for the standard normal distribution
+_SQRT2 = sqrt(2.0)
+_SQRT_2PI = sqrt(2.0 * pi)
+
+
+def _erfc_cdf(x):
+    if isinstance(x, (int, float)):
+        return 0.5 * erfc(-x / _SQRT2)
+    return ndtr(x)
+
+
+def _erfc_pdf(x):
+    if isinstance(x, (int, float)):
+        return exp(-0.5 * x * x) / _SQRT_2PI
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def _scipy_cdf(x):
+    from scipy.stats import norm
+    return norm.cdf(x)
+
+
+def _scipy_pdf(x):
+    from scipy.stats import norm
+    return norm.pdf(x)
+
+
+def _scipy_ppf(p):
+    from scipy.stats import norm
+    return norm.ppf(p)
+
+
+# Available backends as (cdf, pdf, ppf) triples. "erfc" evaluates scalars with math.erfc and
+# arrays with the scipy.special ufuncs; "scipy" routes everything through scipy.stats.norm.
+# Further backends can be registered by adding an entry.
+NORM_BACKENDS = {
+    "erfc": (_erfc_cdf, _erfc_pdf, ndtri),
+    "scipy": (_scipy_cdf, _scipy_pdf, _scipy_ppf),
+}
+
+# The backend used by every function in this module
+NORM_BACKEND = "erfc"
+
+
+def set_norm_backend(name):
+    """
+        Selects the special function backend used by the options module.
+
+        Parameters
+        ----------
+        name: string
+            A key of NORM_BACKENDS, e.g. "erfc" (default) or "scipy".
+
+        Returns
+        -------
+        None
+    """
+
+    global NORM_BACKEND
+
+    if name not in NORM_BACKENDS:
+        raise ValueError("Unknown normal distribution backend: {}".format(name))
+
+    NORM_BACKEND = name
+
+
+def norm_cdf(x):
+    """Standard normal cumulative distribution function using the selected backend."""
+    return NORM_BACKENDS[NORM_BACKEND][0](x)
+
+
+def norm_pdf(x):
+    """Standard normal probability density function using the selected backend."""
+    return NORM_BACKENDS[NORM_BACKEND][1](x)
+
+
+def norm_ppf(p):
+    """Inverse of the standard normal cumulative distribution using the selected backend."""
+    return NORM_BACKENDS[NORM_BACKEND][2](p)
+
+
+# Option type flags accepted by the vectorized functions
+CALL = 1
+PUT = -1
+
+
+def _option_sign(flag):
+    """
+        Maps option type flags to +1.0 for calls and -1.0 for puts.
+
+        Parameters
+        ----------
+        flag: int, bool, string or array_like
+            CALL/PUT (+1/-1), True/False or "call"/"put".
+
+        Returns
+        -------
+        ndarray
+            +1.0 (call) and -1.0 (put) values, a float for a single flag.
+    """
+
+    if isinstance(flag, str):
+        return 1.0 if flag == "call" else -1.0
+    if isinstance(flag, (int, float)):
+        return 1.0 if flag > 0 else -1.0
+
+    flag = np.asarray(flag)
+    if flag.dtype.kind in "US":
+        return np.where(flag == "call", 1.0, -1.0)
+    return np.where(flag > 0, 1.0, -1.0)
+
+
+def _unwrap(value):
+    """Returns a numpy scalar for 0-d results so scalar callers get a float back."""
+    if isinstance(value, np.ndarray) and value.ndim == 0:
+        return value[()]
+    return value
+
+
+def _bs_terms(spot, time, strike, expiry, vol, rate):
+    """
+        Computes the intermediate quantities shared by the Black-Scholes price and Greeks.
+
+        Inputs are broadcast against each other. Where the option has expired or the
+        volatility is zero, d1 and d2 are set to +/- infinity so that the price collapses to
+        the discounted intrinsic value and the spot-derivatives to their limits. When every
+        input is a scalar the terms are computed with the math module and returned as floats.
+
+        Returns
+        -------
+        tuple
+            (spot, strike, tau, vol, rate, sqrt_tau, vol_sqrt_tau, discount, d1, d2) with vol
+            and rate as decimals, tau the (non-negative) time to expiry and vol_sqrt_tau
+            replaced by 1 where the option is not live.
+    """
+
+    if all(isinstance(arg, (int, float)) for arg in (spot, time, strike, expiry, vol, rate)):
+        return _bs_terms_scalar(spot, time, strike, expiry, vol, rate)
+
+    spot = np.asarray(spot, dtype=float)
+    strike = np.asarray(strike, dtype=float)
+    tau = np.asarray(expiry, dtype=float) - np.asarray(time, dtype=float)
+    vol = np.asarray(vol, dtype=float) / 100
+    rate = np.asarray(rate, dtype=float) / 100
+
+    live = (tau > 0) & (vol > 0)
+    tau = np.maximum(tau, 0.0)
+    sqrt_tau = np.sqrt(tau)
+    vol_sqrt_tau = np.where(live, vol * sqrt_tau, 1.0)
+    discount = np.exp(-rate * tau)
+
+    with np.errstate(divide="ignore"):
+        log_moneyness = np.log(spot / strike)
+    limit = np.where(spot >= strike * discount, np.inf, -np.inf)
+    d1 = np.where(live, (log_moneyness + (rate + vol**2 / 2) * tau) / vol_sqrt_tau, limit)
+    d2 = np.where(live, d1 - vol_sqrt_tau, limit)
+
+    return spot, strike, tau, vol, rate, sqrt_tau, vol_sqrt_tau, discount, d1, d2
+
+
+def _bs_terms_scalar(spot, time, strike, expiry, vol, rate):
+    """Scalar counterpart of _bs_terms using the math module only."""
+
+    vol /= 100
+    rate /= 100
+    tau = expiry - time
+    live = tau > 0 and vol > 0
+    tau = max(tau, 0.0)
+    sqrt_tau = sqrt(tau)
+    discount = exp(-rate * tau)
+
+    if live:
+        vol_sqrt_tau = vol * sqrt_tau
+        d1 = (log(spot / strike) + (rate + vol**2 / 2) * tau) / vol_sqrt_tau
+        d2 = d1 - vol_sqrt_tau
+    else:
+        vol_sqrt_tau = 1.0
+        d1 = d2 = inf if spot >= strike * discount else -inf
+
+    return spot, strike, tau, vol, rate, sqrt_tau, vol_sqrt_tau, discount, d1, d2
+
+
+def bs_price(spot, time, strike, expiry, vol, rate, flag=CALL):
+    """
+        Calculates Black-Scholes prices for arrays of options in a single vectorized pass.
+
+        All numeric arguments are broadcast against each other, so any of them may be a
+        scalar or an array. Expired options (time >= expiry) are valued at intrinsic value.
+
+        Parameters
+        ----------
+        spot: float or array_like
+            The spot price of the underlying.
+        time: float or array_like
+            The time when the price is to be evaluated.
+        strike: float or array_like
+            The strike price of the option.
+        expiry: float or array_like
+            The expiration date of the option.
+        vol: float or array_like
+            The implied volatility to use to price the option (as a percentage).
+        rate: float or array_like
+            The risk free interest rate to use in the model (as a percentage).
+        flag: int, bool, string or array_like
+            The option type: CALL/PUT, True/False or "call"/"put" (defaults to CALL).
+
+        Returns
+        -------
+        float or ndarray
+            The Black-Scholes option prices.
+    """
+
+    w = _option_sign(flag)
+    spot, strike, tau, vol, rate, sqrt_tau, vol_sqrt_tau, discount, d1, d2 = \
+        _bs_terms(spot, time, strike, expiry, vol, rate)
+    return _unwrap(w * (spot * norm_cdf(w * d1) - strike * discount * norm_cdf(w * d2)))
+
+
+def bs_delta(spot, time, strike, expiry, vol, rate, flag=CALL):
+    """
+        Calculates Black-Scholes deltas for arrays of options in a single vectorized pass.
+
+        Parameters
+        ----------
+        See bs_price.
+
+        Returns
+        -------
+        float or ndarray
+            The Black-Scholes option deltas.
+    """
+
+    w = _option_sign(flag)
+    d1 = _bs_terms(spot, time, strike, expiry, vol, rate)[8]
+    return _unwrap(w * norm_cdf(w * d1))
+
+
+def bs_gamma(spot, time, strike, expiry, vol, rate, flag=CALL):
+    """
+        Calculates Black-Scholes gammas for arrays of options in a single vectorized pass.
+        Gamma is the same for calls and puts; flag is accepted for a uniform signature.
+
+        Parameters
+        ----------
+        See bs_price.
+
+        Returns
+        -------
+        float or ndarray
+            The Black-Scholes option gammas.
+    """
+
+    spot, strike, tau, vol, rate, sqrt_tau, vol_sqrt_tau, discount, d1, d2 = \
+        _bs_terms(spot, time, strike, expiry, vol, rate)
+    w = _option_sign(flag)
+    gamma = norm_pdf(d1) / spot / vol_sqrt_tau
+    return _unwrap(gamma * w * w)
+
+
+def bs_theta(spot, time, strike, expiry, vol, rate, flag=CALL):
+    """
+        Calculates Black-Scholes thetas, scaled to the 1 day change in option value due to
+        time decay, for arrays of options in a single vectorized pass.
+
+        Parameters
+        ----------
+        See bs_price.
+
+        Returns
+        -------
+        float or ndarray
+            The 1 day Black-Scholes option thetas.
+    """
+
+    w = _option_sign(flag)
+    spot, strike, tau, vol, rate, sqrt_tau, vol_sqrt_tau, discount, d1, d2 = \
+        _bs_terms(spot, time, strike, expiry, vol, rate)
+    theta = -spot * vol**2 * norm_pdf(d1) / 2 / vol_sqrt_tau \
+        - w * rate * strike * discount * norm_cdf(w * d2)
+    return _unwrap(theta / 365)
+
+
+def bs_vega(spot, time, strike, expiry, vol, rate, flag=CALL):
+    """
+        Calculates Black-Scholes vegas (per 1% change in volatility) for arrays of options
+        in a single vectorized pass. Vega is the same for calls and puts.
+
+        Parameters
+        ----------
+        See bs_price.
+
+        Returns
+        -------
+        float or ndarray
+            The Black-Scholes option vegas.
+    """
+
+    spot, strike, tau, vol, rate, sqrt_tau, vol_sqrt_tau, discount, d1, d2 = \
+        _bs_terms(spot, time, strike, expiry, vol, rate)
+    w = _option_sign(flag)
+    vega = spot * sqrt_tau * norm_pdf(d1) / 100
+    return _unwrap(vega * w * w)
+
+
+# Fields of the record returned by bs_greeks
+GREEKS_DTYPE = np.dtype([
+    ("price", float),
+    ("delta", float),
+    ("gamma", float),
+    ("vega", float),
+    ("theta", float),
+    ("rho", float),
+    ("vanna", float),
+    ("volga", float),
+    ("charm", float),
+])
+
+
+def bs_greeks(spot, time, strike, expiry, vol, rate, flag=CALL):
+    """
+        Calculates the Black-Scholes price and first and second order Greeks from a single
+        shared evaluation of d1, d2 and the normal pdf/cdf.
+
+        Scalar inputs return a single record, array inputs a structured array with the same
+        broadcast shape; fields are accessed by name, e.g. greeks["delta"].
+
+        Parameters
+        ----------
+        See bs_price.
+
+        Returns
+        -------
+        numpy.void or ndarray with dtype GREEKS_DTYPE
+            price: the option price.
+            delta: the derivative of the price with respect to spot.
+            gamma: the second derivative of the price with respect to spot.
+            vega: the price change for a 1% change in volatility.
+            theta: the 1 day change in price due to time decay.
+            rho: the price change for a 1% change in the interest rate.
+            vanna: the delta change for a 1% change in volatility.
+            volga: the vega change for a 1% change in volatility.
+            charm: the 1 day change in delta due to time decay.
+    """
+
+    w = _option_sign(flag)
+    spot, strike, tau, vol, rate, sqrt_tau, vol_sqrt_tau, discount, d1, d2 = \
+        _bs_terms(spot, time, strike, expiry, vol, rate)
+
+    live = np.isfinite(d1)
+    safe_d1 = np.where(live, d1, 0.0)
+    safe_d2 = np.where(live, d2, 0.0)
+    safe_vol = np.where(live, vol, 1.0)
+    safe_tau = np.where(live, tau, 1.0)
+
+    cdf_d1 = norm_cdf(w * d1)
+    cdf_d2 = norm_cdf(w * d2)
+    pdf_d1 = norm_pdf(d1)
+    strike_discount = strike * discount
+    vega = spot * sqrt_tau * pdf_d1
+
+    out = np.empty(np.broadcast(w, d1).shape, dtype=GREEKS_DTYPE)
+    out["price"] = w * (spot * cdf_d1 - strike_discount * cdf_d2)
+    out["delta"] = w * cdf_d1
+    out["gamma"] = pdf_d1 / spot / vol_sqrt_tau
+    out["vega"] = vega / 100
+    out["theta"] = (-spot * vol**2 * pdf_d1 / 2 / vol_sqrt_tau
+                    - w * rate * strike_discount * cdf_d2) / 365
+    out["rho"] = w * strike_discount * tau * cdf_d2 / 100
+    out["vanna"] = np.where(live, -pdf_d1 * safe_d2 / safe_vol, 0.0) / 100
+    out["volga"] = np.where(live, vega * safe_d1 * safe_d2 / safe_vol, 0.0) / 10000
+    out["charm"] = np.where(live, -pdf_d1 * (2 * rate * safe_tau - safe_d2 * vol_sqrt_tau)
+                            / (2 * safe_tau * vol_sqrt_tau), 0.0) / 365
+
+    return out[()] if out.ndim == 0 else out
 
 
 def BSCall(spot, time, strike, expiry, vol, rate):
@@ -67,11 +433,7 @@ def BSCall(spot, time, strike, expiry, vol, rate):
             The Black-Scholes call price.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    d2 = (log(spot/strike)+(rate-vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    return spot*norm.cdf(d1)-strike * exp(-rate*(expiry - time))*norm.cdf(d2)
+    return bs_price(spot, time, strike, expiry, vol, rate, CALL)
 
 def BSPut(spot, time, strike, expiry, vol, rate):
     """
@@ -98,11 +460,7 @@ def BSPut(spot, time, strike, expiry, vol, rate):
             The Black-Scholes put price.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    d2 = (log(spot/strike)+(rate-vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    return -spot*norm.cdf(-d1) + strike * exp(-rate*(expiry - time))*norm.cdf(-d2)
+    return bs_price(spot, time, strike, expiry, vol, rate, PUT)
 
 def BSCall_Delta(spot, time, strike, expiry, vol, rate):
     """
@@ -129,10 +487,7 @@ def BSCall_Delta(spot, time, strike, expiry, vol, rate):
             The Black-Scholes call delta.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    return norm.cdf(d1)
+    return bs_delta(spot, time, strike, expiry, vol, rate, CALL)
 
 def BSPut_Delta(spot, time, strike, expiry, vol, rate):
     """
@@ -159,10 +514,7 @@ def BSPut_Delta(spot, time, strike, expiry, vol, rate):
             The Black-Scholes put delta.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    return -norm.cdf(-d1)
+    return bs_delta(spot, time, strike, expiry, vol, rate, PUT)
 
 def BSCall_Gamma(spot, time, strike, expiry, vol, rate):
     """
@@ -189,10 +541,7 @@ def BSCall_Gamma(spot, time, strike, expiry, vol, rate):
             The Black-Scholes call gamma.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    return norm.pdf(d1)/spot/vol/sqrt(expiry-time)
+    return bs_gamma(spot, time, strike, expiry, vol, rate, CALL)
 
 def BSPut_Gamma(spot, time, strike, expiry, vol, rate):
     """
@@ -219,10 +568,7 @@ def BSPut_Gamma(spot, time, strike, expiry, vol, rate):
             The Black-Scholes put gamma.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    return norm.pdf(d1)/spot/vol/sqrt(expiry-time)
+    return bs_gamma(spot, time, strike, expiry, vol, rate, PUT)
 
 def BSCall_Theta(spot, time, strike, expiry, vol, rate):
     """
@@ -250,12 +596,7 @@ def BSCall_Theta(spot, time, strike, expiry, vol, rate):
             The 1 day Black-Scholes call theta.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    d2 = (log(spot/strike)+(rate-vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    theta = -spot*vol*norm.pdf(d1)/2/sqrt(expiry - time) - rate * strike *exp(-rate *(expiry-time)) * norm.cdf(d2)
-    return theta / 365
+    return bs_theta(spot, time, strike, expiry, vol, rate, CALL)
 
 def BSPut_Theta(spot, time, strike, expiry, vol, rate):
     """
@@ -283,12 +624,7 @@ def BSPut_Theta(spot, time, strike, expiry, vol, rate):
             The 1 day Black-Scholes put theta.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    d2 = (log(spot/strike)+(rate-vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    theta = -spot*vol*norm.pdf(d1)/2/sqrt(expiry - time) + rate * strike *exp(-rate *(expiry-time)) * norm.cdf(-d2)
-    return theta / 365
+    return bs_theta(spot, time, strike, expiry, vol, rate, PUT)
 
 def BSCall_Vega(spot, time, strike, expiry, vol, rate):
     """
@@ -315,10 +651,7 @@ def BSCall_Vega(spot, time, strike, expiry, vol, rate):
             The Black-Scholes call vega.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    return spot*sqrt(expiry - time) * norm.pdf(d1) / 100
+    return bs_vega(spot, time, strike, expiry, vol, rate, CALL)
 
 def BSPut_Vega(spot, time, strike, expiry, vol, rate):
     """
@@ -345,17 +678,144 @@ def BSPut_Vega(spot, time, strike, expiry, vol, rate):
             The Black-Scholes call vega.
     """
 
-    vol /= 100
-    rate /= 100
-    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
-    return spot*sqrt(expiry - time) * norm.pdf(d1) / 100
+    return bs_vega(spot, time, strike, expiry, vol, rate, PUT)
+
 
+# Status codes returned by implied_vol_batch
+IV_CONVERGED = 0
+IV_MAX_ITERATIONS = 1
+IV_BELOW_INTRINSIC = 2
+IV_ABOVE_MAXIMUM = 3
+IV_INVALID_INPUT = 4
 
-def implied_vol(price, spot, strike, expiry, rate):
+
+def _normalized_black(x, sigma):
+    """
+        Normalized Black call price b(x, sigma) for x <= 0 (out-of-the-money calls), with
+        x = log(forward/strike) and sigma the total volatility vol*sqrt(expiry).
     """
-        This function provides a partial implementation of Jaeckel's optimized algorithm
-        for computing implied volatility (https://jaeckel.000webhostapp.com/ByImplication.pdf)
-        Currently, only calls are implemented.
+
+    return np.exp(x/2) * norm_cdf(x/sigma + sigma/2) - np.exp(-x/2) * norm_cdf(x/sigma - sigma/2)
+
+
+def _normalized_vega(x, sigma):
+    """Derivative of the normalized Black price with respect to the total volatility."""
+
+    return np.exp(-0.5 * (x/sigma)**2 - sigma**2/8) / sqrt(2 * np.pi)
+
+
+def implied_vol_batch(price, spot, strike, expiry, rate, flag=CALL, tolerance=1e-10, max_iter=32):
+    """
+        Computes Black-Scholes implied volatilities for a whole option chain at once.
+
+        The inputs are broadcast against each other and every quote is solved simultaneously
+        following Jaeckel's "By Implication" (https://jaeckel.000webhostapp.com/ByImplication.pdf)
+        scheme: prices are normalized, in-the-money options are mapped to out-of-the-money
+        ones through put-call parity, the rational initial guess of the paper is taken on the
+        lower or upper branch, and masked Newton iterations (on the log price for the lower
+        branch) run until every element has converged or max_iter is reached.
+
+        Parameters
+        ----------
+        price: float or array_like
+            The option prices.
+        spot: float or array_like
+            The spot price of the underlying.
+        strike: float or array_like
+            The strike prices of the options.
+        expiry: float or array_like
+            The times to expiration.
+        rate: float or array_like
+            The risk free interest rate to use in the model (as a percentage).
+        flag: int, bool, string or array_like
+            The option type: CALL/PUT, True/False or "call"/"put" (defaults to CALL).
+        tolerance: float
+            Convergence tolerance on the total volatility vol*sqrt(expiry).
+        max_iter: int
+            Maximum number of Newton iterations.
+
+        Returns
+        -------
+        tuple of (ndarray, ndarray)
+            The implied volatilities (as percentages, nan where no solution was found) and
+            the per-element status codes: IV_CONVERGED, IV_MAX_ITERATIONS,
+            IV_BELOW_INTRINSIC, IV_ABOVE_MAXIMUM or IV_INVALID_INPUT.
+    """
+
+    theta = _option_sign(flag)
+    price, spot, strike, expiry, rate, theta = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(spot, dtype=float),
+        np.asarray(strike, dtype=float), np.asarray(expiry, dtype=float),
+        np.asarray(rate, dtype=float) / 100, theta)
+    shape = price.shape
+    price, spot, strike, expiry, rate, theta = (a.ravel() for a in (price, spot, strike, expiry, rate, theta))
+
+    status = np.full(price.shape, IV_CONVERGED, dtype=np.int8)
+    sigma = np.full(price.shape, np.nan)
+
+    valid = np.isfinite(price) & np.isfinite(rate) & (spot > 0) & (strike > 0) & (expiry > 0)
+    status[~valid] = IV_INVALID_INPUT
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.log(spot / strike) + rate * expiry
+        beta = price * np.exp(rate * expiry / 2) / np.sqrt(spot * strike)
+        intrinsic = np.maximum(theta * (np.exp(x/2) - np.exp(-x/2)), 0.0)
+        maximum = np.exp(theta * x / 2)
+
+    below = valid & (beta <= intrinsic)
+    above = valid & ~below & (beta >= maximum)
+    status[below] = IV_BELOW_INTRINSIC
+    status[above] = IV_ABOVE_MAXIMUM
+    solve = np.flatnonzero(valid & ~below & ~above)
+
+    # Out-of-the-money reduction: b(x, sigma, theta) = intrinsic + b(-|x|, sigma, call)
+    x = -np.abs(x[solve])
+    beta = beta[solve] - intrinsic[solve]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma_c = np.sqrt(2 * np.abs(x))
+        b_c = np.where(x < 0, _normalized_black(x, sigma_c), 0.0)
+        lower = beta < b_c
+
+        guess = np.empty(x.shape)
+        guess[lower] = np.sqrt(2 * x[lower]**2
+                               / (np.abs(x[lower]) - 4 * np.log(beta[lower] / b_c[lower])))
+        upper = ~lower
+        pval = (np.exp(x[upper]/2) - beta[upper]) * norm_cdf(-np.sqrt(np.abs(x[upper])/2)) \
+            / (np.exp(x[upper]/2) - b_c[upper])
+        guess[upper] = -2 * norm_ppf(pval)
+
+    converged = np.zeros(x.shape, dtype=bool)
+    active = np.arange(x.size)
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        _x, _sigma, _beta, _lower = x[active], guess[active], beta[active], lower[active]
+        b = _normalized_black(_x, _sigma)
+        vega = _normalized_vega(_x, _sigma)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(_lower, (np.log(b) - np.log(_beta)) * b / vega, (b - _beta) / vega)
+        step = np.where(np.isfinite(step), step, 0.0)
+        new_sigma = _sigma - step
+        new_sigma = np.where(new_sigma > 0, new_sigma, _sigma / 2)
+        guess[active] = new_sigma
+
+        done = np.abs(new_sigma - _sigma) <= tolerance * np.maximum(1.0, _sigma)
+        converged[active[done]] = True
+        active = active[~done]
+
+    status[solve[~converged]] = IV_MAX_ITERATIONS
+    sigma[solve[converged]] = guess[converged]
+
+    vols = 100 * sigma / np.sqrt(np.where(expiry > 0, expiry, np.nan))
+    return vols.reshape(shape)[()], status.reshape(shape)[()]
+
+
+def implied_vol(price, spot, strike, expiry, rate, flag=CALL):
+    """
+        This function computes the Black-Scholes implied volatility of a single option with
+        Jaeckel's optimized algorithm (https://jaeckel.000webhostapp.com/ByImplication.pdf).
+        It is a thin wrapper over implied_vol_batch.
 
         Parameters
         ----------
@@ -364,74 +824,35 @@ def implied_vol(price, spot, strike, expiry, rate):
         spot: float
             The spot price of the underlying.
         strike: float
-            The strike price of the call.
+            The strike price of the option.
         expiry: float
             The time to expiration.
         rate: float
             The risk free interest rate to use in the model (as a percentage).
+        flag: int, bool or string
+            The option type: CALL/PUT, True/False or "call"/"put" (defaults to CALL).
 
         Returns
         -------
         float
             The Black-Scholes implied volatility corresponding to the entered price.
-    """
-
-
-    rate /= 100
-    tolerance = 0.00000001
 
-    theta = 1
-
-    if spot - exp(-rate * expiry) * strike >= price or price >= spot:
-        print("Option price out of range")
-        return
-    
-
-    x=log(exp(rate*expiry)*spot/strike)
-    scaled_price = price * exp(rate*expiry/2) / sqrt(spot*strike)
-
-    def F(sigma):
-        return theta * exp(x/2) * norm.cdf(theta*(x/sigma + sigma/2)) \
-            - theta * exp(-x/2) * norm.cdf(theta*(x/sigma - sigma/2))
-    
-    def Fprime(sigma):
-        return exp(x/2)*norm.pdf(theta*(x/sigma + sigma/2)) * (-x/sigma**2 + 0.5) \
-            - exp(-x/2) * norm.pdf(theta * (x/sigma - sigma/2)) * (-x/sigma**2 - 0.5)
-
-    sigma_c = sqrt(2 * abs(x))
-
-    b_c = F(sigma_c)
-
-    if scaled_price >= b_c:
-        pval = (exp(theta*x/2)-scaled_price) * norm.cdf(-sqrt(abs(x)/2))/(exp(theta*x/2)-b_c)
-        old_sigma = -2 * norm.ppf(pval)
-        new_sigma = old_sigma - (F(old_sigma) - scaled_price)/Fprime(old_sigma)
-
-        while abs(new_sigma - old_sigma) > tolerance:
-            old_sigma = new_sigma
-            new_sigma = old_sigma - (F(old_sigma) - scaled_price)/Fprime(old_sigma)
-
-        return 100*new_sigma/sqrt(expiry)
-    else:
-        if theta * x <= 0:
-            iota = 0
-        else:
-            iota = theta * (exp(x/2) - exp(-x/2))
-        
-        def G(sigma):
-            return log(F(sigma) - iota) - log(scaled_price - iota)
-        
-        def Gprime(sigma):
-            return Fprime(sigma)/(F(sigma) - iota)
+        Raises
+        ------
+        ValueError
+            If the price is outside the no-arbitrage bounds or the solver does not converge.
+    """
 
-        old_sigma = sqrt(2*x**2/(abs(x)-4 * log((scaled_price - iota)/(b_c - iota))))
-        new_sigma = old_sigma - G(old_sigma)/Gprime(old_sigma)
+    vol, status = implied_vol_batch(price, spot, strike, expiry, rate, flag)
 
-        while abs(new_sigma - old_sigma) > tolerance:
-            old_sigma = new_sigma
-            new_sigma = old_sigma - G(old_sigma)/Gprime(old_sigma)
+    if status in (IV_BELOW_INTRINSIC, IV_ABOVE_MAXIMUM):
+        raise ValueError("Option price out of range")
+    if status == IV_INVALID_INPUT:
+        raise ValueError("Invalid option inputs")
+    if status == IV_MAX_ITERATIONS:
+        raise ValueError("Implied volatility did not converge")
 
-        return 100*new_sigma/sqrt(expiry)
+    return vol
 
 
 class option:
@@ -448,6 +869,8 @@ class option:
         Either "call" or "put" indicating the option type.
     """
 
+    # Slots keep per-instance memory down when millions of contracts are held
+    __slots__ = ("strike", "expiry", "type")
 
     def __init__(self, strike=0.0, expiry=0.0, type="call"):
         self.strike = strike
@@ -688,47 +1111,107 @@ class option:
             return BSCall_Theta(spot, time, self.strike, self.expiry, vol, rate)
         else:
             return BSPut_Theta(spot, time, self.strike, self.expiry, vol, rate)
+
+    def greeks(self, spot, time, vol, rate):
+        """
+        Returns the option price and Greeks from a single evaluation (see bs_greeks).
+
+        Parameters
+        ----------
+        spot: float
+            The spot price of the underlying.
+        time: float
+            The date the option should be priced for.
+        vol: float
+            The implied volatility to use for pricing.
+        rate: float
+            The risk free interest rate to use (as a percantage).
+
+        Returns
+        -------
+        numpy.void
+            Record with price, delta, gamma, vega, theta, rho, vanna, volga and charm fields.
+        """
+        if time > self.expiry:
+            print("Evaluation time must precede expiry")
+            return None
+
+        return bs_greeks(spot, time, self.strike, self.expiry, vol, rate, self.type)
     
 
-    def plot_payoff(self):
+    def profile(self, greek, spots=None, time=0.0, vol=None, rate=None):
         """
-        Plots the payoff (at expiration) of the option.
+        Returns the payoff, price or a Greek of the option over a range of spot prices,
+        computed in one vectorized call. No plotting library is needed.
 
         Parameters
         ----------
-        None
+        greek: string
+            One of "payoff", "price", "delta", "gamma", "vega" or "theta".
+        spots: array_like
+            The spot prices to evaluate (defaults to 0.1 to twice the strike in steps of 0.1).
+        time: float
+            The date the option should be priced for (ignored for the payoff).
+        vol: float
+            The implied volatility to use for pricing (ignored for the payoff).
+        rate: float
+            The risk free interest rate to use, as a percantage (ignored for the payoff).
 
         Returns
         -------
-        None
+        tuple of (ndarray, ndarray)
+            The spot prices and the corresponding values.
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
+        if spots is None:
+            spots = np.arange(0.1, 2*self.strike, 0.1)
+        spots = np.asarray(spots, dtype=float)
+
+        if greek == "payoff":
+            return spots, np.maximum(_option_sign(self.type) * (spots - self.strike), 0.0)
+
+        if greek not in _PROFILE_KERNELS:
+            raise ValueError("Unknown profile: {}".format(greek))
+
+        if time > self.expiry:
+            print("Evaluation time must precede expiry")
             return None
-        
-        fig, ax = plt.subplots()
 
+        kernel = _PROFILE_KERNELS[greek]
+        return spots, kernel(spots, time, self.strike, self.expiry, vol, rate, self.type)
 
-        s=np.arange(0.0, 2*self.strike, 0.1)
+    def _plot_profile(self, greek, spots, time, vol, rate, title):
+        plt = _pyplot()
+        if plt is None:
+            return None
 
-        p=[]
-        for spot in s:
-            if self.type == "call":
-                price = max(0, spot - self.strike)
-            else:
-                price = max(0, self.strike - spot)
+        curve = self.profile(greek, spots, time, vol, rate)
+        if curve is None:
+            return None
 
-            p.append(price)
-        
-        payoff = np.array(p)
+        fig, ax = plt.subplots()
 
-        ax.plot(s, payoff)
+        ax.plot(*curve)
+
+        ax.set(xlabel='spot', ylabel=greek,
+            title = title)
 
-        ax.set(xlabel='spot', ylabel='payoff',
-            title = 'Option Payoff')
-        
         plt.show(block=False)
 
+    def plot_payoff(self):
+        """
+        Plots the payoff (at expiration) of the option.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        spots = np.arange(0.0, 2*self.strike, 0.1)
+        self._plot_profile("payoff", spots, 0.0, None, None, 'Option Payoff')
+
 
     def plot_price(self, time, vol, rate):
         """
@@ -747,36 +1230,7 @@ class option:
         -------
         None
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
-            return None
-        
-        if time > self.expiry:
-            print("Evaluation time must precede expiry")
-            return None
-        
-        fig, ax = plt.subplots()
-
-
-        s=np.arange(0.1, 2*self.strike, 0.1)
-
-        p=[]
-        for spot in s:
-            if self.type == "call":
-                price = BSCall(spot, time, self.strike, self.expiry, vol, rate)
-            else:
-                price = BSPut(spot, time, self.strike, self.expiry, vol, rate)
-
-            p.append(price)
-        
-        prices = np.array(p)
-
-        ax.plot(s, prices)
-
-        ax.set(xlabel='spot', ylabel='price',
-            title = 'Option Price vs. Spot Price')
-        
-        plt.show(block=False)
+        self._plot_profile("price", None, time, vol, rate, 'Option Price vs. Spot Price')
     
     
     def plot_delta(self, time, vol, rate):
@@ -796,36 +1250,7 @@ class option:
         -------
         None
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
-            return None
-        
-        if time > self.expiry:
-            print("Evaluation time must precede expiry")
-            return None
-        
-        fig, ax = plt.subplots()
-
-
-        s=np.arange(0.1, 2*self.strike, 0.1)
-
-        d=[]
-        for spot in s:
-            if self.type == "call":
-                delta = BSCall_Delta(spot, time, self.strike, self.expiry, vol, rate)
-            else:
-                delta = BSPut_Delta(spot, time, self.strike, self.expiry, vol, rate)
-
-            d.append(delta)
-        
-        deltas = np.array(d)
-
-        ax.plot(s, deltas)
-
-        ax.set(xlabel='spot', ylabel='delta',
-            title = 'Option Delta vs. Spot Price')
-        
-        plt.show(block=False)
+        self._plot_profile("delta", None, time, vol, rate, 'Option Delta vs. Spot Price')
     
     def plot_gamma(self, time, vol, rate):
         """
@@ -844,36 +1269,7 @@ class option:
         -------
         None
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
-            return None
-        
-        if time > self.expiry:
-            print("Evaluation time must precede expiry")
-            return None
-        
-        fig, ax = plt.subplots()
-
-
-        s=np.arange(0.1, 2*self.strike, 0.1)
-
-        g=[]
-        for spot in s:
-            if self.type == "call":
-                gamma = BSCall_Gamma(spot, time, self.strike, self.expiry, vol, rate)
-            else:
-                gamma = BSPut_Gamma(spot, time, self.strike, self.expiry, vol, rate)
-
-            g.append(gamma)
-        
-        gammas = np.array(g)
-
-        ax.plot(s, gammas)
-
-        ax.set(xlabel='spot', ylabel='gamma',
-            title = 'Option Gamma vs. Spot Price')
-        
-        plt.show(block=False)
+        self._plot_profile("gamma", None, time, vol, rate, 'Option Gamma vs. Spot Price')
 
     
     def plot_vega(self, time, vol, rate):
@@ -893,36 +1289,7 @@ class option:
         -------
         None
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
-            return None
-        
-        if time > self.expiry:
-            print("Evaluation time must precede expiry")
-            return None
-        
-        fig, ax = plt.subplots()
-
-
-        s=np.arange(0.1, 2*self.strike, 0.1)
-
-        v=[]
-        for spot in s:
-            if self.type == "call":
-                vega = BSCall_Vega(spot, time, self.strike, self.expiry, vol, rate)
-            else:
-                vega = BSPut_Vega(spot, time, self.strike, self.expiry, vol, rate)
-
-            v.append(vega)
-        
-        vegas = np.array(v)
-
-        ax.plot(s, vegas)
-
-        ax.set(xlabel='spot', ylabel='vega',
-            title = 'Option Vega vs. Spot Price')
-        
-        plt.show(block=False)
+        self._plot_profile("vega", None, time, vol, rate, 'Option Vega vs. Spot Price')
 
     
     def plot_theta(self, time, vol, rate):
@@ -942,37 +1309,256 @@ class option:
         -------
         None
         """
-        if not HASMATPLOTLIB:
-            print("Plotting functions require Matplotlib")
-            return None
-        
-        if time > self.expiry:
-            print("Evaluation time must precede expiry")
-            return None
-        
-        fig, ax = plt.subplots()
+        self._plot_profile("theta", None, time, vol, rate, 'Option Theta vs. Spot Price')
 
 
-        s=np.arange(0.1, 2*self.strike, 0.1)
+# Vectorized kernels behind option.profile
+_PROFILE_KERNELS = {
+    "price": bs_price,
+    "delta": bs_delta,
+    "gamma": bs_gamma,
+    "vega": bs_vega,
+    "theta": bs_theta,
+}
 
-        t=[]
-        for spot in s:
-            if self.type == "call":
-                theta = BSCall_Theta(spot, time, self.strike, self.expiry, vol, rate)
-            else:
-                theta = BSPut_Theta(spot, time, self.strike, self.expiry, vol, rate)
 
-            t.append(theta)
-        
-        thetas = np.array(t)
+class OptionBook:
+    """
+    Columnar store for a book of option positions, evaluated with the vectorized kernels.
 
-        ax.plot(s, thetas)
+    Attributes
+    ----------
+    strikes: ndarray
+        The strike prices of the positions.
+    expiries: ndarray
+        The expiration dates of the positions, in years.
+    types: ndarray
+        The option type codes of the positions (CALL or PUT).
+    quantities: ndarray
+        The number of contracts held in each position (negative for short positions).
+    underlyings: ndarray
+        The distinct underlying identifiers, sorted.
+    underlying_ids: ndarray
+        For each position, the index of its underlying in the underlyings attribute.
+    """
 
-        ax.set(xlabel='spot', ylabel='theta',
-            title = 'Option Theta vs. Spot Price')
-        
-        plt.show(block=False)
+    def __init__(self, strikes, expiries, types=CALL, quantities=1.0, underlyings=0):
+        strikes, expiries, types, quantities, underlyings = np.broadcast_arrays(
+            np.asarray(strikes, dtype=float), np.asarray(expiries, dtype=float),
+            np.asarray(_option_sign(types), dtype=np.int8), np.asarray(quantities, dtype=float),
+            np.asarray(underlyings))
+
+        self.strikes = np.ascontiguousarray(strikes.ravel())
+        self.expiries = np.ascontiguousarray(expiries.ravel())
+        self.types = np.ascontiguousarray(types.ravel())
+        self.quantities = np.ascontiguousarray(quantities.ravel())
+        self.underlyings, self.underlying_ids = np.unique(underlyings.ravel(), return_inverse=True)
+        self.underlying_ids = self.underlying_ids.ravel()
+
+    @classmethod
+    def from_options(cls, options, quantities=1.0, underlyings=0):
+        """
+        Builds a book from a sequence of option objects.
+
+        Parameters
+        ----------
+        options: list
+            The option objects.
+        quantities: float or array_like
+            The number of contracts held of each option.
+        underlyings: int, string or array_like
+            The identifier of the underlying of each option.
+
+        Returns
+        -------
+        OptionBook
+            The columnar book.
+        """
+        strikes = [contract.strike for contract in options]
+        expiries = [contract.expiry for contract in options]
+        types = [contract.type for contract in options]
+        return cls(strikes, expiries, types, quantities, underlyings)
 
+    def __len__(self):
+        return len(self.strikes)
 
+    def _per_position(self, value):
+        """
+        Expands market data given per underlying (a scalar, a dict keyed by underlying or a
+        sequence aligned with the underlyings attribute) to one value per position.
+        """
+        if isinstance(value, dict):
+            value = [value[underlying] for underlying in self.underlyings.tolist()]
+
+        value = np.asarray(value, dtype=float)
+        if value.ndim == 0:
+            return value
+        if value.shape != self.underlyings.shape:
+            raise ValueError("Expected one value per underlying ({}), got shape {}".format(
+                len(self.underlyings), value.shape))
+        return value[self.underlying_ids]
+
+    def _evaluate(self, kernel, spot, time, vol, rate, aggregate):
+        spot = self._per_position(spot)
+        if not (isinstance(vol, np.ndarray) and vol.shape == self.strikes.shape):
+            vol = self._per_position(vol)
+
+        values = kernel(spot, time, self.strikes, self.expiries, vol, rate, self.types) \
+            * self.quantities
+
+        if aggregate:
+            return np.bincount(self.underlying_ids, weights=values, minlength=len(self.underlyings))
+        return values
+
+    def price(self, spot, time, vol, rate, aggregate=True):
+        """
+        Returns the value of the book.
 
-    
+        Parameters
+        ----------
+        spot: float, dict or array_like
+            The spot price of each underlying (keyed by, or aligned with, underlyings).
+        time: float
+            The date the book should be priced for.
+        vol: float, dict or array_like
+            The implied volatility to use for pricing, either per underlying or an array
+            with one value per position (as a percentage).
+        rate: float
+            The risk free interest rate to use (as a percentage).
+        aggregate: bool
+            If True (default) the position values are summed by underlying.
+
+        Returns
+        -------
+        ndarray
+            The value per underlying (aligned with underlyings) or per position.
+        """
+        return self._evaluate(bs_price, spot, time, vol, rate, aggregate)
+
+    def delta(self, spot, time, vol, rate, aggregate=True):
+        """
+        Returns the delta of the book. See price for the parameters.
+        """
+        return self._evaluate(bs_delta, spot, time, vol, rate, aggregate)
+
+    def gamma(self, spot, time, vol, rate, aggregate=True):
+        """
+        Returns the gamma of the book. See price for the parameters.
+        """
+        return self._evaluate(bs_gamma, spot, time, vol, rate, aggregate)
+
+    def vega(self, spot, time, vol, rate, aggregate=True):
+        """
+        Returns the vega of the book. See price for the parameters.
+        """
+        return self._evaluate(bs_vega, spot, time, vol, rate, aggregate)
+
+    def theta(self, spot, time, vol, rate, aggregate=True):
+        """
+        Returns the 1 day theta of the book. See price for the parameters.
+        """
+        return self._evaluate(bs_theta, spot, time, vol, rate, aggregate)
+
+    def greeks(self, spot, time, vol, rate):
+        """
+        Returns the price and Greeks of every position from a single evaluation,
+        scaled by the position quantities.
+
+        Parameters
+        ----------
+        See price.
+
+        Returns
+        -------
+        ndarray
+            Structured array with dtype GREEKS_DTYPE, one record per position.
+        """
+        spot = self._per_position(spot)
+        if not (isinstance(vol, np.ndarray) and vol.shape == self.strikes.shape):
+            vol = self._per_position(vol)
+
+        greeks = np.atleast_1d(bs_greeks(spot, time, self.strikes, self.expiries, vol, rate, self.types))
+        for name in GREEKS_DTYPE.names:
+            greeks[name] *= self.quantities
+        return greeks
+
+    def scenario_pnl(self, spot, time, vol, rate, spot_shocks=(0.0,), vol_shocks=(0.0,),
+                     time_rolls=(0.0,), relative=True, by_underlying=False, max_elements=2**20):
+        """
+        Revalues the book over a grid of spot shocks x vol shocks x time rolls and returns
+        the P&L cube relative to the unshocked book, computed by broadcasting. Positions are
+        processed in chunks so that no intermediate array exceeds max_elements entries.
+
+        Parameters
+        ----------
+        spot: float, dict or array_like
+            The spot price of each underlying (keyed by, or aligned with, underlyings).
+        time: float
+            The date the book is priced for.
+        vol: float, dict or array_like
+            The implied volatility to use for pricing, either per underlying or an array
+            with one value per position (as a percentage).
+        rate: float
+            The risk free interest rate to use (as a percentage).
+        spot_shocks: array_like
+            Spot shocks, as fractions of spot if relative is True (e.g. -0.1 for a 10% fall),
+            otherwise as absolute price changes.
+        vol_shocks: array_like
+            Additive volatility shocks (as percentages). Shocked vols are floored at zero.
+        time_rolls: array_like
+            Amounts (in years) by which the evaluation date is rolled forward.
+        relative: bool
+            Whether spot_shocks are relative (default) or absolute.
+        by_underlying: bool
+            If True the cube gets a leading axis aligned with the underlyings attribute.
+        max_elements: int
+            Upper bound on positions x scenarios evaluated in one chunk.
+
+        Returns
+        -------
+        ndarray
+            P&L cube of shape (spot shocks, vol shocks, time rolls), or
+            (underlyings, spot shocks, vol shocks, time rolls) if by_underlying is True.
+        """
+        spot_shocks = np.asarray(spot_shocks, dtype=float).ravel()
+        vol_shocks = np.asarray(vol_shocks, dtype=float).ravel()
+        time_rolls = np.asarray(time_rolls, dtype=float).ravel()
+        grid_shape = (len(spot_shocks), len(vol_shocks), len(time_rolls))
+        grid_size = int(np.prod(grid_shape))
+
+        spot = np.broadcast_to(self._per_position(spot), self.strikes.shape)
+        if not (isinstance(vol, np.ndarray) and vol.shape == self.strikes.shape):
+            vol = self._per_position(vol)
+        vol = np.broadcast_to(vol, self.strikes.shape)
+
+        base = bs_price(spot, time, self.strikes, self.expiries, vol, rate, self.types)
+
+        num_rows = len(self.underlyings) if by_underlying else 1
+        cube = np.zeros((num_rows, grid_size))
+        chunk = max(1, max_elements // grid_size)
+
+        for start in range(0, len(self), chunk):
+            rows = slice(start, start + chunk)
+            column = (slice(None), None, None, None)
+
+            if relative:
+                shocked_spot = spot[rows][column] * (1.0 + spot_shocks[None, :, None, None])
+            else:
+                shocked_spot = spot[rows][column] + spot_shocks[None, :, None, None]
+            shocked_vol = np.maximum(vol[rows][column] + vol_shocks[None, None, :, None], 0.0)
+
+            values = bs_price(shocked_spot, time + time_rolls[None, None, None, :],
+                              self.strikes[rows][column], self.expiries[rows][column],
+                              shocked_vol, rate, self.types[rows][column])
+            pnl = (values - base[rows][column]).reshape(-1, grid_size)
+
+            if by_underlying:
+                weights = (self.underlying_ids[rows] == np.arange(num_rows)[:, None]) \
+                    * self.quantities[rows]
+            else:
+                weights = self.quantities[rows][None, :]
+            cube += weights @ pnl
+
+        if by_underlying:
+            return cube.reshape((num_rows,) + grid_shape)
+        return cube.reshape(grid_shape)
@@ -0,0 +1,16 @@
+"""Lazy access to Matplotlib for the plotting methods of the pricing modules"""
+
+import importlib.util
+
+# Matplotlib is only imported when a plot is rendered
+HASMATPLOTLIB = importlib.util.find_spec("matplotlib") is not None
+
+
+def pyplot():
+    """Imports and returns matplotlib.pyplot, or None if Matplotlib is not installed."""
+    if not HASMATPLOTLIB:
+        print("Plotting functions require Matplotlib")
+        return None
+
+    import matplotlib.pyplot as plt
+    return plt
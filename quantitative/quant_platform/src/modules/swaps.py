@@ -0,0 +1,261 @@
+"""Valuation of portfolios of fixed/float interest rate swaps"""
+
+import numpy as np
+
+from modules.fixedincome import bucket_exposures
+
+
+def payment_schedule(start, maturity, frequency):
+    """
+    Payment dates of a swap leg, generated backwards from the maturity so that any short
+    period is a front stub, with their accrual periods.
+
+    Parameters
+    ----------
+    start: float
+        The start date of the leg.
+    maturity: float
+        The end date of the leg.
+    frequency: int
+        The number of payments per year.
+
+    Returns
+    -------
+    tuple of (ndarray, ndarray)
+        The payment dates and the accrual period ending on each.
+    """
+    dates = np.arange(maturity, start, -1.0 / frequency)[::-1]
+    # Guard against rounding leaving a vanishing first period
+    dates = dates[dates > start + 1e-9]
+    accruals = np.diff(dates, prepend=start)
+    return dates, accruals
+
+
+class SwapPortfolio:
+    """
+    Columnar store for a portfolio of fixed/float swaps.
+
+    The legs of all swaps are flattened into per-period arrays with an owner index, on the
+    grid of the unique schedule dates of the portfolio.  A valuation evaluates the discount
+    factors of the grid once per curve and reduces the periods to per-swap annuities and
+    floating leg values with np.bincount.  All rates are percentages.
+
+    Attributes
+    ----------
+    starts: ndarray
+        The start dates of the swaps.
+    maturities: ndarray
+        The maturities of the swaps.
+    fixed_rates: ndarray
+        The fixed rates of the swaps.
+    notionals: ndarray
+        The notionals of the swaps.
+    directions: ndarray
+        +1 for swaps paying fixed, -1 for swaps receiving fixed.
+    dates: ndarray
+        The unique schedule dates of the portfolio.
+    """
+
+    def __init__(self, maturities, fixed_rates, notionals=1.0, payer=True, fixed_frequency=2,
+                 float_frequency=4, starts=0.0):
+        maturities, fixed_rates, notionals, payer, fixed_frequency, float_frequency, starts = \
+            np.broadcast_arrays(np.asarray(maturities, dtype=float),
+                                np.asarray(fixed_rates, dtype=float),
+                                np.asarray(notionals, dtype=float), np.asarray(payer, dtype=bool),
+                                np.asarray(fixed_frequency), np.asarray(float_frequency),
+                                np.asarray(starts, dtype=float))
+        if np.any(maturities.ravel() <= starts.ravel()):
+            raise ValueError("Swap maturities must be later than their start dates")
+
+        self.starts = starts.ravel().copy()
+        self.maturities = maturities.ravel().copy()
+        self.fixed_rates = fixed_rates.ravel().copy()
+        self.notionals = notionals.ravel().copy()
+        self.directions = np.where(payer.ravel(), 1.0, -1.0)
+
+        # Swaps on the same dates share schedules, so each distinct one is generated once
+        schedules = {}
+        fixed = ([], [], [])     # owner, payment date, accrual
+        floating = ([], [], [])  # owner, start date, end date
+        for i, (start, maturity, fixed_freq, float_freq) in enumerate(
+                zip(self.starts.tolist(), self.maturities.tolist(),
+                    fixed_frequency.ravel().tolist(), float_frequency.ravel().tolist())):
+            for frequency, leg in ((fixed_freq, fixed), (float_freq, floating)):
+                key = (start, maturity, frequency)
+                if key not in schedules:
+                    schedules[key] = payment_schedule(start, maturity, frequency)
+                dates, accruals = schedules[key]
+
+                leg[0].append(np.full(len(dates), i, dtype=np.intp))
+                if leg is fixed:
+                    leg[1].append(dates)
+                    leg[2].append(accruals)
+                else:
+                    leg[1].append(dates - accruals)
+                    leg[2].append(dates)
+
+        self._fixed_owner = np.concatenate(fixed[0])
+        self._float_owner = np.concatenate(floating[0])
+        self._accruals = np.concatenate(fixed[2])
+        fixed_dates = np.concatenate(fixed[1])
+        float_starts = np.concatenate(floating[1])
+        float_ends = np.concatenate(floating[2])
+
+        self.dates, inverse = np.unique(np.concatenate([fixed_dates, float_starts, float_ends]),
+                                        return_inverse=True)
+        inverse = inverse.ravel()
+        n_fixed = len(fixed_dates)
+        n_float = len(float_starts)
+        self._fixed_ids = inverse[:n_fixed]
+        self._start_ids = inverse[n_fixed:n_fixed + n_float]
+        self._end_ids = inverse[n_fixed + n_float:]
+
+    def __len__(self):
+        return len(self.maturities)
+
+    def _log_discount_factors(self, yield_curve):
+        # Any curve-like object with a vectorized discount_factors method can be used
+        return np.log(yield_curve.discount_factors(self.dates))
+
+    def _legs(self, discount_curve, projection_curve):
+        log_dfs = self._log_discount_factors(discount_curve)
+        log_projection = log_dfs if projection_curve is None \
+            else self._log_discount_factors(projection_curve)
+        dfs = np.exp(log_dfs)
+
+        fixed_dfs = self._accruals * dfs[self._fixed_ids]
+        ratios = np.exp(log_projection[self._start_ids] - log_projection[self._end_ids])
+        float_dfs = dfs[self._end_ids]
+
+        annuities = np.bincount(self._fixed_owner, weights=fixed_dfs, minlength=len(self))
+        floating = np.bincount(self._float_owner, weights=(ratios - 1.0) * float_dfs,
+                               minlength=len(self))
+        return annuities, floating, fixed_dfs, ratios, float_dfs
+
+    def annuities(self, discount_curve):
+        """
+        Returns the annuity (the value of 1 paid per year on the fixed schedule) of each swap.
+        """
+        return self._legs(discount_curve, None)[0]
+
+    def par_rates(self, discount_curve, projection_curve=None):
+        """
+        Evaluates the par fixed rate of each swap.
+
+        Parameters
+        ----------
+        discount_curve: curve
+            The curve used for discounting.
+        projection_curve: curve
+            The curve the floating rates are projected from (defaults to the discount curve).
+
+        Returns
+        -------
+        ndarray
+            The par rates (as percentages).
+        """
+        annuities, floating = self._legs(discount_curve, projection_curve)[:2]
+        return 100 * floating / annuities
+
+    def pv(self, discount_curve, projection_curve=None):
+        """
+        Evaluates the present value of each swap, positive when the position is in the money.
+
+        Parameters
+        ----------
+        discount_curve: curve
+            The curve used for discounting.
+        projection_curve: curve
+            The curve the floating rates are projected from (defaults to the discount curve).
+
+        Returns
+        -------
+        ndarray
+            The present values, scaled by notional.
+        """
+        annuities, floating = self._legs(discount_curve, projection_curve)[:2]
+        return self.directions * self.notionals * (floating - self.fixed_rates / 100 * annuities)
+
+    def value(self, discount_curve, projection_curve=None):
+        """
+        Returns the present value of the whole portfolio.
+        """
+        return self.pv(discount_curve, projection_curve).sum()
+
+    def _zero_rate_sensitivities(self, discount_curve, projection_curve):
+        """
+        Derivatives of the swap PVs with respect to the zero rates of the discount and
+        projection curves, as flat (owners, date ids, values) arrays per curve.
+        """
+        _, _, fixed_dfs, ratios, float_dfs = self._legs(discount_curve, projection_curve)
+        scale = self.directions * self.notionals
+        t = self.dates
+
+        # d P(t) / d z(t) = -t P(t);  d (P(s) / P(e)) / d z(s) = -s ratio, d / d z(e) = e ratio
+        fixed_sens = scale[self._fixed_owner] * self.fixed_rates[self._fixed_owner] / 100 \
+            * t[self._fixed_ids] * fixed_dfs
+        float_scale = scale[self._float_owner] * float_dfs
+        discount_sens = -float_scale * (ratios - 1.0) * t[self._end_ids]
+        start_sens = -float_scale * ratios * t[self._start_ids]
+        end_sens = float_scale * ratios * t[self._end_ids]
+
+        discount = (np.concatenate([self._fixed_owner, self._float_owner]),
+                    np.concatenate([self._fixed_ids, self._end_ids]),
+                    np.concatenate([fixed_sens, discount_sens]))
+        projection = (np.concatenate([self._float_owner, self._float_owner]),
+                      np.concatenate([self._start_ids, self._end_ids]),
+                      np.concatenate([start_sens, end_sens]))
+        return discount, projection
+
+    def _bucket(self, sensitivities, yield_curve):
+        owners, ids, values = sensitivities
+        weights = yield_curve.interpolator.weights_many(self.dates)
+        return 0.0001 * bucket_exposures(owners, ids, values, len(self), weights)
+
+    def pv01(self, discount_curve, projection_curve=None):
+        """
+        First order change in the PV of each swap for a one basis point parallel rise in the
+        zero rates of all curves.
+
+        Parameters
+        ----------
+        discount_curve: curve
+            The curve used for discounting.
+        projection_curve: curve
+            The curve the floating rates are projected from (defaults to the discount curve).
+
+        Returns
+        -------
+        ndarray
+            The PV01 of each swap.
+        """
+        discount, projection = self._zero_rate_sensitivities(discount_curve, projection_curve)
+        owners = np.concatenate([discount[0], projection[0]])
+        values = np.concatenate([discount[2], projection[2]])
+        return 0.0001 * np.bincount(owners, weights=values, minlength=len(self))
+
+    def bucketed_dv01(self, discount_curve, projection_curve=None):
+        """
+        First order change in the PV of each swap for a one basis point rise in each defining
+        rate of the curves, from the analytic interpolator weights.
+
+        Parameters
+        ----------
+        discount_curve: curve
+            The curve used for discounting.
+        projection_curve: curve
+            The curve the floating rates are projected from (defaults to the discount curve).
+
+        Returns
+        -------
+        ndarray or tuple of (ndarray, ndarray)
+            The (swaps, pillars) risk matrix against the discount curve, or the risk matrices
+            against the discount and projection curves if a separate projection curve is
+            given.
+        """
+        discount, projection = self._zero_rate_sensitivities(discount_curve, projection_curve)
+        if projection_curve is None:
+            combined = tuple(np.concatenate([d, p]) for d, p in zip(discount, projection))
+            return self._bucket(combined, discount_curve)
+
+        return self._bucket(discount, discount_curve), self._bucket(projection, projection_curve)
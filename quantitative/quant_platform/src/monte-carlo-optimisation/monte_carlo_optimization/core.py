@@ -0,0 +1,472 @@
+"""
+core.py
+
+Monte Carlo engine for pricing European and path-dependent options.
+
+Models:
+-------
+- GBM(spot, rate, vol):
+    Geometric Brownian motion, simulated exactly on the time grid.
+
+- Heston(spot, rate, v0, kappa, theta, sigma, rho):
+    Heston stochastic volatility, simulated with a full truncation Euler scheme.
+
+Payoffs:
+--------
+- EuropeanPayoff(strike, flag)
+- AsianPayoff(strike, flag, averaging="arithmetic")
+- BarrierPayoff(strike, barrier, kind, flag)
+
+Pricing:
+--------
+- black_scholes_price(spot, strike, expiry, rate, vol, flag):
+    Closed form price of a European option under GBM, the expectation of the control variate.
+
+- simulate_batch(...):
+    Simulates one chunk of paths and returns its mergeable sample statistics.
+
+- MonteCarloPricer(model, ...).price(payoff, expiry):
+    Prices a payoff in chunks with optional antithetic and control variates, optionally
+    across several processes, and reports the standard error and throughput.
+
+Rates and volatilities are continuously compounded / annualised decimals (0.05 for 5%).
+The control variate for GBM is the vanilla European option with the payoff's strike, whose
+expectation is the Black-Scholes closed form.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import erfc, exp, log, sqrt
+from typing import NamedTuple
+
+import numpy as np
+
+from .utils import (NUM_STATISTICS, attach_shared_array, batch_statistics, create_shared_array,
+                    estimate, reduce_statistics)
+
+# Option type flags
+CALL = 1
+PUT = -1
+
+
+def black_scholes_price(spot, strike, expiry, rate, vol, flag=CALL):
+    """
+    Black-Scholes price of a European option.
+
+    Parameters
+    ----------
+    spot, strike, expiry: float
+    rate, vol: float
+        Risk free rate and volatility (as decimals).
+    flag: int
+        CALL or PUT.
+
+    Returns
+    -------
+    float
+    """
+    vol_sqrt_t = vol * sqrt(expiry)
+    d1 = (log(spot / strike) + (rate + 0.5 * vol**2) * expiry) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+    sign = 1.0 if flag == CALL else -1.0
+    # N(x) = erfc(-x / sqrt(2)) / 2
+    return sign * (0.5 * spot * erfc(-sign * d1 / sqrt(2.0))
+                   - 0.5 * strike * exp(-rate * expiry) * erfc(-sign * d2 / sqrt(2.0)))
+
+
+class GBM:
+    """
+    Geometric Brownian motion under the risk neutral measure.
+
+    Attributes
+    ----------
+    spot: float
+        Initial price of the underlying.
+    rate: float
+        Risk free rate (as a decimal).
+    vol: float
+        Volatility (as a decimal).
+    """
+
+    num_factors = 1
+    exact = True  # terminal values do not depend on the number of time steps
+
+    def __init__(self, spot, rate, vol):
+        self.spot = spot
+        self.rate = rate
+        self.vol = vol
+
+    def simulate(self, normals, expiry):
+        """
+        Map standard normal increments of shape (paths, steps, 1) to price paths of shape
+        (paths, steps + 1).
+        """
+        n_paths, n_steps, _ = normals.shape
+        dt = expiry / n_steps
+
+        increments = (self.rate - 0.5 * self.vol**2) * dt + self.vol * np.sqrt(dt) * normals[:, :, 0]
+        log_paths = np.zeros((n_paths, n_steps + 1))
+        np.cumsum(increments, axis=1, out=log_paths[:, 1:])
+
+        return self.spot * np.exp(log_paths)
+
+    def control_samples(self, terminal, expiry, payoff):
+        """Discounted vanilla European payoff with the strike and type of `payoff`."""
+        sign = float(payoff.flag)
+        return np.exp(-self.rate * expiry) * np.maximum(sign * (terminal - payoff.strike), 0.0)
+
+    def control_mean(self, expiry, payoff):
+        """Black-Scholes price of the control variate."""
+        return black_scholes_price(self.spot, payoff.strike, expiry, self.rate, self.vol,
+                                   payoff.flag)
+
+
+class Heston:
+    """
+    Heston stochastic volatility model under the risk neutral measure.
+
+    Attributes
+    ----------
+    spot: float
+        Initial price of the underlying.
+    rate: float
+        Risk free rate (as a decimal).
+    v0: float
+        Initial variance.
+    kappa: float
+        Mean reversion speed of the variance.
+    theta: float
+        Long run variance.
+    sigma: float
+        Volatility of the variance.
+    rho: float
+        Correlation between the price and variance drivers.
+    """
+
+    num_factors = 2
+    exact = False
+
+    def __init__(self, spot, rate, v0, kappa, theta, sigma, rho):
+        self.spot = spot
+        self.rate = rate
+        self.v0 = v0
+        self.kappa = kappa
+        self.theta = theta
+        self.sigma = sigma
+        self.rho = rho
+
+    def simulate(self, normals, expiry):
+        """
+        Map standard normal increments of shape (paths, steps, 2) to price paths of shape
+        (paths, steps + 1), using full truncation Euler for the variance.
+        """
+        n_paths, n_steps, _ = normals.shape
+        dt = expiry / n_steps
+        sqrt_dt = np.sqrt(dt)
+        rho_bar = np.sqrt(1.0 - self.rho**2)
+
+        log_paths = np.zeros((n_paths, n_steps + 1))
+        variance = np.full(n_paths, float(self.v0))
+
+        for step in range(n_steps):
+            z_spot = normals[:, step, 0]
+            z_vol = self.rho * z_spot + rho_bar * normals[:, step, 1]
+
+            positive = np.maximum(variance, 0.0)
+            root = np.sqrt(positive) * sqrt_dt
+
+            log_paths[:, step + 1] = log_paths[:, step] + (self.rate - 0.5 * positive) * dt + root * z_spot
+            variance = variance + self.kappa * (self.theta - positive) * dt + self.sigma * root * z_vol
+
+        return self.spot * np.exp(log_paths)
+
+    def control_samples(self, terminal, expiry, payoff):
+        """Discounted terminal price of the underlying."""
+        return np.exp(-self.rate * expiry) * terminal
+
+    def control_mean(self, expiry, payoff):
+        """The discounted underlying is a martingale, so its expectation is the spot."""
+        return self.spot
+
+
+class EuropeanPayoff:
+    """
+    Vanilla European option payoff.
+
+    Attributes
+    ----------
+    strike: float
+    flag: int, str
+        CALL/PUT or "call"/"put".
+    """
+
+    path_dependent = False
+
+    def __init__(self, strike, flag=CALL):
+        self.strike = strike
+        self.flag = CALL if flag in (CALL, "call") else PUT
+
+    def __call__(self, paths):
+        sign = float(self.flag)
+        return np.maximum(sign * (paths[:, -1] - self.strike), 0.0)
+
+
+class AsianPayoff:
+    """
+    Asian option payoff on the average price over the monitoring dates (excluding the
+    initial date).
+
+    Attributes
+    ----------
+    strike: float
+    flag: int, str
+        CALL/PUT or "call"/"put".
+    averaging: str
+        "arithmetic" or "geometric".
+    """
+
+    path_dependent = True
+
+    def __init__(self, strike, flag=CALL, averaging="arithmetic"):
+        if averaging not in ("arithmetic", "geometric"):
+            raise ValueError("averaging must be 'arithmetic' or 'geometric'")
+
+        self.strike = strike
+        self.flag = CALL if flag in (CALL, "call") else PUT
+        self.averaging = averaging
+
+    def __call__(self, paths):
+        sign = float(self.flag)
+        if self.averaging == "arithmetic":
+            average = paths[:, 1:].mean(axis=1)
+        else:
+            average = np.exp(np.log(paths[:, 1:]).mean(axis=1))
+        return np.maximum(sign * (average - self.strike), 0.0)
+
+
+class BarrierPayoff:
+    """
+    Discretely monitored single barrier option payoff.
+
+    Attributes
+    ----------
+    strike: float
+    barrier: float
+    kind: str
+        One of "down-and-out", "down-and-in", "up-and-out", "up-and-in".
+    flag: int, str
+        CALL/PUT or "call"/"put".
+    """
+
+    path_dependent = True
+
+    KINDS = ("down-and-out", "down-and-in", "up-and-out", "up-and-in")
+
+    def __init__(self, strike, barrier, kind="down-and-out", flag=CALL):
+        if kind not in self.KINDS:
+            raise ValueError("kind must be one of {}".format(", ".join(self.KINDS)))
+
+        self.strike = strike
+        self.barrier = barrier
+        self.kind = kind
+        self.flag = CALL if flag in (CALL, "call") else PUT
+
+    def __call__(self, paths):
+        sign = float(self.flag)
+        vanilla = np.maximum(sign * (paths[:, -1] - self.strike), 0.0)
+
+        if self.kind.startswith("down"):
+            hit = paths.min(axis=1) <= self.barrier
+        else:
+            hit = paths.max(axis=1) >= self.barrier
+
+        alive = ~hit if self.kind.endswith("out") else hit
+        return np.where(alive, vanilla, 0.0)
+
+
+class MonteCarloResult(NamedTuple):
+    """Monte Carlo price with its standard error and throughput."""
+
+    price: float
+    standard_error: float
+    n_paths: int
+    elapsed: float
+    paths_per_second: float
+
+
+def simulate_batch(model, payoff, expiry, n_paths, n_steps, rng, antithetic=True, control_variate=True):
+    """
+    Simulate one batch of paths and return the sample statistics of the discounted payoff.
+
+    Parameters
+    ----------
+    model: GBM, Heston
+    payoff: EuropeanPayoff, AsianPayoff, BarrierPayoff
+    expiry: float
+        Time to expiry in years.
+    n_paths: int
+        Number of paths in the batch (rounded up to an even number if `antithetic`).
+    n_steps: int
+        Number of time steps per path.
+    rng: np.random.Generator
+    antithetic: bool
+        Pair every path with its reflection; each pair counts as one sample.
+    control_variate: bool
+        Also collect the model's control variate samples.
+
+    Returns
+    -------
+    np.array
+        Batch statistics, see `utils.batch_statistics`.
+    """
+    n_draws = (n_paths + 1) // 2 if antithetic else n_paths
+    normals = rng.standard_normal((n_draws, n_steps, model.num_factors))
+    if antithetic:
+        normals = np.concatenate([normals, -normals])
+
+    paths = model.simulate(normals, expiry)
+    y = np.exp(-model.rate * expiry) * payoff(paths)
+    x = model.control_samples(paths[:, -1], expiry, payoff) if control_variate else None
+
+    if antithetic:
+        y = 0.5 * (y[:n_draws] + y[n_draws:])
+        if x is not None:
+            x = 0.5 * (x[:n_draws] + x[n_draws:])
+
+    return batch_statistics(y, x)
+
+
+def _simulate_batches(shared_name, n_batches, indices, seeds, sizes, model, payoff, expiry,
+                      n_steps, antithetic, control_variate):
+    """
+    Worker task: simulate the given batches and write their statistics into the rows of the
+    shared memory results matrix.
+    """
+    shared, results = attach_shared_array(shared_name, (n_batches, NUM_STATISTICS))
+    try:
+        for index, seed, size in zip(indices, seeds, sizes):
+            results[index] = simulate_batch(model, payoff, expiry, size, n_steps,
+                                            np.random.default_rng(seed), antithetic, control_variate)
+    finally:
+        del results
+        shared.close()
+
+
+class MonteCarloPricer:
+    """
+    Chunked Monte Carlo pricer with antithetic and control variates.
+
+    The paths are split into batches of `chunk_size`, each driven by its own generator
+    spawned from `seed` with `np.random.SeedSequence.spawn`. Batches are spread over
+    `n_workers` processes, write their statistics into a shared memory matrix and are merged
+    in batch order, so results are bit-identical whatever the number of workers.
+
+    Attributes
+    ----------
+    model: GBM, Heston
+        The model used to simulate the underlying.
+    n_paths: int
+        Total number of simulated paths.
+    n_steps: int
+        Number of time steps per path. Path independent payoffs under an exact model are
+        simulated with a single step.
+    chunk_size: int
+        Number of paths per batch, bounding memory to chunk_size * n_steps per worker.
+    antithetic: bool
+        Use antithetic variates.
+    control_variate: bool
+        Use the model's control variate.
+    seed: int, np.random.SeedSequence
+        Root seed of the batch generators.
+    n_workers: int
+        Number of worker processes (1 runs in the calling process).
+    """
+
+    def __init__(self, model, n_paths=100_000, n_steps=252, chunk_size=50_000,
+                 antithetic=True, control_variate=True, seed=None, n_workers=1):
+        for name, value in (("n_paths", n_paths), ("chunk_size", chunk_size)):
+            if not isinstance(value, (int, np.integer)) or isinstance(value, bool) or value < 1:
+                raise ValueError("{} must be a positive integer, got {!r}".format(name, value))
+
+        self.model = model
+        self.n_paths = n_paths
+        self.n_steps = n_steps
+        self.chunk_size = chunk_size
+        self.antithetic = antithetic
+        self.control_variate = control_variate
+        self.seed = seed
+        self.n_workers = n_workers
+
+    def _steps(self, payoff):
+        if payoff.path_dependent or not self.model.exact:
+            return self.n_steps
+        return 1
+
+    def _batch_sizes(self):
+        n_batches = -(-self.n_paths // self.chunk_size)
+        sizes = [self.chunk_size] * n_batches
+        sizes[-1] = self.n_paths - self.chunk_size * (n_batches - 1)
+        return sizes
+
+    def _seeds(self, n_batches):
+        root = self.seed
+        if not isinstance(root, np.random.SeedSequence):
+            root = np.random.SeedSequence(root)
+        return root.spawn(n_batches)
+
+    def _run_parallel(self, payoff, expiry, n_steps, seeds, sizes):
+        n_batches = len(sizes)
+        shared, results = create_shared_array((n_batches, NUM_STATISTICS))
+        try:
+            groups = np.array_split(np.arange(n_batches), min(self.n_workers, n_batches))
+            with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                tasks = [
+                    executor.submit(_simulate_batches, shared.name, n_batches, group.tolist(),
+                                    [seeds[i] for i in group], [sizes[i] for i in group],
+                                    self.model, payoff, expiry, n_steps, self.antithetic,
+                                    self.control_variate)
+                    for group in groups
+                ]
+                for task in tasks:
+                    task.result()
+            return reduce_statistics(results)
+        finally:
+            del results
+            shared.close()
+            shared.unlink()
+
+    def price(self, payoff, expiry):
+        """
+        Price a payoff.
+
+        Parameters
+        ----------
+        payoff: EuropeanPayoff, AsianPayoff, BarrierPayoff
+        expiry: float
+            Time to expiry in years.
+
+        Returns
+        -------
+        MonteCarloResult
+        """
+        n_steps = self._steps(payoff)
+        sizes = self._batch_sizes()
+        seeds = self._seeds(len(sizes))
+
+        start = time.perf_counter()
+        if self.n_workers > 1:
+            statistics = self._run_parallel(payoff, expiry, n_steps, seeds, sizes)
+        else:
+            statistics = reduce_statistics([
+                simulate_batch(self.model, payoff, expiry, size, n_steps, np.random.default_rng(seed),
+                               self.antithetic, self.control_variate)
+                for seed, size in zip(seeds, sizes)
+            ])
+        elapsed = time.perf_counter() - start
+
+        control_mean = self.model.control_mean(expiry, payoff) if self.control_variate else None
+        price, standard_error = estimate(statistics, control_mean)
+
+        # A coarse clock can report no elapsed time for tiny runs
+        throughput = self.n_paths / elapsed if elapsed > 0 else float("inf")
+        return MonteCarloResult(price, standard_error, self.n_paths, elapsed, throughput)
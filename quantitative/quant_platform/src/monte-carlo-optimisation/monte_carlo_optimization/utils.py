@@ -0,0 +1,183 @@
+"""
+utils.py
+
+Helpers for the Monte Carlo engine: mergeable sample statistics for the payoff and its
+control variate, and the estimator that turns them into a price and standard error.
+
+The statistics of a batch of samples are stored in a flat array
+
+    [n, mean_y, mean_x, S_yy, S_xx, S_xy]
+
+where y are the (discounted) payoff samples, x the control variate samples and S the sums
+of centred (co-)products. Batches are merged with Chan et al.'s pairwise update, so
+statistics computed chunk by chunk, or by separate workers, combine exactly.
+
+Worker processes write their batch statistics into a float64 matrix backed by
+`multiprocessing.shared_memory`, created with `create_shared_array` and opened by the
+workers with `attach_shared_array`.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+NUM_STATISTICS = 6
+
+
+def batch_statistics(y, x=None):
+    """
+    Compute the statistics of one batch of samples.
+
+    Parameters
+    ----------
+    y: np.array
+        Payoff samples.
+
+    x: np.array
+        Control variate samples, if any.
+
+    Returns
+    -------
+    np.array
+        [n, mean_y, mean_x, S_yy, S_xx, S_xy]
+    """
+    if x is None:
+        x = np.zeros_like(y)
+
+    n = len(y)
+    mean_y = y.mean()
+    mean_x = x.mean()
+    dy = y - mean_y
+    dx = x - mean_x
+
+    return np.array([n, mean_y, mean_x, dy @ dy, dx @ dx, dx @ dy])
+
+
+def combine_statistics(a, b):
+    """
+    Merge the statistics of two batches.
+
+    Parameters
+    ----------
+    a, b: np.array
+        Statistics as returned by `batch_statistics`.
+
+    Returns
+    -------
+    np.array
+        The statistics of the union of both batches.
+    """
+    if a[0] == 0:
+        return b.copy()
+    if b[0] == 0:
+        return a.copy()
+
+    n = a[0] + b[0]
+    delta_y = b[1] - a[1]
+    delta_x = b[2] - a[2]
+    weight = a[0] * b[0] / n
+
+    return np.array([
+        n,
+        a[1] + delta_y * b[0] / n,
+        a[2] + delta_x * b[0] / n,
+        a[3] + b[3] + delta_y * delta_y * weight,
+        a[4] + b[4] + delta_x * delta_x * weight,
+        a[5] + b[5] + delta_x * delta_y * weight,
+    ])
+
+
+def reduce_statistics(batches):
+    """
+    Merge the statistics of several batches, in order.
+
+    Parameters
+    ----------
+    batches: np.array
+        2D array with one row of statistics per batch.
+
+    Returns
+    -------
+    np.array
+        The merged statistics.
+    """
+    total = np.zeros(NUM_STATISTICS)
+    for batch in batches:
+        total = combine_statistics(total, batch)
+    return total
+
+
+def estimate(statistics, control_mean=None):
+    """
+    Turn merged statistics into a Monte Carlo estimate.
+
+    Parameters
+    ----------
+    statistics: np.array
+        Merged statistics as returned by `reduce_statistics`.
+
+    control_mean: float
+        Known expectation of the control variate. If None no control variate is applied.
+
+    Returns
+    -------
+    (float, float)
+        The estimate and its standard error.
+
+    Notes
+    -----
+    With a control variate x of known mean E[x], the estimate is
+    mean_y - beta * (mean_x - E[x]) with beta = Cov(y, x) / Var(x), and the variance of the
+    samples is reduced to Var(y) - Cov(y, x)^2 / Var(x).
+    """
+    n, mean_y, mean_x, s_yy, s_xx, s_xy = statistics
+
+    if control_mean is None or s_xx <= 0:
+        price = mean_y
+        residual = s_yy
+    else:
+        beta = s_xy / s_xx
+        price = mean_y - beta * (mean_x - control_mean)
+        residual = s_yy - beta * s_xy
+
+    variance = max(residual, 0.0) / (n - 1) if n > 1 else np.nan
+    return price, np.sqrt(variance / n)
+
+
+def create_shared_array(shape):
+    """
+    Create a zeroed float64 array backed by a new shared memory block.
+
+    Parameters
+    ----------
+    shape: tuple
+
+    Returns
+    -------
+    (shared_memory.SharedMemory, np.array)
+        The block (to be closed and unlinked by the caller) and the array view on it.
+    """
+    size = int(np.prod(shape)) * np.dtype(np.float64).itemsize
+    shared = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    array = np.ndarray(shape, dtype=np.float64, buffer=shared.buf)
+    array[...] = 0.0
+    return shared, array
+
+
+def attach_shared_array(name, shape):
+    """
+    Open an existing shared memory block as a float64 array.
+
+    Parameters
+    ----------
+    name: str
+        Name of the block, as given by `SharedMemory.name`.
+    shape: tuple
+
+    Returns
+    -------
+    (shared_memory.SharedMemory, np.array)
+        The block (to be closed by the caller) and the array view on it.
+    """
+    shared = shared_memory.SharedMemory(name=name)
+    return shared, np.ndarray(shape, dtype=np.float64, buffer=shared.buf)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from monte_carlo_optimization.core import (CALL, GBM, PUT, AsianPayoff, BarrierPayoff,
+                                           EuropeanPayoff, Heston, MonteCarloPricer,
+                                           black_scholes_price)
+from monte_carlo_optimization.utils import batch_statistics, combine_statistics
+
+
+def test_black_scholes_reference_values():
+    assert abs(black_scholes_price(100.0, 100.0, 1.0, 0.05, 0.2, CALL) - 10.450583572185565) < 1e-12
+    parity = black_scholes_price(100.0, 90.0, 2.0, 0.03, 0.3, CALL) \
+        - black_scholes_price(100.0, 90.0, 2.0, 0.03, 0.3, PUT)
+    assert abs(parity - (100.0 - 90.0 * np.exp(-0.06))) < 1e-12
+
+
+def test_european_price_matches_black_scholes():
+    model = GBM(100.0, 0.05, 0.2)
+    pricer = MonteCarloPricer(model, n_paths=200_000, seed=7, control_variate=False)
+
+    result = pricer.price(EuropeanPayoff(105.0, PUT), 1.0)
+
+    assert abs(result.price - black_scholes_price(100.0, 105.0, 1.0, 0.05, 0.2, PUT)) < 4 * result.standard_error
+
+
+def test_variance_reduction_lowers_standard_error():
+    model = GBM(100.0, 0.05, 0.2)
+    payoff = AsianPayoff(100.0, CALL)
+
+    plain = MonteCarloPricer(model, n_paths=20_000, n_steps=12, seed=1, antithetic=False,
+                             control_variate=False).price(payoff, 1.0)
+    reduced = MonteCarloPricer(model, n_paths=20_000, n_steps=12, seed=1).price(payoff, 1.0)
+
+    assert reduced.standard_error < plain.standard_error
+    assert abs(reduced.price - plain.price) < 4 * plain.standard_error
+
+
+def test_knock_in_and_knock_out_sum_to_vanilla():
+    model = Heston(100.0, 0.03, 0.04, 2.0, 0.04, 0.3, -0.7)
+    pricer = MonteCarloPricer(model, n_paths=20_000, n_steps=50, seed=3, control_variate=False)
+
+    knock_out = pricer.price(BarrierPayoff(100.0, 90.0, "down-and-out"), 1.0)
+    knock_in = pricer.price(BarrierPayoff(100.0, 90.0, "down-and-in"), 1.0)
+    vanilla = pricer.price(EuropeanPayoff(100.0), 1.0)
+
+    assert np.isclose(knock_out.price + knock_in.price, vanilla.price)
+
+
+def test_combined_statistics_match_single_batch():
+    rng = np.random.default_rng(0)
+    y, x = rng.standard_normal(1000), rng.standard_normal(1000)
+
+    merged = combine_statistics(batch_statistics(y[:300], x[:300]), batch_statistics(y[300:], x[300:]))
+
+    np.testing.assert_allclose(merged, batch_statistics(y, x))
+
+
+def test_results_do_not_depend_on_worker_count():
+    model = GBM(100.0, 0.05, 0.2)
+    payoff = AsianPayoff(100.0, CALL)
+
+    serial = MonteCarloPricer(model, n_paths=40_000, n_steps=12, chunk_size=5_000, seed=11).price(payoff, 1.0)
+    parallel = MonteCarloPricer(model, n_paths=40_000, n_steps=12, chunk_size=5_000, seed=11,
+                                n_workers=3).price(payoff, 1.0)
+
+    assert serial.price == parallel.price
+    assert serial.standard_error == parallel.standard_error
+
+
+@pytest.mark.parametrize("settings", [{"n_paths": 0}, {"n_paths": -5}, {"n_paths": 1000.5},
+                                      {"chunk_size": 0}, {"chunk_size": 2.0}])
+def test_invalid_path_counts_raise(settings):
+    with pytest.raises(ValueError):
+        MonteCarloPricer(GBM(100.0, 0.05, 0.2), **settings)
@@ -3,6 +3,19 @@ sharpe_ratio.py
 
 This module provides a set of functions to compute various risk-adjusted performance measures, primarily focused on the Sharpe Ratio and its statistical adjustments.
 
+Classes:
+--------
+- Moments:
+    Count, mean and central moment sums (M2, M3, M4) of one or many return series, computed in a
+    single chunked pass and mergeable across batches. Every function below accepts a `Moments`
+    object in place of `returns`, so several statistics can share one scan of the data.
+    `Moments.rolling` gives the moments of every rolling window at once, the functions then return
+    the statistics as time series.
+
+- SharpeRatioAccumulator:
+    Online estimate of the Sharpe Ratio, its standard deviation, PSR and minTRL, updated in O(1)
+    per new return, with optional exponential decay of older returns.
+
 Functions:
 ----------
 - estimated_sharpe_ratio(returns):
@@ -23,6 +36,15 @@ Functions:
 - num_independent_trials(trials_returns=None, *, m=None, p=None):
     Estimates the number of independent trials given a set of returns, the number of trials, and the probability of success.
 
+- average_correlation(trials_returns, num_pairs=None, chunk_size=1024, seed=None):
+    Computes the average pairwise correlation of many trials without building their correlation matrix, exactly or from a sample of pairs.
+
+- num_clustered_trials(trials_returns, threshold=0.5, chunk_size=1024):
+    Estimates the number of independent trials as the number of clusters of correlated trials.
+
+- bootstrap_sharpe_ratio(returns, num_resamples=1000, block_size=None, ...):
+    Computes block bootstrap confidence intervals of the Sharpe Ratio, PSR and DSR of many strategies, optionally across worker processes.
+
 - expected_maximum_sr(...):
     Computes the expected maximum Sharpe Ratio that can be observed by randomly selecting from multiple trials.
 
@@ -34,27 +56,293 @@ Dependencies:
 - numpy as np
 - pandas as pd
 - scipy.stats as scipy_stats
+- multiprocessing.shared_memory and concurrent.futures, for the parallel bootstrap
 
 This module is part of a larger library focusing on portfolio analysis and risk management.
 """
 
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import numpy as np
 import pandas as pd
 from scipy import stats as scipy_stats
 
 
+def _central_moments(count, s1, s2, s3, s4):
+    """Mean and central moment sums of a sample from its power sums."""
+    mu = s1 / count
+    mu2 = mu * mu
+    m2 = s2 - count * mu2
+    m3 = s3 - 3.0 * mu * s2 + 2.0 * count * mu2 * mu
+    m4 = s4 - 4.0 * mu * s3 + 6.0 * mu2 * s2 - 3.0 * count * mu2 * mu2
+    return mu, m2, m3, m4
+
+
+class Moments:
+    """
+    Count, mean and central moment sums of one or many return series.
+
+    The sums M2, M3 and M4 of the centred powers are accumulated in one pass over the data,
+    chunk by chunk, and chunks are merged with the pairwise update of Chan et al. extended to
+    the third and fourth moments by Terriberry. Two `Moments` of disjoint samples of the same
+    columns merge exactly, so partial results of batches or workers can be combined.
+
+    Samples can be weighted, in which case `count` is the total weight and the sample size used
+    by the statistics is the effective size count² / count_sq.
+
+    Parameters
+    ----------
+    count: int, np.array
+        Number of samples of each series, or their total weight.
+
+    mean, m2, m3, m4: float, np.array
+        Mean and sums of the centred 2nd, 3rd and 4th powers of each series.
+
+    columns: pd.Index
+        Column labels, if the moments were computed from a pd.DataFrame.
+        The statistics are then returned as pd.Series.
+
+    count_sq: float, np.array
+        Sum of the squared sample weights, equal to `count` for unweighted samples.
+
+    index: pd.Index
+        Row labels of rolling moments, which have a leading time axis. The statistics are then
+        returned as pd.Series or pd.DataFrame indexed by time.
+    """
+
+    def __init__(self, count, mean, m2, m3, m4, columns=None, count_sq=None, index=None):
+        self.count = np.asarray(count, dtype=float)
+        self.mean = np.asarray(mean, dtype=float)
+        self.m2 = np.asarray(m2, dtype=float)
+        self.m3 = np.asarray(m3, dtype=float)
+        self.m4 = np.asarray(m4, dtype=float)
+        self.columns = columns
+        self.count_sq = self.count if count_sq is None else np.asarray(count_sq, dtype=float)
+        self.index = index
+
+    @classmethod
+    def from_returns(cls, returns, chunk_size=4096, weights=None):
+        """
+        Compute the moments of a set of returns in a single pass.
+
+        Parameters
+        ----------
+        returns: np.array, pd.Series, pd.DataFrame
+            One series, or one column per series.
+
+        chunk_size: int
+            Number of rows processed at a time.
+
+        weights: np.array
+            Optional positive weight of each row.
+
+        Returns
+        -------
+        Moments
+        """
+        if isinstance(returns, Moments):
+            return returns
+
+        columns = returns.columns if isinstance(returns, pd.DataFrame) else None
+        values = np.asarray(returns, dtype=float)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)
+            if weights.shape != values.shape[:1]:
+                raise ValueError("Expected one weight per row of returns")
+            weights = weights.reshape(weights.shape + (1,) * (values.ndim - 1))
+
+        moments = None
+        for start in range(0, max(len(values), 1), chunk_size):
+            chunk = values[start:start + chunk_size]
+            if weights is None:
+                count = count_sq = len(chunk)
+                mean = chunk.mean(axis=0)
+                centred = chunk - mean
+                squared = centred * centred
+                m2, m3, m4 = squared, squared * centred, squared * squared
+            else:
+                w = weights[start:start + chunk_size]
+                count, count_sq = w.sum(), (w * w).sum()
+                mean = (w * chunk).sum(axis=0) / count
+                centred = chunk - mean
+                squared = centred * centred
+                m2, m3, m4 = w * squared, w * squared * centred, w * squared * squared
+
+            batch = cls(count, mean, m2.sum(axis=0), m3.sum(axis=0), m4.sum(axis=0), columns,
+                        count_sq)
+            moments = batch if moments is None else moments.merge(batch)
+
+        return moments
+
+    @classmethod
+    def rolling(cls, returns, window, chunk_size=512):
+        """
+        Compute the moments of every rolling window of a set of returns.
+
+        The power sums of each window are differences of cumulative sums, so the cost is linear
+        in the length of the returns whatever the window. The returns are centred on their
+        sample mean first, to limit the cancellation when converting to central moments.
+
+        Parameters
+        ----------
+        returns: np.array, pd.Series, pd.DataFrame
+            One series, or one column per series.
+
+        window: int
+            Number of returns in each window.
+
+        chunk_size: int
+            Number of columns processed at a time, to bound the memory of the cumulative sums.
+
+        Returns
+        -------
+        Moments
+            With a leading time axis, the moments of the window ending at each row.
+            The first `window - 1` rows are NaN.
+        """
+        columns = returns.columns if isinstance(returns, pd.DataFrame) else None
+        index = returns.index if isinstance(returns, (pd.Series, pd.DataFrame)) else None
+        values = np.asarray(returns, dtype=float)
+        if not 1 < window <= len(values):
+            raise ValueError("window must be between 2 and the number of returns")
+
+        flat = values.reshape(len(values), -1)
+        mean, m2, m3, m4 = (np.full(flat.shape, np.nan) for _ in range(4))
+        sums = np.zeros((len(flat) + 1, min(chunk_size, flat.shape[1])))
+        for start in range(0, flat.shape[1], chunk_size):
+            block = flat[:, start:start + chunk_size]
+            shift = block.mean(axis=0)
+            block = block - shift
+            cumulative = sums[:, :block.shape[1]]
+
+            power = block
+            window_sums = []
+            for _ in range(4):
+                np.cumsum(power, axis=0, out=cumulative[1:])
+                window_sums.append(cumulative[window:] - cumulative[:-window])
+                power = power * block
+
+            mu, window_m2, window_m3, window_m4 = _central_moments(window, *window_sums)
+            columns_slice = slice(start, start + block.shape[1])
+            mean[window - 1:, columns_slice] = mu + shift
+            m2[window - 1:, columns_slice] = window_m2
+            m3[window - 1:, columns_slice] = window_m3
+            m4[window - 1:, columns_slice] = window_m4
+
+        return cls(window, *(moment.reshape(values.shape) for moment in (mean, m2, m3, m4)),
+                   columns=columns, index=index)
+
+    def merge(self, other):
+        """
+        Combine with the moments of another, disjoint, sample of the same series.
+
+        Parameters
+        ----------
+        other: Moments
+
+        Returns
+        -------
+        Moments
+        """
+        na, nb = self.count, other.count
+        n = na + nb
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = np.where(n > 0, other.mean - self.mean, 0.0)
+            delta_n = np.where(n > 0, delta / n, 0.0)
+        delta_n2 = delta_n * delta_n
+        cross = delta * delta_n * na * nb
+
+        mean = self.mean + delta_n * nb
+        m2 = self.m2 + other.m2 + cross
+        m3 = (self.m3 + other.m3 + cross * delta_n * (na - nb)
+              + 3.0 * delta_n * (na * other.m2 - nb * self.m2))
+        m4 = (self.m4 + other.m4 + cross * delta_n2 * (na * na - na * nb + nb * nb)
+              + 6.0 * delta_n2 * (na * na * other.m2 + nb * nb * self.m2)
+              + 4.0 * delta_n * (na * other.m3 - nb * self.m3))
+
+        return Moments(n, mean, m2, m3, m4, self.columns, self.count_sq + other.count_sq,
+                       self.index)
+
+    def scale(self, factor):
+        """
+        Down-weight every sample by `factor`, as exponential decay does to past returns.
+
+        The mean and the standardized moments are unchanged, the effective sample size shrinks.
+
+        Parameters
+        ----------
+        factor: float
+
+        Returns
+        -------
+        Moments
+        """
+        return Moments(self.count * factor, self.mean, self.m2 * factor, self.m3 * factor,
+                       self.m4 * factor, self.columns, self.count_sq * factor**2, self.index)
+
+    def _wrap(self, values):
+        # Statistics come back in the shape of the input: float, np.array, pd.Series or
+        # pd.DataFrame for rolling moments
+        if self.index is not None:
+            if np.ndim(values) == 2:
+                return pd.DataFrame(values, index=self.index, columns=self.columns)
+            return pd.Series(values, index=self.index)
+        if self.columns is not None:
+            return pd.Series(values, index=self.columns)
+        if np.ndim(values) == 0:
+            return float(values)
+        return values
+
+    @property
+    def n(self):
+        """(Effective) number of samples, as an int when unweighted and the same for all series."""
+        if np.array_equal(self.count, self.count_sq):
+            counts = np.unique(self.count)
+            if len(counts) == 1:
+                return int(counts[0])
+        return self._wrap(self.count * self.count / self.count_sq)
+
+    def _variance(self, ddof=1):
+        # Reliability weights correction, reduces to m2 / (n - ddof) for unweighted samples
+        return self.m2 / (self.count - ddof * self.count_sq / self.count)
+
+    def std(self, ddof=1):
+        return self._wrap(np.sqrt(self._variance(ddof)))
+
+    def skew(self):
+        """Biased sample skewness, as `scipy.stats.skew`."""
+        return self._wrap(np.sqrt(self.count) * self.m3 / self.m2**1.5)
+
+    def kurtosis(self):
+        """Biased sample (non excess) kurtosis, as `scipy.stats.kurtosis(fisher=False)`."""
+        return self._wrap(self.count * self.m4 / (self.m2 * self.m2))
+
+    def sharpe_ratio(self):
+        return self._wrap(self.mean / np.sqrt(self._variance()))
+
+
+def _like(values, moments):
+    """Return `values` in the shape of the returns the `moments` were computed from."""
+    if moments is None:
+        return values
+    return moments._wrap(np.asarray(values, dtype=float))
+
+
 def estimated_sharpe_ratio(returns):
     """
     Calculate the estimated sharpe ratio (risk_free=0).
 
     Parameters
     ----------
-    returns: np.array, pd.Series, pd.DataFrame
+    returns: np.array, pd.Series, pd.DataFrame, Moments
 
     Returns
     -------
-    float, pd.Series
+    float, np.array, pd.Series
     """
+    if isinstance(returns, Moments):
+        return returns.sharpe_ratio()
     return returns.mean() / returns.std(ddof=1)
 
 
@@ -64,7 +352,7 @@ def ann_estimated_sharpe_ratio(returns=None, periods=261, *, sr=None):
 
     Parameters
     ----------
-    returns: np.array, pd.Series, pd.DataFrame
+    returns: np.array, pd.Series, pd.DataFrame, Moments
 
     periods: int
         How many items in `returns` complete a Year.
@@ -91,7 +379,7 @@ def estimated_sharpe_ratio_stdev(
 
     Parameters
     ----------
-    returns: np.array, pd.Series, pd.DataFrame
+    returns: np.array, pd.Series, pd.DataFrame, Moments
         If no `returns` are passed it is mandatory to pass the other 4 parameters.
 
     n: int
@@ -110,38 +398,28 @@ def estimated_sharpe_ratio_stdev(
 
     Returns
     -------
-    float, pd.Series
+    float, np.array, pd.Series
 
     Notes
     -----
     This formula generalizes for both normal and non-normal returns.
     https://papers.ssrn.com/sol3/papers.cfm?abstract_id=1821643
     """
-    if type(returns) != pd.DataFrame:
-        _returns = pd.DataFrame(returns)
-    else:
-        _returns = returns.copy()
-
-    if n is None:
-        n = len(_returns)
-    if skew is None:
-        skew = pd.Series(scipy_stats.skew(_returns), index=_returns.columns)
-    if kurtosis is None:
-        kurtosis = pd.Series(
-            scipy_stats.kurtosis(_returns, fisher=False), index=_returns.columns
-        )
-    if sr is None:
-        sr = estimated_sharpe_ratio(_returns)
+    if returns is not None:
+        moments = Moments.from_returns(returns)
+        if n is None:
+            n = moments.n
+        if skew is None:
+            skew = moments.skew()
+        if kurtosis is None:
+            kurtosis = moments.kurtosis()
+        if sr is None:
+            sr = moments.sharpe_ratio()
 
     sr_std = np.sqrt(
         (1 + (0.5 * sr**2) - (skew * sr) + (((kurtosis - 3) / 4) * sr**2)) / (n - 1)
     )
 
-    if type(returns) == pd.DataFrame:
-        sr_std = pd.Series(sr_std, index=returns.columns)
-    elif type(sr_std) not in (float, np.float64, pd.DataFrame):
-        sr_std = sr_std.values[0]
-
     return sr_std
 
 
@@ -151,7 +429,7 @@ def probabilistic_sharpe_ratio(returns=None, sr_benchmark=0.0, *, sr=None, sr_st
 
     Parameters
     ----------
-    returns: np.array, pd.Series, pd.DataFrame
+    returns: np.array, pd.Series, pd.DataFrame, Moments
         If no `returns` are passed it is mandatory to pass a `sr` and `sr_std`.
 
     sr_benchmark: float
@@ -167,7 +445,7 @@ def probabilistic_sharpe_ratio(returns=None, sr_benchmark=0.0, *, sr=None, sr_st
 
     Returns
     -------
-    float, pd.Series
+    float, np.array, pd.Series
 
     Notes
     -----
@@ -177,19 +455,15 @@ def probabilistic_sharpe_ratio(returns=None, sr_benchmark=0.0, *, sr=None, sr_st
 
     https://papers.ssrn.com/sol3/papers.cfm?abstract_id=1821643
     """
+    moments = None if returns is None else Moments.from_returns(returns)
     if sr is None:
-        sr = estimated_sharpe_ratio(returns)
+        sr = estimated_sharpe_ratio(moments)
     if sr_std is None:
-        sr_std = estimated_sharpe_ratio_stdev(returns, sr=sr)
+        sr_std = estimated_sharpe_ratio_stdev(moments, sr=sr)
 
     psr = scipy_stats.norm.cdf((sr - sr_benchmark) / sr_std)
 
-    if type(returns) == pd.DataFrame:
-        psr = pd.Series(psr, index=returns.columns)
-    elif type(psr) not in (float, np.float64):
-        psr = psr[0]
-
-    return psr
+    return _like(psr, moments)
 
 
 def min_track_record_length(
@@ -200,7 +474,7 @@ def min_track_record_length(
 
     Parameters
     ----------
-    returns: np.array, pd.Series, pd.DataFrame
+    returns: np.array, pd.Series, pd.DataFrame, Moments
         If no `returns` are passed it is mandatory to pass a `sr` and `sr_std`.
 
     sr_benchmark: float
@@ -223,7 +497,7 @@ def min_track_record_length(
 
     Returns
     -------
-    float, pd.Series
+    float, np.array, pd.Series
 
     Notes
     -----
@@ -234,12 +508,13 @@ def min_track_record_length(
 
     https://papers.ssrn.com/sol3/papers.cfm?abstract_id=1821643
     """
+    moments = None if returns is None else Moments.from_returns(returns)
     if n is None:
-        n = len(returns)
+        n = moments.n
     if sr is None:
-        sr = estimated_sharpe_ratio(returns)
+        sr = estimated_sharpe_ratio(moments)
     if sr_std is None:
-        sr_std = estimated_sharpe_ratio_stdev(returns, sr=sr)
+        sr_std = estimated_sharpe_ratio_stdev(moments, sr=sr)
 
     min_trl = (
         1
@@ -247,12 +522,117 @@ def min_track_record_length(
         * (scipy_stats.norm.ppf(prob) / (sr - sr_benchmark)) ** 2
     )
 
-    if type(returns) == pd.DataFrame:
-        min_trl = pd.Series(min_trl, index=returns.columns)
-    elif type(min_trl) not in (float, np.float64):
-        min_trl = min_trl[0]
+    return _like(min_trl, moments)
+
+
+def _standardize(returns):
+    """Centre and scale columns to unit norm, so that their dot products are correlations."""
+    centred = returns - returns.mean(axis=0)
+    return centred / np.sqrt(np.einsum("ij,ij->j", centred, centred))
+
+
+def average_correlation(trials_returns, num_pairs=None, chunk_size=1024, seed=None):
+    """
+    Calculate the average pairwise correlation between trials, without the correlation matrix.
+
+    With Z the standardized trials, the sum of all the correlations is |Z 1|², so the exact
+    average only needs the row sums of Z, accumulated over chunks of trials in O(T) memory.
+    Alternatively the average is estimated from the correlations of `num_pairs` random pairs.
+
+    Parameters
+    ----------
+    trials_returns: np.array, pd.DataFrame
+        All trials returns, one column per trial, without missing values.
+
+    num_pairs: int
+        Number of random pairs of trials to sample, or None for the exact average.
+
+    chunk_size: int
+        Number of trials, or pairs, processed at a time.
+
+    seed: int
+        Seed of the pair sampling.
+
+    Returns
+    -------
+    float
+    """
+    values = np.asarray(trials_returns, dtype=float)
+    m = values.shape[1]
+    if m < 2:
+        raise ValueError("At least two trials are needed")
+
+    if num_pairs is None:
+        total = np.zeros(len(values))
+        for start in range(0, m, chunk_size):
+            total += _standardize(values[:, start:start + chunk_size]).sum(axis=1)
+        # The diagonal contributes m to |Z 1|²
+        return (total @ total - m) / (m * (m - 1))
+
+    means = np.empty(m)
+    norms = np.empty(m)
+    for start in range(0, m, chunk_size):
+        block = values[:, start:start + chunk_size]
+        means[start:start + chunk_size] = block.mean(axis=0)
+        centred = block - means[start:start + chunk_size]
+        norms[start:start + chunk_size] = np.sqrt(np.einsum("ij,ij->j", centred, centred))
+
+    rng = np.random.default_rng(seed)
+    first = rng.integers(m, size=num_pairs)
+    second = rng.integers(m - 1, size=num_pairs)
+    second += second >= first  # uniform over the other trials
+
+    total = 0.0
+    for start in range(0, num_pairs, chunk_size):
+        i = first[start:start + chunk_size]
+        j = second[start:start + chunk_size]
+        products = np.einsum("ij,ij->j", values[:, i] - means[i], values[:, j] - means[j])
+        total += (products / (norms[i] * norms[j])).sum()
+    return total / num_pairs
+
+
+def num_clustered_trials(trials_returns, threshold=0.5, chunk_size=1024):
+    """
+    Estimate the number of independent trials as the number of clusters of correlated trials.
+
+    Trials are visited in order, each joins the cluster of the first leader it has a correlation
+    of at least `threshold` with, or else leads a new cluster. Only the standardized leaders are
+    kept, so the memory is O(T · clusters) whatever the number of trials.
+
+    Parameters
+    ----------
+    trials_returns: np.array, pd.DataFrame
+        All trials returns, one column per trial, without missing values.
+
+    threshold: float
+        Minimum correlation of a trial with the leader of its cluster.
+
+    chunk_size: int
+        Number of trials processed at a time.
+
+    Returns
+    -------
+    int
+    """
+    values = np.asarray(trials_returns, dtype=float)
+    leaders = np.empty((len(values), 0))
+
+    for start in range(0, values.shape[1], chunk_size):
+        block = _standardize(values[:, start:start + chunk_size])
+        if leaders.shape[1]:
+            block = block[:, (leaders.T @ block).max(axis=0) < threshold]
+
+        # The trials left in the chunk are clustered among themselves, in order
+        correlations = block.T @ block
+        assigned = np.zeros(block.shape[1], dtype=bool)
+        new_leaders = []
+        for i in range(block.shape[1]):
+            if not assigned[i]:
+                new_leaders.append(i)
+                assigned |= correlations[i] >= threshold
+        leaders = np.hstack([leaders, block[:, new_leaders]])
 
-    return min_trl
+    return leaders.shape[1]
 
 
 def num_independent_trials(trials_returns=None, *, m=None, p=None):
@@ -269,6 +649,8 @@ def num_independent_trials(trials_returns=None, *, m=None, p=None):
 
     p: float
         Average correlation between all the trials.
+        Computed exactly with `average_correlation` if not given, for large trial sets it can
+        be estimated from a sample of pairs with `average_correlation(num_pairs=...)`.
 
     Returns
     -------
@@ -278,8 +660,7 @@ def num_independent_trials(trials_returns=None, *, m=None, p=None):
         m = trials_returns.shape[1]
 
     if p is None:
-        corr_matrix = trials_returns.corr()
-        p = corr_matrix.values[np.triu_indices_from(corr_matrix.values, 1)].mean()
+        p = average_correlation(trials_returns)
 
     n = p + (1 - p) * m
 
@@ -300,8 +681,10 @@ def expected_maximum_sr(
 
     Parameters
     ----------
-    trials_returns: pd.DataFrame
-        All trials returns, not only the independent trials.
+    trials_returns: pd.DataFrame, Moments
+        All trials returns, not only the independent trials. `Moments` of the trials can
+        only be passed together with `independent_trials`. With rolling `Moments` the
+        expected maximum is computed for every window.
 
     expected_mean_sr: float
         Expected mean SR, usually 0. We assume that random strategies will have a mean SR of 0,
@@ -316,7 +699,7 @@ def expected_maximum_sr(
 
     Returns
     -------
-    float
+    float, np.array
     """
     emc = 0.5772156649  # Euler-Mascheroni constant
 
@@ -325,7 +708,8 @@ def expected_maximum_sr(
 
     if trials_sr_std is None:
         srs = estimated_sharpe_ratio(trials_returns)
-        trials_sr_std = srs.std()
+        # Across the trials, the last axis
+        trials_sr_std = np.std(np.asarray(srs, dtype=float), axis=-1, ddof=1)
 
     max_z = (1 - emc) * scipy_stats.norm.ppf(
         1 - 1.0 / independent_trials
@@ -340,17 +724,19 @@ def deflated_sharpe_ratio(
     returns_selected=None,
     expected_mean_sr=0.0,
     *,
-    expected_max_sr=None
+    expected_max_sr=None,
+    independent_trials=None
 ):
     """
     Calculate the Deflated Sharpe Ratio (PSR).
 
     Parameters
     ----------
-    trials_returns: pd.DataFrame
+    trials_returns: pd.DataFrame, Moments
         All trials returns, not only the independent trials.
+        Rolling `Moments` of the trials and of `returns_selected` give the DSR of every window.
 
-    returns_selected: pd.Series
+    returns_selected: pd.Series, Moments
 
     expected_mean_sr: float
         Expected mean SR, usually 0. We assume that random strategies will have a mean SR of 0,
@@ -360,9 +746,12 @@ def deflated_sharpe_ratio(
         The expected maximum sharpe ratio expected after running all the trials,
         expressed in the same frequency as the other parameters.
 
+    independent_trials: int
+        Number of independent trials, estimated from `trials_returns` if not given.
+
     Returns
     -------
-    float
+    float, pd.Series
 
     Notes
     -----
@@ -373,10 +762,372 @@ def deflated_sharpe_ratio(
     https://papers.ssrn.com/sol3/papers.cfm?abstract_id=2460551
     """
     if expected_max_sr is None:
-        expected_max_sr = expected_maximum_sr(trials_returns, expected_mean_sr)
+        expected_max_sr = expected_maximum_sr(
+            trials_returns, expected_mean_sr, independent_trials=independent_trials
+        )
 
     dsr = probabilistic_sharpe_ratio(
         returns=returns_selected, sr_benchmark=expected_max_sr
     )
 
     return dsr
+
+
+class SharpeRatioAccumulator:
+    """
+    Online Sharpe ratio statistics of one or many live return series.
+
+    Returns are ingested one row at a time or in mini-batches, and only the running `Moments`
+    are kept, so an update and every statistic cost O(1) in the length of the track record.
+    With `decay` < 1 the weight of all past returns is multiplied by `decay` at each new return,
+    and the statistics use the effective sample size of the weights.
+
+    Parameters
+    ----------
+    decay: float
+        Weight multiplier of past returns per new return, in (0, 1].
+        The half-life is log(0.5) / log(decay) returns, 1 weights all returns equally.
+
+    periods: int
+        How many returns complete a Year, for the annualized sharpe ratio.
+
+    columns: pd.Index
+        Labels of the series, the statistics are then returned as pd.Series.
+        Taken from the first pd.Series row or pd.DataFrame batch if not given.
+    """
+
+    def __init__(self, decay=1.0, periods=261, columns=None):
+        if not 0.0 < decay <= 1.0:
+            raise ValueError("decay must be in (0, 1]")
+        self.decay = decay
+        self.periods = periods
+        self.columns = columns
+        self.observations = 0
+        self.moments = None
+
+    def update(self, returns):
+        """
+        Ingest one return per series.
+
+        Parameters
+        ----------
+        returns: float, np.array, pd.Series
+            The latest return, or the latest row of returns of many series.
+        """
+        if self.columns is None and isinstance(returns, pd.Series):
+            self.columns = returns.index
+        self.update_many(np.asarray(returns, dtype=float)[np.newaxis])
+
+    def update_many(self, returns):
+        """
+        Ingest a mini-batch of returns, oldest first.
+
+        Parameters
+        ----------
+        returns: np.array, pd.Series, pd.DataFrame
+            Returns of one series, or one row per period and one column per series.
+        """
+        if self.columns is None and isinstance(returns, pd.DataFrame):
+            self.columns = returns.columns
+        values = np.asarray(returns, dtype=float)
+        if len(values) == 0:
+            return
+
+        weights = None
+        if self.decay < 1.0:
+            weights = self.decay ** np.arange(len(values) - 1, -1, -1, dtype=float)
+        batch = Moments.from_returns(values, weights=weights)
+        batch.columns = self.columns
+
+        self._append(batch, len(values))
+
+    def _append(self, moments, observations):
+        if self.moments is None:
+            self.moments = moments
+        else:
+            self.moments = self.moments.scale(self.decay**observations).merge(moments)
+        self.observations += observations
+
+    def merge(self, other):
+        """
+        Combine with the state of an accumulator fed with the returns that followed.
+
+        Without decay the order of the two samples is irrelevant, so partial states of any
+        partition of the returns can be reduced in parallel.
+
+        Parameters
+        ----------
+        other: SharpeRatioAccumulator
+
+        Returns
+        -------
+        SharpeRatioAccumulator
+        """
+        if other.decay != self.decay:
+            raise ValueError("Cannot merge accumulators with different decays")
+
+        merged = SharpeRatioAccumulator(self.decay, self.periods, self.columns)
+        merged.moments = self.moments
+        merged.observations = self.observations
+        if other.moments is not None:
+            merged._append(other.moments, other.observations)
+        if merged.moments is not None:
+            merged.moments.columns = self.columns
+        return merged
+
+    def sharpe_ratio(self):
+        return estimated_sharpe_ratio(self.moments)
+
+    def ann_sharpe_ratio(self):
+        return ann_estimated_sharpe_ratio(self.moments, self.periods)
+
+    def sharpe_ratio_stdev(self):
+        return estimated_sharpe_ratio_stdev(self.moments)
+
+    def probabilistic_sharpe_ratio(self, sr_benchmark=0.0):
+        return probabilistic_sharpe_ratio(self.moments, sr_benchmark)
+
+    def min_track_record_length(self, sr_benchmark=0.0, prob=0.95):
+        return min_track_record_length(self.moments, sr_benchmark, prob)
+
+
+def _create_shared_array(shape):
+    """Create a zeroed float64 array backed by a new shared memory block."""
+    size = int(np.prod(shape)) * np.dtype(np.float64).itemsize
+    shared = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    array = np.ndarray(shape, dtype=np.float64, buffer=shared.buf)
+    array[...] = 0.0
+    return shared, array
+
+
+def _attach_shared_array(name, shape):
+    """Open an existing shared memory block as a float64 array."""
+    shared = shared_memory.SharedMemory(name=name)
+    return shared, np.ndarray(shape, dtype=np.float64, buffer=shared.buf)
+
+
+def _bootstrap_indices(rng, num_resamples, length, block_size, method):
+    """
+    Draw the row indices of `num_resamples` block bootstrap resamples at once.
+
+    The stationary bootstrap of Politis and Romano starts a new block at a random row with
+    probability 1 / block_size at each step, the circular block bootstrap concatenates blocks
+    of exactly `block_size` rows. Both wrap around the end of the sample.
+    """
+    positions = np.arange(length)
+    if method == "stationary":
+        starts = rng.integers(length, size=(num_resamples, length))
+        new_block = rng.random((num_resamples, length)) < 1.0 / block_size
+        new_block[:, 0] = True
+        # Position of the start of the block each row belongs to
+        block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+        indices = np.take_along_axis(starts, block_start, axis=1) + (positions - block_start)
+    elif method == "circular":
+        num_blocks = -(-length // block_size)
+        starts = rng.integers(length, size=(num_resamples, num_blocks))
+        indices = np.repeat(starts, block_size, axis=1)[:, :length] + positions % block_size
+    else:
+        raise ValueError("Unknown bootstrap method: {}".format(method))
+    return indices % length
+
+
+def _resample_statistics(powers, counts, shift, sr_benchmark, expected_mean_sr,
+                         independent_trials):
+    """
+    SR, PSR and DSR of every strategy in every resample, from the number of times each row
+    is drawn: the power sums of all resamples are the matrix products counts @ powers.
+    """
+    length = powers.shape[1]
+    mean, m2, m3, m4 = _central_moments(length, *(counts @ power for power in powers))
+    moments = Moments(length, mean + shift, m2, m3, m4)
+
+    sr = estimated_sharpe_ratio(moments)
+    sr_std = estimated_sharpe_ratio_stdev(moments, sr=sr)
+    psr = probabilistic_sharpe_ratio(sr=sr, sr_std=sr_std, sr_benchmark=sr_benchmark)
+
+    if independent_trials is None:
+        dsr = np.full_like(psr, np.nan)
+    else:
+        expected_max_sr = expected_maximum_sr(
+            expected_mean_sr=expected_mean_sr,
+            independent_trials=independent_trials,
+            trials_sr_std=np.std(sr, axis=-1, ddof=1),
+        )
+        dsr = probabilistic_sharpe_ratio(
+            sr=sr, sr_std=sr_std, sr_benchmark=expected_max_sr[:, np.newaxis]
+        )
+
+    return np.stack([sr, psr, dsr])
+
+
+def _bootstrap_batch(powers, rng, size, block_size, method, *options):
+    length = powers.shape[1]
+    indices = _bootstrap_indices(rng, size, length, block_size, method)
+    offsets = (np.arange(size) * length)[:, np.newaxis]
+    counts = np.bincount((indices + offsets).ravel(), minlength=size * length)
+    return _resample_statistics(powers, counts.reshape(size, length).astype(float), *options)
+
+
+def _bootstrap_batches(powers_name, results_name, shape, num_resamples, seeds, offsets, sizes,
+                       block_size, method, options):
+    """
+    Worker task: run the given bootstrap batches on the shared memory powers of the returns
+    and write their statistics into the shared memory results.
+    """
+    powers_shared, powers = _attach_shared_array(powers_name, shape)
+    results_shared, results = _attach_shared_array(results_name, (3, num_resamples, shape[2]))
+    try:
+        for seed, offset, size in zip(seeds, offsets, sizes):
+            results[:, offset:offset + size] = _bootstrap_batch(
+                powers, np.random.default_rng(seed), size, block_size, method, *options
+            )
+    finally:
+        del powers, results
+        powers_shared.close()
+        results_shared.close()
+
+
+def bootstrap_sharpe_ratio(
+    returns,
+    num_resamples=1000,
+    block_size=None,
+    method="stationary",
+    alpha=0.05,
+    sr_benchmark=0.0,
+    expected_mean_sr=0.0,
+    *,
+    independent_trials=None,
+    batch_size=100,
+    seed=None,
+    n_workers=1
+):
+    """
+    Calculate block bootstrap confidence intervals of the SR, PSR and DSR of many strategies.
+
+    The analytic standard deviation of the SR assumes independent returns, blocks of
+    consecutive returns keep their autocorrelation in the resamples. The same rows are drawn
+    for every strategy, so their cross-correlation, which the DSR depends on, is kept as well.
+
+    A resample only changes how many times each row is drawn, so the power sums of a batch of
+    resamples for all strategies are one matrix product of the (resamples, rows) counts with
+    the powers of the centred returns. Batches are seeded from `seed` with
+    `np.random.SeedSequence.spawn`, so results do not depend on `n_workers`. With several
+    workers the powers and the results are shared memory arrays.
+
+    Parameters
+    ----------
+    returns: np.array, pd.Series, pd.DataFrame
+        One series, or one column per strategy, without missing values.
+        The columns are the trials of the DSR.
+
+    num_resamples: int
+        Number of bootstrap resamples.
+
+    block_size: int
+        (Mean) number of consecutive returns per block, by default the cube root of the number
+        of returns. 1 gives the iid bootstrap.
+
+    method: str
+        "stationary" for random block lengths, "circular" for fixed ones.
+
+    alpha: float
+        The intervals have confidence 1 - `alpha`.
+
+    sr_benchmark: float
+        Benchmark sharpe ratio of the PSR.
+
+    expected_mean_sr: float
+        Expected mean SR of the trials, for the DSR.
+
+    independent_trials: int
+        Number of independent trials for the DSR, estimated from `returns` if not given.
+        The DSR is NaN for a single strategy.
+
+    batch_size: int
+        Number of resamples drawn at a time.
+
+    seed: int, np.random.SeedSequence
+        Root seed of the resamples.
+
+    n_workers: int
+        Number of worker processes (1 runs in the calling process).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per strategy, with the estimate and the lower and upper bounds of the
+        intervals of each statistic: sr, sr_lower, sr_upper, psr, ..., dsr_upper.
+    """
+    index = None
+    if isinstance(returns, pd.DataFrame):
+        index = returns.columns
+    elif isinstance(returns, pd.Series) and returns.name is not None:
+        index = pd.Index([returns.name])
+
+    values = np.asarray(returns, dtype=float)
+    values = values.reshape(len(values), -1)
+    length, num_strategies = values.shape
+    if block_size is None:
+        block_size = max(1, int(round(length ** (1.0 / 3.0))))
+    if independent_trials is None and num_strategies > 1:
+        independent_trials = num_independent_trials(values)
+
+    shift = values.mean(axis=0)
+    options = (shift, sr_benchmark, expected_mean_sr, independent_trials)
+
+    num_batches = -(-num_resamples // batch_size)
+    sizes = [batch_size] * num_batches
+    sizes[-1] = num_resamples - batch_size * (num_batches - 1)
+    offsets = np.cumsum([0] + sizes[:-1]).tolist()
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    seeds = root.spawn(num_batches)
+
+    shape = (4, length, num_strategies)
+    powers = results = None
+    powers_shared = results_shared = None
+    try:
+        if n_workers > 1:
+            powers_shared, powers = _create_shared_array(shape)
+        else:
+            powers = np.empty(shape)
+        powers[0] = values - shift
+        for p in range(1, 4):
+            np.multiply(powers[p - 1], powers[0], out=powers[p])
+
+        estimates = _resample_statistics(powers, np.ones((1, length)), *options)[:, 0]
+
+        if n_workers > 1:
+            results_shared, results = _create_shared_array((3, num_resamples, num_strategies))
+            groups = np.array_split(np.arange(num_batches), min(n_workers, num_batches))
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                tasks = [
+                    executor.submit(_bootstrap_batches, powers_shared.name, results_shared.name,
+                                    shape, num_resamples, [seeds[i] for i in group],
+                                    [offsets[i] for i in group], [sizes[i] for i in group],
+                                    block_size, method, options)
+                    for group in groups
+                ]
+                for task in tasks:
+                    task.result()
+            resampled = np.array(results)
+        else:
+            resampled = np.concatenate([
+                _bootstrap_batch(powers, np.random.default_rng(batch_seed), size, block_size,
+                                 method, *options)
+                for batch_seed, size in zip(seeds, sizes)
+            ], axis=1)
+    finally:
+        del powers, results
+        for shared in (powers_shared, results_shared):
+            if shared is not None:
+                shared.close()
+                shared.unlink()
+
+    lower, upper = np.quantile(resampled, [alpha / 2, 1 - alpha / 2], axis=1)
+
+    table = {}
+    for i, name in enumerate(("sr", "psr", "dsr")):
+        table[name] = estimates[i]
+        table[name + "_lower"] = lower[i]
+        table[name + "_upper"] = upper[i]
+    return pd.DataFrame(table, index=index)
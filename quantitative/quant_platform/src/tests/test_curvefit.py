@@ -0,0 +1,28 @@
+import numpy as np
+
+from modules import fixedincome
+from modules.curvefit import NSSCurve
+
+
+def test_global_fits_recover_curve_from_noisy_prices(capsys):
+    true_curve = NSSCurve([0.04, -0.02, 0.01, 0.005, 2.0, 12.0])
+    rng = np.random.default_rng(0)
+    bonds = [fixedincome.create_coupon_bond(float(rng.integers(1, 60)) / 2, 100.0,
+                                            float(rng.uniform(0.0, 6.0)), 2)
+             for _ in range(300)]
+    prices = fixedincome.BondPortfolio.from_bonds(bonds).price(true_curve) + rng.normal(0.0, 0.01, 300)
+    times = np.linspace(1.0, 30.0, 30)
+
+    nss = fixedincome.curve_factory(bondlist=bonds, prices=prices, fit="nss")
+    np.testing.assert_allclose(nss.zero_rates(times), true_curve.zero_rates(times), atol=0.01)
+
+    spline = fixedincome.curve_factory(bondlist=bonds, prices=prices, fit="spline", method="natural",
+                                       dates=[0.5, 1.0, 2.0, 3.0, 5.0, 7.0, 10.0, 15.0, 20.0, 30.0])
+    np.testing.assert_allclose([spline.get_yield(t) for t in times], true_curve.zero_rates(times),
+                               atol=0.01)
+
+
+def test_spline_fit_without_dates_reports_missing_knots(capsys):
+    bonds = [fixedincome.create_coupon_bond(maturity, 100.0, 3.0, 2) for maturity in (2.0, 5.0, 10.0)]
+    assert fixedincome.curve_factory(bondlist=bonds, prices=[100.0, 99.0, 98.0], fit="spline") is None
+    assert "knot dates" in capsys.readouterr().out
@@ -0,0 +1,209 @@
+import numpy as np
+
+from modules import fixedincome
+
+
+def test_eval_many_matches_eval(capsys):
+    dates = [0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+    rates = [0.010, 0.012, 0.015, 0.019, 0.026, 0.031, 0.035]
+    xs = np.concatenate([np.linspace(0.0, 35.0, 301), dates])
+
+    for cls in (fixedincome.pwlinear_interpolator,
+                fixedincome.catmull_rom_interpolator,
+                fixedincome.natural_spline_interpolator):
+        interpolator = cls(dates, rates)
+        expected = [interpolator.eval(x) for x in xs]
+        np.testing.assert_allclose(interpolator.eval_many(xs), expected, rtol=0, atol=1e-15)
+
+
+def test_interpolators_at_pillar_boundaries(capsys):
+    dates = [0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+    rates = [0.010, 0.012, 0.015, 0.019, 0.026, 0.031, 0.035]
+    outside = [0.0, 0.1, 30.0 + 1e-9, 50.0]
+
+    for cls in (fixedincome.pwlinear_interpolator,
+                fixedincome.catmull_rom_interpolator,
+                fixedincome.natural_spline_interpolator):
+        interpolator = cls(dates, rates)
+
+        # The first and last abscissae and every interior pillar hit their own ordinate
+        for x, y in zip(dates, rates):
+            assert abs(interpolator.eval(x) - y) < 1e-15
+        np.testing.assert_allclose(interpolator.eval_many(dates), rates, rtol=0, atol=1e-15)
+
+        # Either side of an interior pillar the lookup lands in the neighbouring segment
+        for x, y in zip(dates[1:-1], rates[1:-1]):
+            for shift in (-1e-10, 1e-10):
+                assert abs(interpolator.eval(x + shift) - y) < 1e-10
+                assert abs(interpolator.eval_many([x + shift])[0] - interpolator.eval(x + shift)) < 1e-15
+
+        # Extrapolation is flat both ways
+        expected = [rates[0], rates[0], rates[-1], rates[-1]]
+        assert [interpolator.eval(x) for x in outside] == expected
+        np.testing.assert_array_equal(interpolator.eval_many(outside), expected)
+
+
+def _copy_per_step_newton(F, Fprime):
+    # The bootstrap before the in-place trial pillar: a fresh interpolator per evaluation
+    old_eta = 0.0
+    new_eta = old_eta - F(old_eta) / Fprime(old_eta)
+    while abs(new_eta - old_eta) > 1e-6:
+        old_eta = new_eta
+        new_eta = old_eta - F(old_eta) / Fprime(old_eta)
+    return new_eta
+
+
+def _copy_per_step_pillar(interpolator, tenor, price_error):
+    def F(eta):
+        trial = interpolator.copy()
+        trial.extend(tenor, eta)
+        return price_error(trial)
+
+    def Fprime(eta):
+        return (F(eta + 1e-7) - F(eta - 1e-7)) / 2e-7
+
+    return _copy_per_step_newton(F, Fprime)
+
+
+def test_bootstrap_reprices_bond_and_swap_quotes(capsys):
+    true_curve = fixedincome.curve_factory(dates=[0.5, 2.0, 5.0, 10.0, 30.0], rates=[1.0, 1.8, 2.6, 3.1, 3.4])
+    bonds = [fixedincome.create_coupon_bond(maturity, 100.0, rate, 2)
+             for maturity, rate in ((1.0, 1.5), (2.5, 2.0), (4.0, 2.5), (7.0, 3.0), (10.0, 3.5), (20.0, 4.0))]
+    for bond in bonds:
+        bond.set_price(bond.price(true_curve))
+
+    bootstrapped = fixedincome.curve_factory(bondlist=list(bonds))
+    for bond in bonds:
+        assert abs(bond.price(bootstrapped) - bond.get_price()) < 1e-8
+
+    def bond_error(bond):
+        return lambda trial: sum(coupon * np.exp(-trial.eval(date) * date)
+                                 for date, coupon in zip(bond.get_dates(), bond.get_coupons())) - bond.get_price()
+
+    reference = fixedincome.pwlinear_interpolator()
+    for bond in sorted(bonds, key=lambda bond: bond.get_maturity()):
+        reference.extend(bond.get_maturity(), _copy_per_step_pillar(reference, bond.get_maturity(), bond_error(bond)))
+    np.testing.assert_allclose(bootstrapped.interpolator.get_ordinates(), reference.get_ordinates(), atol=1e-10)
+
+    # Deposits and futures fix the short end, the swaps are bootstrapped
+    dates = [0.5, 1.0, 2.0, 3.0, 5.0, 10.0]
+    swaps = [2.0, 2.2, 2.6, 3.0]
+    money_market = fixedincome.curve_factory(dates=dates, libor=[1.5], futures=[98.3], swaps=list(swaps))
+
+    def par_error(tenor, rate):
+        def error(trial):
+            annuity = sum(0.5 * np.exp(-t * trial.eval(t)) for t in np.arange(1, 2 * tenor + 1) * 0.5)
+            return rate / 100 * annuity + np.exp(-tenor * trial.eval(tenor)) - 1.0
+        return error
+
+    for tenor, rate in zip(dates[2:], swaps):
+        assert abs(par_error(tenor, rate)(money_market.interpolator)) < 1e-10
+
+    reference = fixedincome.pwlinear_interpolator(dates[:2], money_market.interpolator.get_ordinates()[:2])
+    for tenor, rate in zip(dates[2:], swaps):
+        reference.extend(tenor, _copy_per_step_pillar(reference, tenor, par_error(tenor, rate)))
+    np.testing.assert_allclose(money_market.interpolator.get_ordinates(), reference.get_ordinates(), atol=1e-10)
+
+
+def _dense_second_derivatives(x, y):
+    n = len(x)
+    lhs = np.eye(n)
+    rhs = np.zeros(n)
+    for i in range(1, n - 1):
+        lhs[i, i - 1] = (x[i] - x[i - 1]) / 6.0
+        lhs[i, i] = (x[i + 1] - x[i - 1]) / 3.0
+        lhs[i, i + 1] = (x[i + 1] - x[i]) / 6.0
+        rhs[i] = (y[i + 1] - y[i]) / (x[i + 1] - x[i]) - (y[i] - y[i - 1]) / (x[i] - x[i - 1])
+    return np.linalg.solve(lhs, rhs)
+
+
+def test_natural_spline_matches_dense_solve_after_updates():
+    rng = np.random.default_rng(0)
+    x = list(np.cumsum(rng.uniform(0.1, 2.0, 40)))
+    y = list(rng.uniform(0.0, 0.05, 40))
+
+    spline = fixedincome.natural_spline_interpolator(x[:2], y[:2])
+    for xval, yval in zip(x[2:], y[2:]):
+        spline.append(xval, yval)
+    np.testing.assert_allclose(spline.fprimeprime, _dense_second_derivatives(x, y), atol=1e-12)
+
+    for index in (0, 17, 39):
+        y[index] += 0.01
+        spline.set_ordinate(index, y[index])
+        np.testing.assert_allclose(spline.fprimeprime, _dense_second_derivatives(x, y), atol=1e-12)
+
+
+def test_bucketed_dv01_matches_bump_and_reprice(capsys):
+    dates = [0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+    rates = [1.2, 1.5, 1.9, 2.6, 3.1, 3.5]
+    bonds = [fixedincome.create_coupon_bond(maturity, 100.0, 4.0, 2)
+             for maturity in (0.75, 2.0, 4.5, 9.0, 30.0)]
+
+    for method in ("pwlinear", "hermite", "natural"):
+        yield_curve = fixedincome.curve_factory(dates=dates, rates=rates, method=method)
+        dv01 = fixedincome.bucketed_dv01(yield_curve, bonds)
+
+        # Central differences of a 1bp bump cancel the convexity term
+        for j in range(len(dates)):
+            up, down = list(rates), list(rates)
+            up[j] += 0.01
+            down[j] -= 0.01
+            up = fixedincome.curve_factory(dates=dates, rates=up, method=method)
+            down = fixedincome.curve_factory(dates=dates, rates=down, method=method)
+            expected = [(bond.price(up) - bond.price(down)) / 2.0 for bond in bonds]
+            np.testing.assert_allclose(dv01[:, j], expected, rtol=0, atol=1e-6)
+
+
+def test_bond_portfolio_matches_bond_prices(capsys):
+    yield_curve = fixedincome.curve_factory(dates=[0.5, 2.0, 10.0, 30.0], rates=[1.0, 1.8, 3.0, 3.4],
+                                            method="natural")
+    bonds = [fixedincome.create_coupon_bond(maturity, 100.0, rate, frequency)
+             for maturity, rate, frequency in ((1.0, 2.0, 2), (7.5, 4.5, 2), (3.0, 0.0, 0), (30.0, 5.0, 4))]
+    portfolio = fixedincome.BondPortfolio.from_bonds(bonds, quantities=[1.0, -2.0, 3.0, 0.5])
+
+    for date in (0.0, 2.25):
+        expected = [bond.price(yield_curve, date) for bond in bonds]
+        np.testing.assert_allclose(portfolio.price(yield_curve, date), expected, rtol=1e-14)
+        assert abs(portfolio.value(yield_curve, date) - np.dot(portfolio.quantities, expected)) < 1e-10
+
+
+def test_batch_ytm_matches_scalar_ytm(capsys):
+    yield_curve = fixedincome.curve_factory(dates=[0.5, 2.0, 10.0, 30.0], rates=[1.0, 1.8, 3.0, 3.4])
+    bonds = [fixedincome.create_coupon_bond(maturity, 100.0, rate, frequency)
+             for maturity, rate, frequency in ((1.0, 2.0, 2), (7.5, 4.5, 2), (3.0, 0.0, 0), (30.0, 9.0, 1))]
+    portfolio = fixedincome.BondPortfolio.from_bonds(bonds)
+    prices = portfolio.price(yield_curve)
+
+    yields, durations, convexities, status = portfolio.ytm(prices)
+    assert np.all(status == fixedincome.YTM_CONVERGED)
+    np.testing.assert_allclose(yields, [bond.YTM(price) for bond, price in zip(bonds, prices)], atol=1e-6)
+
+    # Modified duration and convexity against central differences of the price in the yield
+    times, payments = portfolio.cashflow_matrix()
+    frequency = np.array([2.0, 2.0, 0.0, 1.0])
+    h = 1e-5
+    up = fixedincome._ytm_terms(yields / 100 + h, times, payments, frequency)[0]
+    down = fixedincome._ytm_terms(yields / 100 - h, times, payments, frequency)[0]
+    np.testing.assert_allclose(durations, -(up - down) / (2 * h) / prices, rtol=1e-7)
+    np.testing.assert_allclose(convexities, (up - 2 * prices + down) / h**2 / prices, rtol=1e-4)
+
+
+def test_curve_snapshot_matches_curve(capsys):
+    dates = [0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+    rates = [1.0, 1.2, 1.5, 1.9, 2.6, 3.1, 3.5]
+    times = np.linspace(0.05, 35.0, 200)
+
+    for method in ("pwlinear", "hermite", "natural"):
+        yield_curve = fixedincome.curve_factory(dates=dates, rates=rates, method=method)
+        snapshot = yield_curve.freeze()
+
+        np.testing.assert_allclose(snapshot.discount_factors(times), yield_curve.discount_factors(times),
+                                   rtol=1e-14)
+        np.testing.assert_allclose(snapshot.zero_rates(times), [yield_curve.get_yield(t) for t in times],
+                                   rtol=1e-13)
+        for compounding in (0, 2, "continuous"):
+            expected = [yield_curve.forward_rate(t, t + 0.5, compounding) for t in times]
+            np.testing.assert_allclose(snapshot.forward_rates(times, times + 0.5, compounding), expected,
+                                       rtol=1e-11)
+            assert abs(snapshot.forward_rate(1.5, 2.0, compounding)
+                       - yield_curve.forward_rate(1.5, 2.0, compounding)) < 1e-11
@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Third-party packages the pricing modules are allowed to load at import time
+# (cython_runtime is the helper module registered by scipy's compiled extensions)
+ALLOWED_PACKAGES = {"numpy", "scipy", "cython_runtime"}
+
+
+def _modules_loaded_by(statement):
+    code = (
+        "import json, sys\n"
+        "before = set(sys.modules)\n"
+        "{}\n"
+        "print(json.dumps(sorted(set(sys.modules) - before)))\n"
+    ).format(statement)
+    result = subprocess.run([sys.executable, "-c", code], cwd=SRC_PATH, check=True,
+                            capture_output=True, text=True)
+    return json.loads(result.stdout.splitlines()[-1]), result.stdout
+
+
+def _third_party(modules):
+    top_level = {name.split(".")[0] for name in modules}
+    return {name for name in top_level
+            if name not in sys.stdlib_module_names and not name.startswith("_")
+            and name != "modules"}
+
+
+def test_options_import_touches_only_math_numpy_scipy():
+    modules, stdout = _modules_loaded_by("from modules import options")
+    assert _third_party(modules) <= ALLOWED_PACKAGES
+    assert "scipy.stats" not in modules
+    assert "Matplotlib" not in stdout
+
+
+def test_fixedincome_import_touches_only_math_numpy_scipy():
+    modules, stdout = _modules_loaded_by("from modules import fixedincome")
+    assert _third_party(modules) <= ALLOWED_PACKAGES
+    assert "Matplotlib" not in stdout
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from modules.multicurve import MultiCurve, SwapQuote
+
+TENORS = [0.5, 1.0, 2.0, 3.0, 5.0, 7.0, 10.0, 20.0, 30.0]
+OIS = [3.0, 2.9, 2.7, 2.6, 2.6, 2.7, 2.8, 3.0, 3.0]
+
+
+@pytest.mark.parametrize("method", ["pwlinear", "hermite", "natural"])
+def test_joint_bootstrap_reprices_quotes(method, capsys):
+    quotes = [SwapQuote("OIS", t, r) for t, r in zip(TENORS, OIS)] \
+        + [SwapQuote("3M", t, r + 0.25, 2, 4) for t, r in zip(TENORS, OIS)]
+
+    curves = MultiCurve(TENORS, ["OIS", "3M"], method=method)
+    iterations = curves.bootstrap(quotes)
+
+    assert iterations < 10
+    np.testing.assert_allclose(curves.par_rates(quotes), [q.rate for q in quotes], atol=1e-9)
+
+    # An annual OIS swap is a sum of single-period deposits on the discounting curve
+    dfs = curves.discount_factors([1.0, 2.0, 3.0])
+    assert abs(100 * (1.0 - dfs[-1]) / dfs.sum() - OIS[3]) < 1e-9
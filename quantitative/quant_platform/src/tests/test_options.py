@@ -0,0 +1,252 @@
+import os
+import subprocess
+import sys
+from math import exp, log, sqrt
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from modules import options
+
+
+def _baseline_price(spot, time, strike, expiry, vol, rate, flag):
+    # The scalar pricer the vectorized kernel replaced
+    vol /= 100
+    rate /= 100
+    d1 = (log(spot/strike)+(rate+vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
+    d2 = (log(spot/strike)+(rate-vol**2/2) * (expiry - time)) / vol / sqrt(expiry - time)
+    if flag == options.CALL:
+        return spot*norm.cdf(d1)-strike * exp(-rate*(expiry - time))*norm.cdf(d2)
+    return -spot*norm.cdf(-d1) + strike * exp(-rate*(expiry - time))*norm.cdf(-d2)
+
+
+def _option_grid():
+    spot, strike, expiry, vol, rate = np.meshgrid([80.0, 100.0, 125.0], [90.0, 100.0, 110.0],
+                                                  [0.1, 1.0, 3.0], [10.0, 35.0], [-0.5, 4.0],
+                                                  indexing="ij")
+    return spot.ravel(), strike.ravel(), expiry.ravel(), vol.ravel(), rate.ravel()
+
+
+def test_bs_price_matches_scalar_baseline_and_parity():
+    spot, strike, expiry, vol, rate = _option_grid()
+    calls = options.bs_price(spot, 0.0, strike, expiry, vol, rate, options.CALL)
+    puts = options.bs_price(spot, 0.0, strike, expiry, vol, rate, "put")
+
+    for flag, prices in ((options.CALL, calls), (options.PUT, puts)):
+        expected = [_baseline_price(*args, flag) for args in zip(spot, np.zeros_like(spot), strike,
+                                                                 expiry, vol, rate)]
+        np.testing.assert_allclose(prices, expected, rtol=1e-12, atol=1e-12)
+
+    np.testing.assert_allclose(calls - puts, spot - strike * np.exp(-rate / 100 * expiry),
+                               rtol=1e-12, atol=1e-12)
+
+    # Scalar inputs take the math-module path and agree with the array path
+    assert isinstance(options.bs_price(100.0, 0.0, 110.0, 1.0, 35.0, 4.0), float)
+    assert abs(options.bs_price(100.0, 0.0, 110.0, 1.0, 35.0, 4.0)
+               - options.bs_price(np.array([100.0]), 0.0, 110.0, 1.0, 35.0, 4.0)[0]) < 1e-13
+
+    # Expired options are worth their intrinsic value
+    np.testing.assert_allclose(options.bs_price([90.0, 110.0], 1.0, 100.0, 1.0, 20.0, 5.0, "put"),
+                               [10.0, 0.0])
+
+
+def test_bs_greeks_match_finite_differences():
+    spot, strike, expiry, vol, rate = _option_grid()
+    time = 0.05
+
+    for flag in (options.CALL, options.PUT):
+        greeks = options.bs_greeks(spot, time, strike, expiry, vol, rate, flag)
+
+        def price(spot=spot, time=time, vol=vol, rate=rate):
+            return options.bs_price(spot, time, strike, expiry, vol, rate, flag)
+
+        def delta(spot=spot, time=time, vol=vol):
+            return options.bs_delta(spot, time, strike, expiry, vol, rate, flag)
+
+        def vega(vol=vol):
+            return options.bs_vega(spot, time, strike, expiry, vol, rate, flag)
+
+        # Steps in spot, vol (%), rate (%) and time (years), with the Greeks' own scalings
+        h, dv, dr, dt = 1e-3, 1e-4, 1e-4, 1e-5
+        expected = {
+            "price": price(),
+            "delta": (price(spot=spot + h) - price(spot=spot - h)) / (2 * h),
+            "gamma": (price(spot=spot + h) - 2 * price() + price(spot=spot - h)) / h**2,
+            "vega": (price(vol=vol + dv) - price(vol=vol - dv)) / (2 * dv),
+            "theta": (price(time=time + dt) - price(time=time - dt)) / (2 * dt) / 365,
+            "rho": (price(rate=rate + dr) - price(rate=rate - dr)) / (2 * dr),
+            "vanna": (delta(vol=vol + dv) - delta(vol=vol - dv)) / (2 * dv),
+            "volga": (vega(vol=vol + dv) - vega(vol=vol - dv)) / (2 * dv),
+            "charm": (delta(time=time + dt) - delta(time=time - dt)) / (2 * dt) / 365,
+        }
+
+        for name, values in expected.items():
+            np.testing.assert_allclose(greeks[name], values, rtol=1e-5, atol=1e-6, err_msg=name)
+
+
+def test_implied_vol_batch_round_trip_and_status_codes():
+    strike, expiry, vol = np.meshgrid(np.linspace(50.0, 200.0, 31), [0.02, 0.25, 1.0, 5.0, 20.0],
+                                      [5.0, 20.0, 60.0, 150.0], indexing="ij")
+    for flag in (options.CALL, options.PUT):
+        prices = options.bs_price(100.0, 0.0, strike, expiry, vol, 3.0, flag)
+        # Deep in-the-money quotes with almost no time value cannot pin down the vol
+        time_value = prices - np.maximum(flag * (100.0 - strike * np.exp(-0.03 * expiry)), 0.0)
+        solvable = time_value > 1e-8 * prices.clip(1.0)
+
+        implied, status = options.implied_vol_batch(prices, 100.0, strike, expiry, 3.0, flag)
+        assert np.all(status[solvable] == options.IV_CONVERGED)
+        np.testing.assert_allclose(implied[solvable], vol[solvable], rtol=1e-8)
+
+    discount = np.exp(-0.03)
+    quotes = [
+        (110.0 - 100.0 * discount, 110.0, options.CALL, options.IV_BELOW_INTRINSIC),  # no time value
+        (5.0, 110.0, options.CALL, options.IV_BELOW_INTRINSIC),                     # below intrinsic
+        (120.0, 110.0, options.CALL, options.IV_ABOVE_MAXIMUM),                     # above the spot
+        (100.0 * discount + 1.0, 90.0, options.PUT, options.IV_ABOVE_MAXIMUM),      # above the strike
+        (np.nan, 110.0, options.CALL, options.IV_INVALID_INPUT),
+        (5.0, -110.0, options.CALL, options.IV_INVALID_INPUT),
+    ]
+    prices, spots, flags, expected = (np.array(column) for column in zip(*quotes))
+    implied, status = options.implied_vol_batch(prices, spots, 100.0, 1.0, 3.0, flags)
+    np.testing.assert_array_equal(status, expected)
+    assert np.all(np.isnan(implied))
+
+    implied, status = options.implied_vol_batch(5.0, 100.0, 100.0, 0.0, 3.0)
+    assert status == options.IV_INVALID_INPUT and np.isnan(implied)
+    with pytest.raises(ValueError):
+        options.implied_vol(120.0, 110.0, 100.0, 1.0, 3.0)
+
+
+@pytest.fixture
+def scipy_backend():
+    options.set_norm_backend("scipy")
+    yield
+    options.set_norm_backend("erfc")
+
+
+def test_erfc_backend_scalar_cdf_matches_scipy():
+    for x in np.linspace(-38.0, 38.0, 7601):
+        assert abs(options.norm_cdf(float(x)) - norm.cdf(x)) <= 1e-14
+
+
+def test_erfc_backend_scalar_pdf_matches_scipy():
+    for x in np.linspace(-38.0, 38.0, 7601):
+        assert abs(options.norm_pdf(float(x)) - norm.pdf(x)) <= 1e-14
+
+
+def test_erfc_backend_array_path_matches_scipy():
+    x = np.linspace(-38.0, 38.0, 7601)
+    np.testing.assert_allclose(options.norm_cdf(x), norm.cdf(x), rtol=1e-14, atol=1e-14)
+    np.testing.assert_allclose(options.norm_pdf(x), norm.pdf(x), rtol=1e-14, atol=1e-14)
+
+    p = np.linspace(1e-12, 1 - 1e-12, 1001)
+    np.testing.assert_allclose(options.norm_ppf(p), norm.ppf(p), rtol=1e-14, atol=1e-14)
+
+
+def test_scalar_functions_match_scipy_backend(scipy_backend):
+    functions = [options.BSCall, options.BSPut,
+                 options.BSCall_Delta, options.BSPut_Delta,
+                 options.BSCall_Gamma, options.BSCall_Theta,
+                 options.BSPut_Theta, options.BSCall_Vega]
+    inputs = [(100.0, 0.0, 100.0, 1.0, 20.0, 5.0),
+              (80.0, 0.25, 120.0, 2.0, 45.0, 1.0),
+              (150.0, 0.5, 90.0, 0.75, 10.0, -0.5)]
+
+    expected = [[f(*args) for f in functions] for args in inputs]
+    options.set_norm_backend("erfc")
+    actual = [[f(*args) for f in functions] for args in inputs]
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-14, atol=1e-14)
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError):
+        options.set_norm_backend("fortran")
+
+
+def test_option_book_values_positions_by_underlying():
+    strikes = [90.0, 100.0, 110.0, 120.0]
+    expiries = [0.5, 1.0, 1.0, 2.0]
+
+    default = options.OptionBook(strikes, expiries)
+    puts = options.OptionBook(strikes, expiries, types="put")
+    assert np.all(default.types == options.CALL) and np.all(puts.types == options.PUT)
+    assert len(default) == 4 and default.types.dtype == np.int8
+
+    types = np.array([options.CALL, options.PUT, options.CALL, options.PUT])
+    quantities = [1.0, -2.0, 3.0, 0.5]
+    book = options.OptionBook(strikes, expiries, types, quantities, underlyings=["B", "A", "B", "A"])
+    np.testing.assert_array_equal(book.types, [1, -1, 1, -1])
+    np.testing.assert_array_equal(book.underlyings, ["A", "B"])
+
+    spots = {"A": 95.0, "B": 105.0}
+    expected = {"A": 0.0, "B": 0.0}
+    for strike, expiry, flag, quantity, underlying in zip(strikes, expiries, types, quantities, "BABA"):
+        expected[underlying] += quantity * options.bs_price(spots[underlying], 0.0, strike, expiry, 25.0,
+                                                            2.0, flag)
+    np.testing.assert_allclose(book.price(spots, 0.0, 25.0, 2.0), [expected["A"], expected["B"]],
+                               rtol=1e-13)
+    # Spots must be given per underlying, not per position
+    with pytest.raises(ValueError):
+        book.price([95.0, 105.0, 95.0, 105.0], 0.0, 25.0, 2.0)
+
+    for single in (default, puts):
+        total = sum(options.bs_price(100.0, 0.0, strike, expiry, 25.0, 2.0, single.types[0])
+                    for strike, expiry in zip(strikes, expiries))
+        assert abs(single.price(100.0, 0.0, 25.0, 2.0)[0] - total) < 1e-12
+
+
+def test_scenario_pnl_matches_brute_force_revaluation():
+    book = options.OptionBook([90.0, 100.0, 110.0, 105.0, 95.0], [0.5, 1.0, 0.25, 2.0, 1.5],
+                              [options.CALL, options.PUT, options.CALL, options.PUT, options.CALL],
+                              [1.0, -2.0, 3.0, 0.5, -1.0], underlyings=[0, 1, 0, 1, 1])
+    spots, vols = [100.0, 98.0], [20.0, 30.0]
+    spot_shocks, vol_shocks, time_rolls = [-0.2, 0.0, 0.1], [-25.0, 0.0, 5.0], [0.0, 0.1, 0.3]
+
+    cube = book.scenario_pnl(spots, 0.0, vols, 2.0, spot_shocks, vol_shocks, time_rolls,
+                             by_underlying=True, max_elements=40)
+    assert cube.shape == (2, 3, 3, 3)
+    np.testing.assert_allclose(book.scenario_pnl(spots, 0.0, vols, 2.0, spot_shocks, vol_shocks,
+                                                 time_rolls), cube.sum(axis=0), rtol=1e-12, atol=1e-12)
+
+    expected = np.zeros(cube.shape)
+    for strike, expiry, flag, quantity, underlying in zip(book.strikes, book.expiries, book.types,
+                                                          book.quantities, book.underlying_ids):
+        spot, vol = spots[underlying], vols[underlying]
+        base = options.bs_price(spot, 0.0, strike, expiry, vol, 2.0, flag)
+        for i, spot_shock in enumerate(spot_shocks):
+            for j, vol_shock in enumerate(vol_shocks):
+                for k, time_roll in enumerate(time_rolls):
+                    value = options.bs_price(spot * (1 + spot_shock), time_roll, strike, expiry,
+                                             max(vol + vol_shock, 0.0), 2.0, flag)
+                    expected[underlying, i, j, k] += quantity * (value - base)
+
+    np.testing.assert_allclose(cube, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_option_profile_returns_curves_without_matplotlib():
+    call = options.option(100.0, 1.0, "call")
+    spots, payoff = call.profile("payoff", [50.0, 100.0, 150.0])
+    np.testing.assert_array_equal(spots, [50.0, 100.0, 150.0])
+    np.testing.assert_array_equal(payoff, [0.0, 0.0, 50.0])
+
+    spots, delta = call.profile("delta", time=0.25, vol=20.0, rate=2.0)
+    np.testing.assert_allclose(spots, np.arange(0.1, 200.0, 0.1))
+    np.testing.assert_allclose(delta, options.bs_delta(spots, 0.25, 100.0, 1.0, 20.0, 2.0), rtol=1e-15)
+    with pytest.raises(ValueError):
+        call.profile("rho")
+
+    # Generating the data must not load the plotting stack
+    code = (
+        "import sys\n"
+        "from modules import options\n"
+        "contract = options.option(100.0, 1.0, 'put')\n"
+        "for greek in ('payoff', 'price', 'delta', 'gamma', 'vega', 'theta'):\n"
+        "    contract.profile(greek, time=0.0, vol=20.0, rate=2.0)\n"
+        "print('matplotlib' in sys.modules)\n"
+    )
+    src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    result = subprocess.run([sys.executable, "-c", code], cwd=src_path, check=True,
+                            capture_output=True, text=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import stats as scipy_stats
+
+from portfolio import sharpe_ratio
+
+
+def test_chunked_moments_match_full_sample():
+    rng = np.random.default_rng(0)
+    returns = pd.DataFrame(rng.standard_t(5, (1000, 4)) * 0.01 + 0.0005, columns=list("abcd"))
+
+    full = sharpe_ratio.Moments.from_returns(returns)
+    chunked = sharpe_ratio.Moments.from_returns(returns, chunk_size=37)
+    merged = sharpe_ratio.Moments.from_returns(returns.iloc[:100]).merge(
+        sharpe_ratio.Moments.from_returns(returns.iloc[100:]))
+
+    for moments in (full, chunked, merged):
+        assert moments.n == len(returns)
+        pd.testing.assert_series_equal(moments.std(), returns.std(ddof=1), rtol=1e-12)
+        np.testing.assert_allclose(moments.skew(), scipy_stats.skew(returns), rtol=1e-10)
+        np.testing.assert_allclose(moments.kurtosis(), scipy_stats.kurtosis(returns, fisher=False),
+                                   rtol=1e-10)
+
+    expected = sharpe_ratio.probabilistic_sharpe_ratio(returns)
+    pd.testing.assert_series_equal(sharpe_ratio.probabilistic_sharpe_ratio(chunked), expected, rtol=1e-12)
+    assert isinstance(sharpe_ratio.min_track_record_length(returns["a"].values), float)
+
+
+def test_accumulator_matches_batch_statistics():
+    rng = np.random.default_rng(1)
+    returns = pd.DataFrame(rng.standard_t(5, (600, 3)) * 0.01 + 0.0005, columns=list("xyz"))
+
+    accumulator = sharpe_ratio.SharpeRatioAccumulator()
+    for _, row in returns.iloc[:200].iterrows():
+        accumulator.update(row)
+    accumulator.update_many(returns.iloc[200:400])
+    tail = sharpe_ratio.SharpeRatioAccumulator()
+    tail.update_many(returns.iloc[400:])
+    accumulator = accumulator.merge(tail)
+
+    pd.testing.assert_series_equal(accumulator.probabilistic_sharpe_ratio(),
+                                   sharpe_ratio.probabilistic_sharpe_ratio(returns), rtol=1e-12)
+    pd.testing.assert_series_equal(accumulator.min_track_record_length(),
+                                   sharpe_ratio.min_track_record_length(returns), rtol=1e-10)
+
+    # With decay, the statistics are those of the exponentially weighted sample
+    decay = 0.99
+    series = returns["x"].values
+    decayed = sharpe_ratio.SharpeRatioAccumulator(decay=decay)
+    for value in series[:300]:
+        decayed.update(value)
+    decayed.update_many(series[300:])
+
+    weights = decay ** np.arange(len(series) - 1, -1, -1)
+    mean = np.average(series, weights=weights)
+    variance = np.cov(series, aweights=weights)
+    assert abs(decayed.sharpe_ratio() - mean / np.sqrt(variance)) < 1e-12
+
+
+def test_rolling_moments_match_windowed_statistics():
+    rng = np.random.default_rng(2)
+    index = pd.date_range("2020-01-01", periods=300, freq="B")
+    returns = pd.DataFrame(rng.standard_t(5, (300, 3)) * 0.01 + 0.0005, index=index)
+    window = 60
+
+    rolling = sharpe_ratio.Moments.rolling(returns, window, chunk_size=2)
+    psr = sharpe_ratio.probabilistic_sharpe_ratio(rolling)
+    min_trl = sharpe_ratio.min_track_record_length(rolling)
+    assert psr.iloc[:window - 1].isna().all().all()
+
+    for end in (window, 151, 300):
+        sample = returns.iloc[end - window:end]
+        np.testing.assert_allclose(psr.iloc[end - 1], sharpe_ratio.probabilistic_sharpe_ratio(sample),
+                                   rtol=1e-10)
+        np.testing.assert_allclose(min_trl.iloc[end - 1], sharpe_ratio.min_track_record_length(sample),
+                                   rtol=1e-8)
+
+
+def test_average_correlation_without_matrix():
+    rng = np.random.default_rng(3)
+    factors = rng.normal(size=(400, 4))
+    trials = pd.DataFrame(factors[:, rng.integers(4, size=120)] + rng.normal(size=(400, 120)))
+
+    corr = trials.corr().values
+    expected = corr[np.triu_indices_from(corr, 1)].mean()
+    assert abs(sharpe_ratio.average_correlation(trials, chunk_size=17) - expected) < 1e-12
+    assert abs(sharpe_ratio.average_correlation(trials, num_pairs=20000, seed=0) - expected) < 0.01
+
+    # The trials are noisy copies of 4 factors
+    assert sharpe_ratio.num_clustered_trials(trials, threshold=0.3, chunk_size=50) == 4
+
+
+def test_bootstrap_intervals_cover_estimates_and_ignore_workers():
+    rng = np.random.default_rng(4)
+    returns = pd.DataFrame(rng.normal(0.0005, 0.01, (500, 6)), columns=list("abcdef"))
+
+    serial = sharpe_ratio.bootstrap_sharpe_ratio(returns, num_resamples=300, batch_size=64, seed=3)
+    parallel = sharpe_ratio.bootstrap_sharpe_ratio(returns, num_resamples=300, batch_size=64, seed=3,
+                                                  n_workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+    np.testing.assert_allclose(serial["sr"], sharpe_ratio.estimated_sharpe_ratio(returns), rtol=1e-12)
+    np.testing.assert_allclose(serial["dsr"], sharpe_ratio.deflated_sharpe_ratio(returns, returns),
+                               rtol=1e-10)
+    for name in ("sr", "psr", "dsr"):
+        assert np.all(serial[name + "_lower"] <= serial[name + "_upper"])
+    assert np.all((serial["sr_lower"] < serial["sr"]) & (serial["sr"] < serial["sr_upper"]))
+
+
+def test_parallel_bootstrap_runs_outside_the_test_path():
+    # Only src is on the path, as in the notebooks, so the workers must not rely on the conftest
+    code = (
+        "import numpy as np\n"
+        "from portfolio import sharpe_ratio\n"
+        "returns = np.random.default_rng(5).normal(0.0005, 0.01, (200, 3))\n"
+        "intervals = sharpe_ratio.bootstrap_sharpe_ratio(returns, num_resamples=64, batch_size=16,\n"
+        "                                                seed=1, n_workers=2)\n"
+        "print(len(intervals))\n"
+    )
+    src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    result = subprocess.run([sys.executable, "-c", code], cwd=src_path, check=True,
+                            capture_output=True, text=True)
+    assert result.stdout.strip() == "3"
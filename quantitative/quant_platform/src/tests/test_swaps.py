@@ -0,0 +1,33 @@
+import numpy as np
+
+from modules import fixedincome
+from modules.swaps import SwapPortfolio
+
+DATES = [0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.0, 10.0, 20.0, 30.0]
+RATES = [1.0, 1.2, 1.5, 1.9, 2.2, 2.6, 2.9, 3.1, 3.4, 3.5]
+
+
+def test_swaps_at_par_rates_have_zero_pv(capsys):
+    discount = fixedincome.curve_factory(dates=DATES, rates=RATES, method="natural")
+    projection = fixedincome.curve_factory(dates=DATES, rates=[r + 0.2 for r in RATES], method="natural")
+    maturities = [1.0, 2.5, 7.0, 30.0]
+
+    par = SwapPortfolio(maturities, 0.0, starts=[0.0, 0.0, 2.0, 0.0]).par_rates(discount, projection)
+    swaps = SwapPortfolio(maturities, par, notionals=1e6, starts=[0.0, 0.0, 2.0, 0.0])
+    np.testing.assert_allclose(swaps.pv(discount, projection), 0.0, atol=1e-8)
+
+
+def test_bucketed_dv01_matches_bump_and_reprice(capsys):
+    discount = fixedincome.curve_factory(dates=DATES, rates=RATES, method="hermite")
+    swaps = SwapPortfolio([2.0, 5.0, 12.5, 30.0], [1.5, 2.5, 3.0, 3.6], notionals=1e6,
+                          payer=[True, False, True, False])
+
+    risk = swaps.bucketed_dv01(discount)
+    np.testing.assert_allclose(risk.sum(axis=1), swaps.pv01(discount), rtol=1e-12)
+    for j in range(len(DATES)):
+        up, down = list(RATES), list(RATES)
+        up[j] += 0.01
+        down[j] -= 0.01
+        up = fixedincome.curve_factory(dates=DATES, rates=up, method="hermite")
+        down = fixedincome.curve_factory(dates=DATES, rates=down, method="hermite")
+        np.testing.assert_allclose(risk[:, j], (swaps.pv(up) - swaps.pv(down)) / 2, rtol=1e-5, atol=1e-6)